@@ -1,13 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from api.config import (
+    TOKEN_CACHE_MAX_ENTRIES,
+    AUTH_BCRYPT_WORKERS,
+    AUTH_MAX_PENDING_LOGINS,
+    AUTH_LOGIN_QUEUE_TIMEOUT,
+    EDGE_API_TOKEN,
+    LOGIN_MAX_FAILURES,
+    LOGIN_FAILURE_WINDOW_SECONDS
+)
+from api.worker_pool import WorkerPool, Overloaded
 import bcrypt
+import hashlib
+import hmac
+import logging
+import math
+import threading
+import time
 
 SECRET_KEY = "SUPER_SECRET_KEY_CHANGE_THIS"  # 🔒 replace with env variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+logger = logging.getLogger(__name__)
+
 # OAuth2 token handler
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -20,6 +39,111 @@ admin_user = {
     "hashed_password": b"$2b$12$wnMs4jgXRpXBvpEZ3taS6.juv1tncLCkcObOvr4Dp.e26YMeccxni"  # admin123
 }
 
+# bcrypt at cost 12 takes ~250 ms of CPU; it gets its own bounded pool so a
+# burst of logins can't tie up the threads that serve sync routes
+bcrypt_pool = WorkerPool(workers=AUTH_BCRYPT_WORKERS, max_in_flight=AUTH_MAX_PENDING_LOGINS,
+                         queue_timeout=AUTH_LOGIN_QUEUE_TIMEOUT, name="login")
+
+
+class TokenCache:
+    """Verified tokens (by SHA-256) -> (username, expiry), least recently used evicted first"""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str, now: float | None = None) -> str | None:
+        key = self.key(token)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            username, expires = entry
+            if expires <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return username
+
+    def put(self, token: str, username: str, expires: float):
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (username, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LoginRateLimiter:
+    """Sliding window of recent failed logins per key (client address)"""
+
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES, window: float = LOGIN_FAILURE_WINDOW_SECONDS,
+                 max_keys: int = 10000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = OrderedDict()   # key -> deque of failure times
+        self._lock = threading.Lock()
+
+    def retry_after(self, keys, now: float | None = None) -> int:
+        """Seconds until any of `keys` may try again (0 = allowed now)"""
+        now = time.monotonic() if now is None else now
+        wait = 0.0
+        with self._lock:
+            for key in keys:
+                failures = self._recent(key, now)
+                if failures is not None and len(failures) >= self.max_failures:
+                    wait = max(wait, failures[0] + self.window - now)
+        return math.ceil(wait)
+
+    def failed(self, keys, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for key in keys:
+                failures = self._recent(key, now)
+                if failures is None:
+                    failures = self._failures[key] = deque(maxlen=self.max_failures)
+                failures.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def succeeded(self, keys):
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+    def _recent(self, key, now: float):
+        # Caller holds self._lock
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+
+token_cache = TokenCache()
+login_limiter = LoginRateLimiter()
+
 
 def verify_password(plain_password: str, hashed_password: bytes):
     """Verify password using bcrypt directly"""
@@ -35,28 +159,63 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
     password = form_data.password
 
-    if username != admin_user["username"] or not verify_password(password, admin_user["hashed_password"]):
+    # Refuse before paying for bcrypt
+    client = request.client.host if request.client else "unknown"
+    # Per address only: a per-username limit would let anyone lock the admin out
+    keys = (client,)
+    wait = login_limiter.retry_after(keys)
+    if wait:
+        logger.warning("🚫 Login rate limit hit for %s from %s", username, client)
+        raise HTTPException(status_code=429, detail="Too many failed login attempts",
+                            headers={"Retry-After": str(wait)})
+
+    try:
+        # Hash the password even for unknown users, so timing doesn't reveal which exist
+        valid = await bcrypt_pool.run(verify_password, password, admin_user["hashed_password"])
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    if username != admin_user["username"] or not valid:
+        login_limiter.failed(keys)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    login_limiter.succeeded(keys)
     access_token = create_access_token({"sub": username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def verify_token(token: str) -> str:
+    """Username for a valid login token; raises 401 otherwise"""
+    username = token_cache.get(token)
+    if username is not None:
+        return username
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username != admin_user["username"]:
             raise HTTPException(status_code=401, detail="Invalid user")
+        token_cache.put(token, username, payload["exp"])
         return username
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # async so FastAPI calls it on the event loop instead of hopping to a thread
+    return verify_token(token)
+
+
+async def get_edge_or_user(token: str = Depends(oauth2_scheme)):
+    """Edge detectors present EDGE_API_TOKEN; anything else must be a login token"""
+    if EDGE_API_TOKEN and hmac.compare_digest(token.encode(), EDGE_API_TOKEN.encode()):
+        return "edge"
+    return await get_current_user(token)
+
+
 @router.get("/me")
 def read_users_me(current_user: str = Depends(get_current_user)):
     return {"username": current_user}
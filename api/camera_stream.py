@@ -1,55 +1,67 @@
-import cv2
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 from starlette.responses import StreamingResponse
-import easyocr
-import re
-import numpy as np
+from api.mjpeg_broadcaster import MJPEGBroadcaster, BOUNDARY, negotiate
+from api import live_video
 from api.database import SessionLocal
 from api import models
 from datetime import datetime
-from api.websocket_manager import manager
+from api.change_feed import mark_live
 from api.esp32_controller import trigger_esp32
+from api.frame_source import open_source
+from api.plate_tracker import PlateTracker
+from api.cooldown_store import cooldowns
+from api.roi import roi_for, RoiCalibrator
+from api.preprocessing import Preprocessor
+from api.plate_pipeline import detect_scale, read_tracked_plates
+from api.evidence_store import evidence_store, capture as capture_evidence
 import asyncio
+import logging
 import pytz
 from api.config import (
     CAMERA_SOURCE, 
-    CONFIDENCE_THRESHOLD, 
-    BUFFER_SIZE, 
-    VERIFICATION_COUNT, 
-    COOLDOWN_SECONDS, 
+    CAMERA_RESOLUTION,
+    STREAM_WIDTHS,
+    VOTE_CONFIRM_WEIGHT, 
     OCR_FRAME_INTERVAL,
-    USE_GPU
+    STREAM_AUTO_DOWNGRADE,
+    ROI_AUTO_CALIBRATE,
+    EVIDENCE_ENABLED
 )
 
 # Philippine timezone
 PHILIPPINE_TZ = pytz.timezone('Asia/Manila')
 
+logger = logging.getLogger(__name__)
+ocr_logger = logging.getLogger("api.ocr")
+
 router = APIRouter()
 
-# Initialize EasyOCR reader
-reader = easyocr.Reader(['en'], gpu=USE_GPU)
-print(f"✅ EasyOCR reader initialized (GPU: {USE_GPU})")
 
-# --- Detection Constants ---
-# Imported from api.config
-# CONFIDENCE_THRESHOLD = 0.60
-# BUFFER_SIZE = 5      
-# VERIFICATION_COUNT = 3
-# COOLDOWN_SECONDS = 30
-# OCR_FRAME_INTERVAL = 15
+class ReadSummary:
+    """Lazy log argument: one frame's track reads, formatted only when the record is emitted"""
+    __slots__ = ("reads",)
+
+    def __init__(self, reads):
+        self.reads = reads
+
+    def __str__(self):
+        return ", ".join("track %d: '%s' (%.2f)" % (track.id, plate, prob) if plate
+                         else "track %d: %s" % (track.id, "confirmed" if track.confirmed else "no read")
+                         for track, plate, prob in self.reads)
 
-# --- State ---
 
 # --- State ---
-plate_buffer = []            # Rolling buffer of recent plate reads
-logged_plates = {}           # {plate: datetime} cooldown tracker
+plate_tracker = PlateTracker()  # Per-vehicle tracks, each with its own plate votes
+# Cooldowns live in api.cooldown_store (bounded, expiring, optionally persisted)
+roi = roi_for(CAMERA_SOURCE)    # Where plates are searched for in each frame
+roi_calibrator = RoiCalibrator(roi) if ROI_AUTO_CALIBRATE else None
 
 # Global camera instance
 camera = None
 camera_active = False
 
 # Store pending detections for async processing
-pending_plates = []
+pending_plates = []          # (plate, evidence images or None)
 plate_processor_task = None
 
 def release_camera():
@@ -59,93 +71,21 @@ def release_camera():
         camera.release()
         camera = None
         camera_active = False
-        print("🛑 Camera released")
+        logger.info("🛑 Camera released")
 
-def preprocess_roi(roi):
-    """
-    Advanced preprocessing for better OCR accuracy:
-    1. Grayscale conversion
-    2. CLAHE (Contrast Limited Adaptive Histogram Equalization)
-    3. Sharpening kernel
-    """
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+def roi_bounds(frame):
+    """ROI bounding box (x0, y0, x1, y1) in frame pixels — where plates are visible"""
+    return roi.bounds(frame.shape)
 
-    # CLAHE enhances local contrast — critical for plates in shadow / glare
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
+def center_roi(frame):
+    """Crop of the frame inside the configured/calibrated ROI"""
+    return roi.crop(frame)
 
-    # Sharpening makes character edges crisper for OCR
-    kernel = np.array([[-1, -1, -1],
-                       [-1,  9, -1],
-                       [-1, -1, -1]])
-    enhanced = cv2.filter2D(enhanced, -1, kernel)
-
-    return enhanced
-
-def merge_segments(results):
-    """
-    Merge adjacent OCR text segments that belong to the same plate.
-    E.g. 'DBA' + '4658' on the same line → 'DBA4658'
+async def process_detection(plate: str, evidence: dict | None = None):
     """
-    segments = []
-    for (bbox, text, prob) in results:
-        cleaned = re.sub(r'[^A-Z0-9]', '', text.upper())
-        if prob >= 0.25 and len(cleaned) > 0:
-            x0 = bbox[0][0]
-            y_center = (bbox[0][1] + bbox[2][1]) / 2
-            x_end = bbox[1][0]
-            segments.append({
-                'text': cleaned,
-                'x0': x0,
-                'x_end': x_end,
-                'y': y_center,
-                'prob': prob
-            })
-
-    # Sort left-to-right
-    segments.sort(key=lambda s: s['x0'])
-
-    merged = []
-    if segments:
-        curr = segments[0].copy()
-        for i in range(1, len(segments)):
-            next_s = segments[i]
-            # Same horizontal line (Y within 30px) and close together (X gap < 100px)
-            if abs(next_s['y'] - curr['y']) < 30 and (next_s['x0'] - curr['x_end']) < 100:
-                curr['text'] += next_s['text']
-                curr['x_end'] = next_s['x_end']
-                curr['prob'] = (curr['prob'] + next_s['prob']) / 2
-            else:
-                merged.append(curr)
-                curr = next_s.copy()
-        merged.append(curr)
-
-    return merged
-
-def find_best_plate(merged_segments):
+    Process detected plate: log to DB; the change feed sends it to the dashboards.
+    `evidence` ({kind: image}) is handed to the evidence store under the new log's id.
     """
-    From merged OCR segments, find the best plate candidate:
-    - 4-10 alphanumeric characters
-    - At least 1 digit
-    - Highest confidence wins
-    """
-    best_plate = None
-    best_prob = 0
-
-    for cand in merged_segments:
-        text = cand['text']
-        prob = cand['prob']
-        if (4 <= len(text) <= 10
-                and prob >= CONFIDENCE_THRESHOLD
-                and any(c.isdigit() for c in text)):
-            if prob > best_prob:
-                best_plate = text
-                best_prob = prob
-
-    return best_plate, best_prob
-
-async def process_detection(plate: str):
-    """Process detected plate: log to DB, broadcast ONLY registered plates via WebSocket"""
     db = SessionLocal()
     try:
         # Check if vehicle is registered
@@ -162,31 +102,21 @@ async def process_detection(plate: str):
                 timestamp=timestamp
             )
             db.add(new_log)
+            # Sent to the dashboards by the change feed when this commits
+            mark_live(db, new_log)
             db.commit()
-
-            # Broadcast to WebSocket (REGISTERED ONLY) - Send FIRST for instant UI update
-            message = {
-                "plate_number": plate,
-                "status": "registered",
-                "timestamp": timestamp.isoformat(),
-                "vehicle": {
-                    "name": vehicle.name,
-                    "purpose": vehicle.purpose,
-                    "profile_picture": vehicle.profile_picture
-                }
-            }
-            await manager.broadcast(message)
-            print(f"✅ Registered: {plate} - {vehicle.name}")
-            print(f"📡 WebSocket broadcast sent: {message}")
+            if evidence:
+                evidence_store.submit(new_log.id, evidence, timestamp)
+            logger.info("✅ Registered: %s - %s", plate, vehicle.name)
 
             # Trigger ESP32 - Green LED + short beep (Non-blocking attempt)
             try:
-                # We use create_task to let it run in background if we wanted, 
-                # but simply awaiting it AFTER broadcast is enough to unblock UI.
+                # The dashboard event went out on commit, so awaiting this
+                # doesn't hold up the UI.
                 # Adding a separate try-block ensures hardware errors don't crash the loop.
                 await trigger_esp32("registered")
             except Exception as e:
-                print(f"⚠️ ESP32 Trigger Failed (UI updated anyway): {e}")
+                logger.warning("⚠️ ESP32 Trigger Failed (UI updated anyway): %s", e)
         else:
             # Create log for unregistered vehicle (still saved to DB)
             new_log = models.Log(
@@ -195,165 +125,224 @@ async def process_detection(plate: str):
                 timestamp=timestamp
             )
             db.add(new_log)
+            mark_live(db, new_log)
             db.commit()
+            if evidence:
+                evidence_store.submit(new_log.id, evidence, timestamp)
 
             # Trigger ESP32 - Red LED only (no buzzer, handled on ESP32 side)
             await trigger_esp32("unregistered")
 
-            # NOTE: Skip WebSocket broadcast for unregistered plates
-            print(f"🚫 Unregistered: {plate} (logged to DB, broadcast skipped)")
+            # Only clients subscribed to "unregistered" receive it
+            logger.info("🚫 Unregistered: %s (logged to DB)", plate)
     except Exception as e:
-        print(f"❌ Error processing detection: {e}")
+        logger.exception("❌ Error processing detection: %s", e)
     finally:
         db.close()
 
 def generate_frames():
     """
-    Generate frames for streaming with high-accuracy plate detection:
+    Capture loop: yields each annotated frame, scaled for viewing. Runs once per
+    camera inside the broadcaster's producer thread, with plate detection:
     - CLAHE + sharpening preprocessing
     - Segment merging for split plate text
-    - Temporal verification buffer (3/5 reads required)
+    - Per-vehicle tracking; confirmed tracks are not re-read
+    - Per-character, confidence-weighted temporal voting
     - Cooldown to prevent duplicate logging
     """
-    global camera, camera_active, pending_plates, plate_buffer, logged_plates
+    global camera, camera_active, pending_plates, roi
+
+    # Imported here so the API can start serving before the CV stack loads
+    import cv2
 
     # Initialize camera
     if camera is None:
-        camera = cv2.VideoCapture(CAMERA_SOURCE)
+        camera = open_source(CAMERA_SOURCE)
         camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer to minimize lag
         camera.set(cv2.CAP_PROP_FPS, 30)         # Set frame rate
-        camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        if CAMERA_RESOLUTION:
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_RESOLUTION[0])
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_RESOLUTION[1])
 
     if not camera.isOpened():
-        print("❌ Cannot open camera")
+        logger.error("❌ Cannot open camera")
         release_camera()
         return
 
     camera_active = True
     frame_count = 0
-    print("🎥 Camera stream started with high-accuracy plate detection")
+    # Owned by this loop: buffers are reused frame after frame
+    preprocessor = Preprocessor()
+    logger.info("🎥 Camera stream started with high-accuracy plate detection")
 
     try:
         while camera_active:
             ret, frame = camera.read()
             if not ret:
-                print("⚠️ Failed to read frame")
+                logger.warning("⚠️ Failed to read frame")
                 break
 
             frame_count += 1
 
-            # Resize frame
-            frame = cv2.resize(frame, (640, 480))
+            # Scale down to the largest stream tier; OCR works on the full frame
+            view_scale = min(1.0, max(STREAM_WIDTHS) / frame.shape[1])
+            view = frame if view_scale == 1.0 else preprocessor.resize(frame, view_scale, "view")
 
             # Process OCR every Nth frame
             if frame_count % OCR_FRAME_INTERVAL == 0:
                 try:
-                    h, w, _ = frame.shape
-
-                    # Center ROI — where license plates are typically visible
-                    roi = frame[int(h * 0.3):int(h * 0.7), int(w * 0.2):int(w * 0.8)]
-
-                    # Advanced preprocessing for better OCR accuracy
-                    enhanced = preprocess_roi(roi)
-
-                    # Run OCR on preprocessed ROI
-                    results = reader.readtext(enhanced, detail=1, paragraph=False)
-
-                    # Debug logging (every 45th frame to avoid spam)
-                    if results and frame_count % 45 == 0:
-                        print(f"🔍 OCR found {len(results)} text regions")
-                        for (_, text, prob) in results:
-                            print(f"   Raw: '{text}' | Confidence: {prob:.2f}")
-
-                    # Merge adjacent text segments (e.g. 'DBA' + '4658')
-                    merged = merge_segments(results)
-
-                    # Find the best plate candidate
-                    best_plate, best_prob = find_best_plate(merged)
-
-                    # --- Temporal Verification ---
-                    if best_plate:
-                        plate_buffer.append(best_plate)
-                        if len(plate_buffer) > BUFFER_SIZE:
-                            plate_buffer.pop(0)
-
-                        occurrences = plate_buffer.count(best_plate)
-
-                        if occurrences >= VERIFICATION_COUNT:
-                            # Plate confirmed — check cooldown
-                            current_time = datetime.now()
-                            last_log = logged_plates.get(best_plate)
-
-                            if last_log is None or (current_time - last_log).total_seconds() > COOLDOWN_SECONDS:
-                                # Queue for async processing
-                                pending_plates.append(best_plate)
-                                logged_plates[best_plate] = current_time
-                                print(f"✅ Plate confirmed: {best_plate} ({occurrences}/{VERIFICATION_COUNT}, confidence: {best_prob:.2f})")
-
-                        # Show verification status on frame
-                        color = (0, 255, 0) if occurrences >= VERIFICATION_COUNT else (0, 165, 255)
-                        cv2.putText(frame, f"{best_plate} ({occurrences}/{VERIFICATION_COUNT})",
-                                    (30, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+                    roi_image = center_roi(frame)
+                    roi_x, roi_y = roi_bounds(frame)[:2]
+                    # Track boxes (detection scale) -> full frame pixels
+                    box_scale = 1.0 / detect_scale(roi_image)
+
+                    # Locate text at low resolution, recognize unconfirmed tracks at full resolution
+                    reads = read_tracked_plates(roi_image, plate_tracker, preprocessor=preprocessor)
+
+                    # Debug logging (rate-limited per call site; the summary is only built if logged)
+                    if reads:
+                        ocr_logger.debug("🔍 %d text region(s): %s", len(reads), ReadSummary(reads))
+
+                    for track, best_plate, best_prob in reads:
+                        # --- Temporal Verification (per track) ---
+                        if track.confirmed and not track.logged:
+                            track.logged = True
+                            frame_box = tuple(roi_offset + v * box_scale for roi_offset, v
+                                              in zip((roi_x, roi_y, roi_x, roi_y), track.box))
+
+                            # Teach the ROI where plates show up
+                            if roi_calibrator is not None:
+                                calibrated = roi_calibrator.add(frame_box, frame.shape)
+                                if calibrated is not None:
+                                    roi = calibrated
+                                    plate_tracker.clear()  # box coordinates changed
+
+                            # Plate confirmed — check and start cooldown in one step
+                            if cooldowns.try_acquire(track.plate):
+                                # Queue for async processing, with a snapshot as evidence
+                                evidence = capture_evidence(frame, frame_box) if EVIDENCE_ENABLED else None
+                                pending_plates.append((track.plate, evidence))
+                                logger.info("✅ Plate confirmed: %s (track %d, support: %.2f/%.2f, %d OCR reads)",
+                                            track.plate, track.id, track.support, VOTE_CONFIRM_WEIGHT, track.ocr_calls)
+
+                    # Show verification status on frame, once every snapshot above is taken
+                    # (view is the frame itself when it isn't scaled down)
+                    for track, _, _ in reads:
+                        if track.plate:
+                            x0, y0, x1, y1 = (int((roi_offset + v * box_scale) * view_scale) for roi_offset, v
+                                              in zip((roi_x, roi_y, roi_x, roi_y), track.box))
+                            color = (0, 255, 0) if track.confirmed else (0, 165, 255)
+                            cv2.rectangle(view, (x0, y0), (x1, y1), color, 2)
+                            cv2.putText(view, f"{track.plate} ({track.support:.1f}/{VOTE_CONFIRM_WEIGHT})",
+                                        (x0, max(20, y0 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
 
                 except Exception as e:
-                    print(f"❌ OCR Error: {e}")
-
-            # Encode frame to JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
-            _, buffer = cv2.imencode('.jpg', frame, encode_param)
-            frame_bytes = buffer.tobytes()
+                    logger.error("❌ OCR Error: %s", e)
 
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            # Encoded by the broadcaster, once per tier viewers asked for
+            yield view
 
-    except GeneratorExit:
-        print("🔌 Client disconnected")
     finally:
         release_camera()
 
+# Single producer for the camera, shared by every /video_feed client
+broadcaster = MJPEGBroadcaster(generate_frames, name="camera")
+# H.264 encoder fed by the same producer, for /live.mp4 and /live/ws
+live_encoder = live_video.LiveVideoEncoder(broadcaster)
+
+def stop_stream():
+    """Stop the capture loop, disconnect viewers and release the camera"""
+    global camera_active
+    camera_active = False
+    broadcaster.stop()
+    release_camera()
+
 async def process_pending_plates():
     """Background task to process pending plate detections"""
     global camera_active, pending_plates
 
-    print("🔄 Pending plates processor started")
+    logger.info("🔄 Pending plates processor started")
 
     while camera_active:
         if pending_plates:
-            plate = pending_plates.pop(0)
-            print(f"📤 Processing plate from queue: {plate}")
-            await process_detection(plate)
+            plate, evidence = pending_plates.pop(0)
+            logger.debug("📤 Processing plate from queue: %s", plate)
+            await process_detection(plate, evidence)
         else:
             await asyncio.sleep(0.1)
 
-    print("🛑 Pending plates processor stopped")
+    logger.info("🛑 Pending plates processor stopped")
 
-@router.get("/video_feed")
-async def video_feed():
-    """Video feed endpoint with plate detection"""
+def start_plate_processor():
+    """Mark the camera active and start the pending plates processor if needed"""
     global plate_processor_task, camera_active
 
-    print("📡 /api/video_feed accessed")
-
     camera_active = True  # Ensure camera is active
 
     # Start background task to process pending plates (only if not already running)
     if plate_processor_task is None or plate_processor_task.done():
         plate_processor_task = asyncio.create_task(process_pending_plates())
-        print("✅ Plate processor task started")
+        logger.info("✅ Plate processor task started")
     else:
-        print("ℹ️ Plate processor task already running")
+        logger.debug("ℹ️ Plate processor task already running")
+
+@router.get("/video_feed")
+async def video_feed(
+    width: int | None = Query(None, ge=1, description="Frame width in pixels (snapped to STREAM_WIDTHS)"),
+    quality: int | None = Query(None, ge=1, le=100, description="JPEG quality (snapped to STREAM_QUALITIES)"),
+    fps: float | None = Query(None, ge=0, description="Maximum frames per second (0 = every frame)"),
+    auto: bool = Query(True, description="Step quality down when the connection falls behind"),
+):
+    """Video feed endpoint with plate detection"""
+    logger.info("📡 /api/video_feed accessed")
+    start_plate_processor()
 
+    width, quality, fps = negotiate(width, quality, fps)
     return StreamingResponse(
-        generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        broadcaster.stream(width=width, quality=quality, max_fps=fps, auto=auto and STREAM_AUTO_DOWNGRADE),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}"
     )
 
+@router.get("/live.mp4")
+async def live_mp4():
+    """H.264 live view as a fragmented MP4 stream (same detections as /video_feed)"""
+    if not live_video.available():
+        raise HTTPException(status_code=503, detail="Live video requires PyAV (pip install av)")
+
+    logger.info("📡 /api/live.mp4 accessed")
+    start_plate_processor()
+    return StreamingResponse(live_encoder.stream(), media_type="video/mp4",
+                             headers={"Cache-Control": "no-store"})
+
+@router.websocket("/live/ws")
+async def live_ws(websocket: WebSocket):
+    """H.264 live view for Media Source Extensions players (see api/live_video.py)"""
+    await websocket.accept()
+    if not live_video.available():
+        await websocket.send_json({"type": "error", "detail": "Live video requires PyAV (pip install av)"})
+        await websocket.close()
+        return
+
+    logger.info("📡 /api/live/ws connected")
+    start_plate_processor()
+    viewer = live_encoder.join()
+    try:
+        while True:
+            item = await viewer.next_item()
+            if item is None:
+                break
+            kind, data = item
+            if kind == "init":
+                await websocket.send_json({"type": "init", "mime": live_encoder.mime})
+            await websocket.send_bytes(data)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_encoder.leave(viewer)
+
 @router.post("/stop_camera")
 async def stop_camera():
     """Stop the camera stream"""
-    global camera_active
-    camera_active = False
-    release_camera()
-    await asyncio.sleep(0.5)  # Give time for cleanup
+    # Waits for the producer thread to finish its current frame
+    await asyncio.to_thread(stop_stream)
     return {"status": "Camera stopped"}
@@ -0,0 +1,120 @@
+"""
+Change Feed
+Turns committed log and vehicle changes into WebSocket events (see
+api/websocket_manager.py), so dashboards can follow the tables without
+refetching them.
+
+Changes are collected from SQLAlchemy session events and published only
+after the transaction commits; a rollback drops them. New logs go to the
+"registered" or "unregistered" topic by status, vehicle changes to
+"vehicles", and clearing the logs goes to both log topics.
+
+Logs from live detections (camera stream, single uploads, fresh edge
+events) should be marked with mark_live(); the dashboard shows only those
+in its live panel. Back-filled and manually added logs are sent with
+"live": false.
+"""
+
+import logging
+
+from sqlalchemy import event
+
+from api import models
+from api.collection_versions import versions
+from api.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+LOG_TOPICS = ("registered", "unregistered")
+TOPIC_TABLES = {"registered": "logs", "unregistered": "logs", "vehicles": "vehicles"}
+
+
+def mark_live(db, log: models.Log, **extra):
+    """Flag a new log as a live detection; `extra` fields (e.g. camera_id) are added to its event"""
+    db.info.setdefault("live_logs", {})[log] = extra
+
+
+def vehicle_fields(vehicle: models.Vehicle) -> dict:
+    return {
+        "id": vehicle.id,
+        "plate_number": vehicle.plate_number,
+        "name": vehicle.name,
+        "purpose": vehicle.purpose,
+        "profile_picture": vehicle.profile_picture,
+        "date_registered": str(vehicle.date_registered) if vehicle.date_registered else None,
+    }
+
+
+def log_event(session, log: models.Log, live: dict | None) -> dict:
+    message = {
+        "type": "log",
+        "action": "created",
+        "log_id": log.id,
+        "plate_number": log.plate_number,
+        "status": log.status,
+        "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+        "vehicle_id": log.vehicle_id,
+        "live": live is not None,
+        **(live or {}),
+    }
+    vehicle = session.get(models.Vehicle, log.vehicle_id) if log.vehicle_id else None
+    if vehicle is not None:
+        # Same shape the dashboard has always received for registered plates
+        message["vehicle"] = {
+            "name": vehicle.name,
+            "purpose": vehicle.purpose,
+            "profile_picture": vehicle.profile_picture
+        }
+    return message
+
+
+def bump_remote_versions(topics, message, origin):
+    """Changes committed by another API worker invalidate this worker's ETags too"""
+    if origin != manager.origin:
+        versions.bump(*{TOPIC_TABLES[topic] for topic in topics if topic in TOPIC_TABLES})
+
+
+def _pending(session) -> list:
+    return session.info.setdefault("change_events", [])
+
+
+def track_changes(session_factory):
+    """Publish log/vehicle changes after each commit of a session_factory session"""
+    manager.add_listener(bump_remote_versions)
+
+    @event.listens_for(session_factory, "after_flush")
+    def _after_flush(session, flush_context):
+        pending = _pending(session)
+        live_logs = session.info.get("live_logs", {})
+        for obj in session.new:
+            if isinstance(obj, models.Log):
+                topic = "registered" if obj.status == "registered" else "unregistered"
+                pending.append(((topic,), log_event(session, obj, live_logs.get(obj))))
+            elif isinstance(obj, models.Vehicle):
+                pending.append((("vehicles",), {"type": "vehicle", "action": "created",
+                                                "vehicle": vehicle_fields(obj)}))
+        for obj in session.dirty:
+            if isinstance(obj, models.Vehicle) and session.is_modified(obj):
+                pending.append((("vehicles",), {"type": "vehicle", "action": "updated",
+                                                "vehicle": vehicle_fields(obj)}))
+        for obj in session.deleted:
+            if isinstance(obj, models.Vehicle):
+                pending.append((("vehicles",), {"type": "vehicle", "action": "deleted",
+                                                "vehicle": {"id": obj.id, "plate_number": obj.plate_number}}))
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _bulk_write(state):
+        # Only "DELETE FROM logs" (clear all) is done in bulk today
+        if state.is_delete and any(mapper.class_ is models.Log for mapper in state.all_mappers):
+            _pending(state.session).append((LOG_TOPICS, {"type": "logs", "action": "cleared"}))
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        session.info.pop("live_logs", None)
+        for topics, message in session.info.pop("change_events", []):
+            manager.publish(message, topics)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("live_logs", None)
+        session.info.pop("change_events", None)
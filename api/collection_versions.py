@@ -0,0 +1,138 @@
+"""
+Collection Versions
+A version counter per table (vehicles, logs) that moves whenever a
+committed transaction changed it, so list endpoints can answer conditional
+GETs (If-None-Match / If-Modified-Since) with 304 without querying the
+database.
+
+Changes are picked up from SQLAlchemy session events, so every writer using
+SessionLocal counts, whether it's a route, the camera loop or the ingestion
+endpoint. The ETag includes a random per-process epoch, so tags issued
+before a restart never match the counters after it.
+"""
+
+import logging
+import secrets
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes are tracked
+TRACKED_TABLES = ("vehicles", "logs")
+
+# Make browsers revalidate every time (and get 304s) instead of guessing freshness
+CACHE_CONTROL = "private, no-cache"
+
+
+class CollectionVersions:
+    def __init__(self, names=TRACKED_TABLES):
+        self.epoch = secrets.token_hex(4)
+        started = time.time()
+        self._versions = {name: 0 for name in names}
+        self._modified = {name: started for name in names}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def bump(self, *names):
+        now = time.time()
+        with self._lock:
+            for name in names:
+                if name in self._versions:
+                    self._versions[name] += 1
+                    self._modified[name] = now
+        for listener in self._listeners:
+            listener(names)
+
+    def add_listener(self, listener):
+        """Call listener(names) after every bump"""
+        self._listeners.append(listener)
+
+    def version(self, name: str) -> int:
+        return self._versions[name]
+
+    def etag(self, *names) -> str:
+        with self._lock:
+            parts = "-".join(str(self._versions[name]) for name in names)
+        # Weak: the same data may be sent gzip/brotli-encoded or not
+        return f'W/"{self.epoch}-{parts}"'
+
+    def last_modified(self, *names) -> float:
+        with self._lock:
+            return max(self._modified[name] for name in names)
+
+
+versions = CollectionVersions()
+
+
+def conditional(request: Request, response: Response, *names) -> Response | None:
+    """
+    Set ETag/Last-Modified/Cache-Control for a response built from `names`.
+    Returns a 304 response to send instead if the client's copy is current.
+    """
+    etag = versions.etag(*names)
+    modified = versions.last_modified(*names)
+    # HTTP dates have whole-second resolution: until the second of the last
+    # change is over, another change could carry the same date, so no
+    # Last-Modified is given (or trusted) for it yet and the ETag decides
+    settled = int(modified) < int(time.time())
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if settled:
+        headers["Last-Modified"] = formatdate(modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        fresh = if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and settled:
+            try:
+                fresh = int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _changed_tables(session) -> set:
+    return session.info.setdefault("changed_tables", set())
+
+
+def track_sessions(session_factory):
+    """Bump versions after commits that touched a tracked table"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _after_flush(session, flush_context):
+        changed = _changed_tables(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table in TRACKED_TABLES:
+                changed.add(table)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _bulk_write(state):
+        # query(...).delete() / .update() bypass the flush
+        if state.is_delete or state.is_update:
+            for mapper in state.all_mappers:
+                if mapper.local_table.name in TRACKED_TABLES:
+                    _changed_tables(state.session).add(mapper.local_table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        changed = session.info.pop("changed_tables", None)
+        if changed:
+            versions.bump(*changed)
+            logger.debug("🔖 Collection versions bumped: %s", ", ".join(sorted(changed)))
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("changed_tables", None)
@@ -0,0 +1,132 @@
+"""
+Response Compression
+ASGI middleware that compresses large JSON responses (vehicle and log lists)
+with brotli or gzip, depending on what the client accepts and whether the
+optional `brotli` package is installed.
+
+Only responses sent in one piece are touched. Streaming responses (the MJPEG
+feed, NDJSON batch results, evidence images) pass through as they are, so
+nothing is buffered and frames aren't delayed.
+
+Every JSON response carries `Vary: Accept-Encoding`, compressed or not, so a
+cache never hands a gzip body to a client that didn't ask for one (or the
+other way round).
+"""
+
+import gzip
+import importlib.util
+import logging
+
+from api.config import COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+logger = logging.getLogger(__name__)
+
+if importlib.util.find_spec("brotli") is not None:
+    import brotli
+else:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json",)
+
+
+def accepted_encodings(header: str) -> set:
+    """Codings from an Accept-Encoding header, minus any refused with q=0"""
+    codings = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        if coding and q > 0:
+            codings.add(coding)
+    return codings
+
+
+def choose_encoding(header: str) -> str | None:
+    codings = accepted_encodings(header)
+    if brotli is not None and "br" in codings:
+        return "br"
+    if "gzip" in codings:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def add_vary(headers) -> list:
+    """Headers list with Accept-Encoding added to Vary (caches must key on it)"""
+    headers = list(headers)
+    for i, (name, value) in enumerate(headers):
+        if name == b"vary":
+            if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_bytes: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (content_type.split(";")[0].strip() not in COMPRESSIBLE_TYPES
+                        or b"content-encoding" in headers):
+                    await send(message)
+                    return
+                # Whether or not this one gets compressed, another Accept-Encoding could change that
+                message = {**message, "headers": add_vary(message.get("headers", []))}
+                if encoding is None:
+                    await send(message)
+                    return
+                # Hold the start until the body shows whether it's worth it
+                start = message
+                return
+
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            pending, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_bytes:
+                # Streamed in pieces, or too small to bother
+                await send(pending)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [(k, v) for k, v in pending["headers"] if k != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
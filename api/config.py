@@ -8,8 +8,13 @@ import os
 # 0 for default laptop camera
 # 1, 2, etc. for external USB cameras
 # "rtsp://username:password@ip_address:554/stream" for IP cameras
+# "path/to/video.mp4" or "path/to/images/" to replay recordings (see REPLAY SETTINGS)
 CAMERA_SOURCE = 0
 
+# Capture resolution to request from the camera, e.g. (1920, 1080)
+# None = keep the camera's native resolution
+CAMERA_RESOLUTION = None
+
 # =============================================================================
 # ESP32 CONFIGURATION
 # =============================================================================
@@ -29,6 +34,107 @@ ESP32_ENABLED = True
 API_HOST = "127.0.0.1"
 API_PORT = 8000
 
+# =============================================================================
+# AUTH SETTINGS
+# =============================================================================
+
+# Vehicle, log, detection and evidence routes need a login token. Verified tokens are
+# cached (by SHA-256 of the token) until they expire, so checking one costs
+# a dictionary lookup instead of a JWT decode per request
+TOKEN_CACHE_MAX_ENTRIES = 1024
+
+# bcrypt runs on its own small thread pool. At most AUTH_MAX_PENDING_LOGINS
+# logins are accepted at once (429 past that), and one waiting longer than
+# AUTH_LOGIN_QUEUE_TIMEOUT seconds for a bcrypt thread gets 503
+AUTH_BCRYPT_WORKERS = 2
+AUTH_MAX_PENDING_LOGINS = 16
+AUTH_LOGIN_QUEUE_TIMEOUT = 5.0
+
+# Shared secret edge detectors send (as a bearer token) to /api/ingest; set
+# the same value on the server and on every edge box. None = ingest only
+# accepts a dashboard login token.
+EDGE_API_TOKEN = None
+
+# After LOGIN_MAX_FAILURES failed logins within LOGIN_FAILURE_WINDOW_SECONDS,
+# further attempts from that address get HTTP 429 until the window has
+# passed. Checked before bcrypt runs.
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW_SECONDS = 300
+
+# =============================================================================
+# RESPONSE SETTINGS (caching and compression)
+# =============================================================================
+
+# Vehicle and log lists carry an ETag that changes whenever the table does;
+# a client sending it back in If-None-Match gets 304 without a database query.
+# JSON responses of at least COMPRESSION_MIN_BYTES are compressed for clients
+# that accept it: brotli when the optional `brotli` package is installed,
+# gzip otherwise. Streams (video, NDJSON) are never compressed.
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# =============================================================================
+# WEBSOCKET SETTINGS (/ws/detections)
+# =============================================================================
+
+# Log and vehicle changes are numbered and the last WS_HISTORY_SIZE kept, so
+# a dashboard reconnecting with ?since=<seq> gets only what it missed.
+# Further behind than that, it is told to refetch everything.
+WS_HISTORY_SIZE = 1000
+
+# A client with this many events still unsent is disconnected (it can
+# resume with since=) rather than buffered without limit
+WS_CLIENT_MAX_BACKLOG = 2000
+
+# How events reach dashboards connected to other API workers
+# (uvicorn --workers N, or several servers behind a load balancer):
+#   "memory" - single worker only (default)
+#   "sqlite" - workers on this machine share PUBSUB_SQLITE_FILE, polled
+#              every PUBSUB_POLL_INTERVAL seconds
+#   "redis"  - workers anywhere share the Redis server at PUBSUB_REDIS_URL
+#              (pip install redis)
+PUBSUB_BACKEND = "memory"
+PUBSUB_SQLITE_FILE = "pubsub.db"
+PUBSUB_POLL_INTERVAL = 0.05
+PUBSUB_REDIS_URL = "redis://localhost:6379/0"
+PUBSUB_CHANNEL = "plate_system:events"
+
+# =============================================================================
+# LIVE STREAM SETTINGS (/api/video_feed)
+# =============================================================================
+
+# Frames are scaled down for viewing only; OCR always uses the full frame.
+# Viewers can ask for their own settings, e.g.
+#   /api/video_feed?width=480&quality=45&fps=10
+# Requests are snapped to the nearest tiers below so viewers with similar
+# settings share one encoded JPEG per frame.
+STREAM_WIDTHS = [320, 480, 640, 960, 1280]
+STREAM_QUALITIES = [30, 45, 60, 75, 90]
+
+# Defaults for viewers that don't ask (max fps 0 = every camera frame)
+STREAM_WIDTH = 640
+STREAM_QUALITY = 60
+STREAM_MAX_FPS = 0
+
+# Step a viewer down a tier (quality first, then width) when its connection
+# falls behind, i.e. sending a frame takes longer than STREAM_SLOW_SEND_SECONDS
+# on average; step back up once it has kept up for a while.
+# Viewers can opt out with ?auto=0
+STREAM_AUTO_DOWNGRADE = True
+STREAM_SLOW_SEND_SECONDS = 0.2
+
+# H.264 live view (/api/live.mp4 and /api/live/ws), a lower-bandwidth
+# alternative to the MJPEG feed. Requires `pip install av`.
+# Frames are encoded once for all viewers; a keyframe every
+# LIVE_VIDEO_KEYFRAME_SECONDS is where new or lagging viewers (re)join.
+LIVE_VIDEO_CODEC = "libx264"
+LIVE_VIDEO_WIDTH = 960
+LIVE_VIDEO_FPS = 15
+LIVE_VIDEO_KEYFRAME_SECONDS = 2.0
+LIVE_VIDEO_BITRATE = 1_000_000       # bits per second
+LIVE_VIDEO_MAX_BUFFER_SECONDS = 2.0  # per-viewer backlog before skipping ahead
+
 # =============================================================================
 # DETECTION SETTINGS
 # =============================================================================
@@ -36,20 +142,229 @@ API_PORT = 8000
 # Minimum confidence score (0.0 to 1.0) for a detection to be considered valid
 CONFIDENCE_THRESHOLD = 0.60
 
-# Number of times a plate must be seen in the buffer to be confirmed
-VERIFICATION_COUNT = 3
-
-# Number of frames to keep in buffer for temporal verification
+# Number of recent reads kept for temporal verification
 BUFFER_SIZE = 5
 
+# Temporal verification votes per character: each read adds its OCR
+# confidence to the character it saw at each position. A plate is confirmed
+# when every position has at least VOTE_CONFIRM_WEIGHT total confidence and
+# at least VOTE_MIN_SHARE of that position's votes, from VOTE_MIN_READS reads.
+# e.g. two reads at 0.8 confidence that agree fully confirm a plate; one
+# misread character no longer resets confirmation.
+VOTE_CONFIRM_WEIGHT = 1.5
+VOTE_MIN_SHARE = 0.6
+VOTE_MIN_READS = 2
+
+
 
+# Accepted plate formats (L = letter, D = digit). OCR reads are corrected
+# position-by-position to fit one of these (e.g. "ABC 1Z34" -> "ABC1234");
+# reads that can't fit any format are discarded.
+PLATE_FORMATS = [
+    "LLLDDDD",   # 4-wheel vehicles, 2014 series (ABC 1234)
+    "LLLDDD",    # 4-wheel vehicles, 1981-2014 series (ABC 123)
+    "LLDDDDD",   # Motorcycles, 2014 series (AB 12345)
+    "DDDLLL",    # Motorcycles, older series (123 ABC)
+    "LLDDDD",    # Motorcycles / tricycles, legacy (AB 1234)
+    "DDDDLL",    # Motorcycles, legacy (1234 AB)
+]
+
+# Multi-vehicle tracking: each text region in the ROI is followed as a
+# "track" with its own votes, so several vehicles don't block each other.
+# A region continues a track if it overlaps it (IoU) or its center moved less
+# than TRACK_MAX_DISTANCE pixels. Tracks unseen for TRACK_MAX_AGE seconds end.
+TRACK_IOU_THRESHOLD = 0.3
+TRACK_MAX_DISTANCE = 80
+TRACK_MAX_AGE = 2.0
 
 # Seconds before the same plate can be re-logged
 COOLDOWN_SECONDS = 30
 
+# Maximum plates remembered for cooldown (oldest are forgotten first)
+COOLDOWN_MAX_ENTRIES = 10000
+
+# Keep cooldowns in the database so they survive restarts and are shared by
+# every camera/process using it (False = in memory only)
+COOLDOWN_PERSIST = True
+
+# Region of interest per camera, as polygons in normalized coordinates
+# (0.0-1.0 of frame width/height). Keys are CAMERA_SOURCE values as strings;
+# "default" applies to cameras without their own entry.
+# e.g. "rtsp://.../gate": [(0.1, 0.5), (0.9, 0.4), (0.9, 0.9), (0.1, 0.95)]
+ROI_POLYGONS = {
+    "default": [(0.2, 0.3), (0.8, 0.3), (0.8, 0.7), (0.2, 0.7)],
+}
+
+# Learn where plates appear from confirmed detections and shrink the ROI to
+# that area (saved to ROI_CALIBRATION_FILE). Start with a generous ROI —
+# calibration only narrows it down.
+ROI_AUTO_CALIBRATE = False
+ROI_CALIBRATION_FILE = "roi_calibration.json"
+ROI_CALIBRATION_MIN_SAMPLES = 20   # confirmed plates before the ROI is adjusted
+ROI_CALIBRATION_MARGIN = 0.25      # extra space around learned area (share of its size)
+
+# Multi-scale OCR: text is located on the ROI scaled down to this width, then
+# each plate region is recognized from the full-resolution crop
+# (small/distant plates keep all their pixels)
+OCR_DETECT_WIDTH = 640
+
+# Run OCR preprocessing (grayscale, CLAHE, sharpening) through OpenCV's
+# OpenCL T-API. Can help on machines with an integrated GPU; falls back to
+# the CPU automatically if OpenCL isn't available.
+OCR_USE_UMAT = False
+
 # Process OCR every Nth frame (Lower = Faster detection, Higher = Better performance)
 OCR_FRAME_INTERVAL = 15
 
 # Use GPU for EasyOCR? (True/False)
 # Set to True only if you have an NVIDIA GPU with CUDA installed
 USE_GPU = False
+
+# OCR inference backend:
+# "torch" = EasyOCR's PyTorch models (default)
+# "onnx"  = same models exported to ONNX Runtime (faster on CPU-only machines)
+#           Requires `pip install onnx onnxruntime`; models are exported to
+#           OCR_ONNX_DIR on first use (or run `python -m api.ocr_onnx`)
+OCR_BACKEND = "torch"
+OCR_ONNX_DIR = "models/onnx"
+OCR_ONNX_INT8 = True          # Use INT8-quantized weights
+OCR_ONNX_DETECTOR = False     # Also run text detection (CRAFT) through ONNX
+OCR_ONNX_THREADS = 0          # ONNX Runtime threads (0 = library default)
+
+# Number of OCR worker processes (0 = run OCR inside the API process)
+# Each worker loads its own copy of the model (~300 MB RAM), so keep this at
+# or below the number of physical CPU cores
+OCR_WORKERS = 0
+
+# Frames are handed to workers through shared memory: number of in-flight
+# frames and the size of each slot (default fits a 1080p BGR frame).
+# Larger images still work but are copied through the queue instead.
+OCR_SHM_SLOTS = 4
+OCR_SHM_SLOT_BYTES = 1920 * 1080 * 3
+
+# Torch CPU threads per worker (0 = CPU cores / OCR_WORKERS)
+OCR_WORKER_THREADS = 0
+
+# Seconds to wait for a worker's OCR result before giving up on it
+# (a worker that dies fails its tasks within a second and is restarted)
+OCR_WORKER_TIMEOUT = 60
+
+# Images per batched OCR call for /api/detect/batch (same-size images only;
+# while a batch runs the live stream waits for the OCR engine)
+OCR_BATCH_SIZE = 4
+
+# Load and warm up the OCR model in the background when the server starts
+# The API serves requests immediately; GET /api/health/ready turns 200 once warm
+# False = load on the first detection instead (slow first read)
+OCR_WARM_UP_ON_STARTUP = True
+
+# =============================================================================
+# LOGGING SETTINGS
+# =============================================================================
+
+# Log level for the backend: "DEBUG", "INFO", "WARNING", "ERROR"
+# DEBUG also prints raw OCR results (rate-limited, see below)
+LOG_LEVEL = "INFO"
+
+# Output format: "text" (human readable) or "json" (one object per line)
+LOG_FORMAT = "text"
+
+# Minimum seconds between repeated OCR debug messages from the same line
+OCR_LOG_INTERVAL = 3.0
+
+# =============================================================================
+# EVIDENCE SETTINGS (snapshots of confirmed plates)
+# =============================================================================
+
+# Save the plate crop and a small full-frame thumbnail for every logged
+# detection. Images are appended to pack files under EVIDENCE_DIR/<date>/
+# by a background thread and fetched via GET /api/evidence/<log id>/<kind>
+EVIDENCE_ENABLED = True
+EVIDENCE_DIR = "evidence"
+EVIDENCE_THUMBNAIL_WIDTH = 320
+EVIDENCE_JPEG_QUALITY = 85
+
+# Start a new pack file once the current one reaches this size
+EVIDENCE_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Delete the oldest pack files once all evidence exceeds this size
+EVIDENCE_MAX_TOTAL_BYTES = 2 * 1024 * 1024 * 1024
+
+# Snapshots waiting to be written; more are dropped (with a warning) rather
+# than slowing down detection
+EVIDENCE_QUEUE_SIZE = 100
+
+# =============================================================================
+# UPLOAD SETTINGS (/api/detect)
+# =============================================================================
+
+# Uploaded photos are decoded and OCRed on a small worker pool, off the event
+# loop. At most UPLOAD_MAX_IN_FLIGHT uploads are accepted at once (running or
+# waiting); more get HTTP 429, and one still waiting for a worker after
+# UPLOAD_QUEUE_TIMEOUT seconds gets HTTP 503. Both include Retry-After.
+UPLOAD_WORKERS = 2
+UPLOAD_MAX_IN_FLIGHT = 8
+UPLOAD_QUEUE_TIMEOUT = 10.0
+
+# Back-filling from phone photos or DVR exports: many images (or zip files of
+# images) per request, results streamed back as NDJSON
+BATCH_MAX_IMAGES = 500
+BATCH_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Threads decoding uploaded images while OCR runs on earlier ones
+BATCH_DECODE_WORKERS = 4
+
+# Full-size images a batch holds at once (decoding or waiting for a same-size
+# OCR batch); when reached, the biggest partial batch is read early
+BATCH_IMAGES_IN_FLIGHT = BATCH_DECODE_WORKERS + 2 * OCR_BATCH_SIZE
+
+# =============================================================================
+# EDGE CAMERA SETTINGS (api/realtime_detection.py -> /api/ingest)
+# =============================================================================
+
+# Edge detectors post confirmed plates in batches to /api/ingest/detections.
+# The server drops events it has already seen (by idempotency key) and, for
+# events captured within INGEST_LIVE_WINDOW_SECONDS, plates still in cooldown.
+# Only those fresh events show up as live detections on the dashboards; older
+# ones are a backlog being flushed after an outage and arrive as past logs.
+INGEST_MAX_EVENTS = 500
+INGEST_LIVE_WINDOW_SECONDS = 60
+
+# Edge side: which lane this detector is, and where the server is
+EDGE_CAMERA_ID = "lane-1"
+EDGE_SERVER_URL = f"http://{API_HOST}:{API_PORT}"
+
+# Events are buffered in a local SQLite file until the server acknowledges
+# them, so nothing is lost while it is unreachable; the oldest are dropped
+# past EDGE_MAX_BUFFERED_EVENTS
+EDGE_BUFFER_FILE = "edge_buffer.db"
+EDGE_MAX_BUFFERED_EVENTS = 10000
+EDGE_BATCH_SIZE = 100
+
+# Seconds between flushes when idle, and the longest retry back-off
+EDGE_FLUSH_INTERVAL = 1.0
+EDGE_MAX_BACKOFF = 60.0
+
+# Edge detector loop (python -m api.realtime_detection): OCR passes per
+# second (0 = every frame; lower it on small boxes), whether to open a
+# preview window (needs a desktop session), and how often to log fps
+EDGE_OCR_FPS = 3.0
+EDGE_DISPLAY = False
+EDGE_REPORT_SECONDS = 30
+
+# =============================================================================
+# REPLAY SETTINGS (recorded footage instead of a live camera)
+# =============================================================================
+
+# CAMERA_SOURCE may also be a video file ("footage/gate.mp4") or a folder of
+# images ("footage/stills/") — handy for testing without camera hardware.
+
+# Playback speed for recorded sources:
+# 1.0 = real time, 2.0 = twice as fast, 0 = as fast as possible
+REPLAY_SPEED = 1.0
+
+# Start over when a recording ends (useful for long-running load tests)
+REPLAY_LOOP = False
+
+# Frame rate used when replaying a folder of still images
+REPLAY_IMAGE_FPS = 5.0
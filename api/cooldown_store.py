@@ -0,0 +1,191 @@
+"""
+Cooldown Store
+Remembers recently logged plates so the same vehicle isn't logged again
+within COOLDOWN_SECONDS.
+
+In memory, entries live in a hashed timing wheel: expiry is O(1) per entry
+and happens as time advances, and the store never holds more than
+COOLDOWN_MAX_ENTRIES plates (soonest-to-expire entries are evicted first),
+so memory stays bounded no matter how long the server runs or how much OCR
+junk it sees.
+
+With COOLDOWN_PERSIST the wheel is only a front cache for a SQLite table,
+so cooldowns survive restarts and are shared by every camera and process
+using the same database.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from api.config import COOLDOWN_SECONDS, COOLDOWN_MAX_ENTRIES, COOLDOWN_PERSIST
+from api.database import engine
+from api import models
+
+logger = logging.getLogger(__name__)
+
+# Width of one wheel slot in seconds
+WHEEL_RESOLUTION = 1.0
+
+# How often expired rows are purged from SQLite
+PURGE_INTERVAL = 300
+
+
+class CooldownStore:
+    def __init__(self, ttl: float = COOLDOWN_SECONDS, max_entries: int = COOLDOWN_MAX_ENTRIES,
+                 persist: bool = COOLDOWN_PERSIST, resolution: float = WHEEL_RESOLUTION):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.resolution = resolution
+
+        self._slots = [set() for _ in range(int(math.ceil(ttl / resolution)) + 1)]
+        self._expires = {}           # plate -> expiry (epoch seconds)
+        self._tick = None            # last wheel tick processed
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self._last_purge = 0.0
+
+    def __len__(self):
+        return len(self._expires)
+
+    def __contains__(self, plate):
+        return self.in_cooldown(plate)
+
+    def in_cooldown(self, plate: str, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            expires = self._expires.get(plate)
+            return expires is not None and expires > now
+
+    def try_acquire(self, plate: str, now: float | None = None) -> bool:
+        """
+        Atomically check and start a cooldown. Returns True if the plate was
+        not cooling down (caller should log it), False if it still is.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            expires = self._expires.get(plate)
+            if expires is not None and expires > now:
+                return False
+
+            if self.persist:
+                try:
+                    acquired, expires = self._acquire_persisted(plate, now)
+                except Exception as e:
+                    # Never lose a detection because the cooldown table is unavailable
+                    logger.warning("⚠️ Cooldown table unavailable, using memory only: %s", e)
+                    acquired, expires = True, now + self.ttl
+            else:
+                acquired, expires = True, now + self.ttl
+
+            self._insert(plate, expires)
+            return acquired
+
+    def release(self, plate: str):
+        """
+        Undo a try_acquire() whose detection was never logged (e.g. its
+        transaction rolled back). Only this store's own cooldown is removed.
+        """
+        with self._lock:
+            expires = self._expires.pop(plate, None)
+            if expires is None:
+                return
+            self._slots[self._slot_index(expires)].discard(plate)
+            if self.persist and self._table_ready:
+                table = models.PlateCooldown.__table__
+                try:
+                    with engine.begin() as conn:
+                        # Left alone if another process has taken the plate since
+                        conn.execute(delete(table).where(table.c.plate_number == plate,
+                                                         table.c.expires_at == expires))
+                except Exception as e:
+                    logger.warning("⚠️ Could not release cooldown for %s: %s", plate, e)
+
+    def clear(self):
+        with self._lock:
+            for slot in self._slots:
+                slot.clear()
+            self._expires.clear()
+
+    # --- Timing wheel ---
+
+    def _slot_index(self, expires: float) -> int:
+        return int(expires // self.resolution) % len(self._slots)
+
+    def _insert(self, plate: str, expires: float):
+        old = self._expires.get(plate)
+        if old is not None:
+            self._slots[self._slot_index(old)].discard(plate)
+        elif len(self._expires) >= self.max_entries:
+            self._evict_one()
+
+        self._expires[plate] = expires
+        self._slots[self._slot_index(expires)].add(plate)
+
+    def _advance(self, now: float):
+        """Expire every slot whose time has passed since the last call"""
+        tick = int(now // self.resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+
+        # Beyond one full turn every slot has been passed at least once
+        steps = min(tick - self._tick, len(self._slots))
+        for step in range(steps):
+            slot = self._slots[(self._tick + 1 + step) % len(self._slots)]
+            for plate in [p for p in slot if self._expires[p] <= now]:
+                slot.discard(plate)
+                del self._expires[plate]
+        self._tick = max(self._tick, tick)
+
+    def _evict_one(self):
+        """Drop the entry closest to expiring"""
+        start = self._tick if self._tick is not None else 0
+        for offset in range(len(self._slots)):
+            slot = self._slots[(start + offset) % len(self._slots)]
+            if slot:
+                plate = min(slot, key=self._expires.get)
+                slot.discard(plate)
+                del self._expires[plate]
+                return
+
+    # --- SQLite backing ---
+
+    def _acquire_persisted(self, plate: str, now: float):
+        if not self._table_ready:
+            models.PlateCooldown.__table__.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+
+        table = models.PlateCooldown.__table__
+        expires = now + self.ttl
+        # Insert, or take over an expired row; an unexpired row is left alone.
+        # One statement, so concurrent processes can't both acquire the plate.
+        stmt = insert(table).values(plate_number=plate, expires_at=expires)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.plate_number],
+            set_={"expires_at": expires},
+            where=table.c.expires_at <= now,
+        )
+
+        with engine.begin() as conn:
+            acquired = conn.execute(stmt).rowcount == 1
+            if not acquired:
+                expires = conn.execute(
+                    select(table.c.expires_at).where(table.c.plate_number == plate)
+                ).scalar() or expires
+            if now - self._last_purge > PURGE_INTERVAL:
+                conn.execute(delete(table).where(table.c.expires_at <= now))
+                self._last_purge = now
+
+        return acquired, expires
+
+
+# Shared by every camera in this process
+cooldowns = CooldownStore()
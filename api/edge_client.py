@@ -0,0 +1,199 @@
+"""
+Edge Client
+Sends confirmed plates from an edge detector to the server's
+/api/ingest/detections endpoint.
+
+submit() only writes the event to a local SQLite buffer (EDGE_BUFFER_FILE)
+and returns; a background thread posts buffered events in batches over one
+keep-alive connection and deletes them once the server acknowledges them.
+While the server is unreachable events accumulate in the buffer (surviving
+restarts) and go out in bulk when it's back, with exponential back-off in
+between. Each event gets an idempotency key when it is buffered, so a batch
+resent after a lost response is not logged twice.
+
+Batches are sent with EDGE_API_TOKEN. If the server refuses it (401/403)
+the sender logs an error and only retries every EDGE_MAX_BACKOFF seconds;
+the events stay buffered until the server accepts the token again.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+import pytz
+import requests
+
+from api.config import (
+    EDGE_API_TOKEN,
+    EDGE_CAMERA_ID,
+    EDGE_SERVER_URL,
+    EDGE_BUFFER_FILE,
+    EDGE_MAX_BUFFERED_EVENTS,
+    EDGE_BATCH_SIZE,
+    EDGE_FLUSH_INTERVAL,
+    EDGE_MAX_BACKOFF
+)
+
+# Philippine timezone
+PHILIPPINE_TZ = pytz.timezone('Asia/Manila')
+
+logger = logging.getLogger(__name__)
+
+INGEST_PATH = "/api/ingest/detections"
+REQUEST_TIMEOUT = 10
+
+
+class AuthenticationError(Exception):
+    """The server refused the edge token; retrying soon won't help"""
+
+
+class EdgeClient:
+    def __init__(self, server_url: str = EDGE_SERVER_URL, camera_id: str = EDGE_CAMERA_ID,
+                 buffer_file: str = EDGE_BUFFER_FILE, max_buffered: int = EDGE_MAX_BUFFERED_EVENTS,
+                 batch_size: int = EDGE_BATCH_SIZE, flush_interval: float = EDGE_FLUSH_INTERVAL,
+                 token: str | None = EDGE_API_TOKEN, on_result=None):
+        self.url = server_url.rstrip("/") + INGEST_PATH
+        self.camera_id = camera_id
+        self.max_buffered = max_buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Called with each per-event result from the server, e.g. to print it
+        self.on_result = on_result
+        self.sent = 0
+        self.dropped = 0             # discarded because the buffer was full or rejected
+        self.online = None           # None until the first attempt
+
+        # Reuses one connection for every batch
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._db = sqlite3.connect(buffer_file, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Detector side ---
+
+    def submit(self, plate: str, confidence: float | None = None, captured_at: datetime | None = None) -> str:
+        """Buffer one detection; returns its idempotency key"""
+        key = uuid.uuid4().hex
+        payload = json.dumps({
+            "idempotency_key": key,
+            "plate_number": plate,
+            "confidence": confidence,
+            "camera_id": self.camera_id,
+            "captured_at": (captured_at or datetime.now(PHILIPPINE_TZ)).isoformat(),
+        })
+        with self._lock:
+            self._db.execute("INSERT INTO events (payload) VALUES (?)", (payload,))
+            overflow = self._pending() - self.max_buffered
+            if overflow > 0:
+                self._db.execute("DELETE FROM events WHERE id IN "
+                                 "(SELECT id FROM events ORDER BY id LIMIT ?)", (overflow,))
+                self.dropped += overflow
+                logger.warning("⚠️ Edge buffer full, dropped %d oldest event(s)", overflow)
+        self._wake.set()
+        return key
+
+    def pending(self) -> int:
+        """Events buffered but not yet acknowledged by the server"""
+        with self._lock:
+            return self._pending()
+
+    def _pending(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    # --- Sending ---
+
+    def flush(self) -> int:
+        """
+        Post one batch of the oldest buffered events and drop the ones the
+        server answered for. Returns how many were sent (0 if none were
+        buffered); raises requests.RequestException if the server can't be
+        reached or answers with a retryable error, and AuthenticationError
+        if it refuses the token.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, payload FROM events ORDER BY id LIMIT ?",
+                                    (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+
+        events = [json.loads(payload) for _, payload in rows]
+        response = self.session.post(self.url, json={"events": events}, timeout=REQUEST_TIMEOUT)
+        if response.status_code in (401, 403):
+            raise AuthenticationError(f"HTTP {response.status_code}: {response.text}")
+        if response.status_code == 422:
+            # Malformed events would be rejected forever; don't let them block the rest
+            logger.error("❌ Server rejected %d buffered event(s), discarding: %s", len(rows), response.text)
+            self.dropped += len(rows)
+        else:
+            # 429/5xx etc.: keep the events and try again later
+            response.raise_for_status()
+            if self.on_result:
+                for result in response.json()["results"]:
+                    self.on_result(result)
+            self.sent += len(rows)
+
+        with self._lock:
+            self._db.executemany("DELETE FROM events WHERE id = ?", [(row_id,) for row_id, _ in rows])
+        return len(rows)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="edge-client", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the sender after one last attempt to flush; unsent events stay buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.session.close()
+        self._db.close()
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                while self.flush() == self.batch_size:
+                    pass                 # more waiting: keep going
+                if self.online is False:
+                    logger.info("✅ Server reachable again, buffer flushed")
+                self.online = True
+                backoff = self.flush_interval
+            except AuthenticationError as e:
+                logger.error("❌ Server refused the edge token (check EDGE_API_TOKEN), "
+                             "retrying in %ds; %d event(s) stay buffered: %s", EDGE_MAX_BACKOFF, self.pending(), e)
+                self.online = False
+                # Until the server side is fixed (e.g. token added there), no point retrying sooner
+                backoff = EDGE_MAX_BACKOFF
+            except (requests.RequestException, ValueError) as e:
+                if self.online is not False:
+                    logger.warning("⚠️ Server unreachable, buffering detections locally: %s", e)
+                self.online = False
+                backoff = min(backoff * 2, EDGE_MAX_BACKOFF)
+            if stopping:
+                return
+            if self.online:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+            else:
+                # New detections don't cut the back-off short; stop() does
+                self._stop.wait(backoff)
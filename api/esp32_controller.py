@@ -5,9 +5,12 @@ Sends HTTP requests to ESP32 to control LEDs and buzzer based on vehicle registr
 
 import requests
 import asyncio
+import logging
 from typing import Literal
 from api.config import ESP32_IP, ESP32_PORT, ESP32_ENABLED
 
+logger = logging.getLogger(__name__)
+
 # Timeout for HTTP requests (seconds)
 REQUEST_TIMEOUT = 5
 
@@ -32,7 +35,7 @@ class ESP32Controller:
             self.is_connected = response.status_code == 200
             return self.is_connected
         except requests.exceptions.RequestException as e:
-            print(f"❌ ESP32 connection failed: {e}")
+            logger.warning("❌ ESP32 connection failed: %s", e)
             self.is_connected = False
             return False
 
@@ -43,29 +46,29 @@ class ESP32Controller:
 
         try:
             url = f"{self.base_url}{endpoint}"
-            print(f"📡 Sending request to ESP32: {url}")
+            logger.debug("📡 Sending request to ESP32: %s", url)
             loop = asyncio.get_event_loop()
             response = await loop.run_in_executor(None, lambda: requests.get(url, timeout=REQUEST_TIMEOUT))
 
             if response.status_code == 200:
-                print(f"✅ ESP32 response: {response.text.strip()}")
+                logger.info("✅ ESP32 response: %s", response.text.strip())
                 return True, "Success"
             else:
                 msg = f"ESP32 returned status {response.status_code}"
-                print(f"⚠️ {msg}")
+                logger.warning("⚠️ %s", msg)
                 return False, msg
 
         except requests.exceptions.Timeout:
             msg = f"ESP32 request timeout (>{REQUEST_TIMEOUT}s) - Command assumed sent"
-            print(f"⏱️ {msg}")
+            logger.warning("⏱️ %s", msg)
             return True, msg  # Return True because hardware is responding despite timeout
         except requests.exceptions.ConnectionError:
             msg = f"Cannot connect to ESP32 at {self.base_url}"
-            print(f"❌ {msg}")
+            logger.error("❌ %s", msg)
             return False, msg
         except Exception as e:
             msg = f"ESP32 request error: {str(e)}"
-            print(f"❌ {msg}")
+            logger.error("❌ %s", msg)
             return False, msg
 
     async def trigger_registered(self) -> tuple[bool, str]:
@@ -92,7 +95,7 @@ class ESP32Controller:
         """Update ESP32 IP address"""
         self.ip = new_ip
         self.base_url = f"http://{new_ip}:{self.port}"
-        print(f"🔄 ESP32 IP updated to: {new_ip}")
+        logger.info("🔄 ESP32 IP updated to: %s", new_ip)
 
 
 # Singleton instance
@@ -115,9 +118,9 @@ async def trigger_esp32(status: Literal["registered", "unregistered"]):
         elif status == "unregistered":
             await esp32.trigger_unregistered()
         else:
-            print(f"⚠️ Invalid ESP32 status: {status}")
+            logger.warning("⚠️ Invalid ESP32 status: %s", status)
     except Exception as e:
-        print(f"❌ ESP32 trigger error: {e}")
+        logger.error("❌ ESP32 trigger error: %s", e)
 
 
 # Helper function for testing
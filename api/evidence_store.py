@@ -0,0 +1,247 @@
+"""
+Evidence Store
+Append-only on-disk storage for detection snapshots.
+
+Images are JPEG-encoded by a background writer thread and appended to pack
+files partitioned by date:
+
+    EVIDENCE_DIR/2025-01-31/evidence-0001.pack
+    EVIDENCE_DIR/2025-01-31/evidence-0002.pack   (after EVIDENCE_SEGMENT_MAX_BYTES)
+
+Each image is one byte range in a pack file; the `evidence` table maps
+(log id, kind) to (segment, offset, length), so SQLite only holds a few
+small columns per image and the blobs never bloat the database. Once the
+whole store exceeds EVIDENCE_MAX_TOTAL_BYTES (checked after every write)
+the oldest pack files are deleted together with their index rows; the pack
+being written is never deleted, so the store can overshoot by up to one
+EVIDENCE_SEGMENT_MAX_BYTES.
+
+The detection loop only copies pixels and enqueues them (submit never
+blocks); encoding and disk I/O happen on the writer thread.
+"""
+
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from api.config import (
+    EVIDENCE_DIR,
+    EVIDENCE_JPEG_QUALITY,
+    EVIDENCE_SEGMENT_MAX_BYTES,
+    EVIDENCE_MAX_TOTAL_BYTES,
+    EVIDENCE_QUEUE_SIZE,
+    EVIDENCE_THUMBNAIL_WIDTH
+)
+from api.database import SessionLocal
+from api import models
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "evidence-"
+SEGMENT_SUFFIX = ".pack"
+
+
+def capture(frame, box=None, padding: float = 0.15):
+    """
+    Copy what should be kept as evidence from a frame: the plate region
+    (box = (x0, y0, x1, y1) in frame pixels, padded) and a small thumbnail
+    of the whole frame. Copies, so the frame buffer can be reused at once.
+    """
+    import cv2
+
+    images = {}
+    h, w = frame.shape[:2]
+    if box is not None:
+        x0, y0, x1, y1 = box
+        pad_x, pad_y = (x1 - x0) * padding, (y1 - y0) * padding
+        x0, y0 = max(0, int(x0 - pad_x)), max(0, int(y0 - pad_y))
+        x1, y1 = min(w, int(x1 + pad_x)), min(h, int(y1 + pad_y))
+        if x1 > x0 and y1 > y0:
+            images["roi"] = frame[y0:y1, x0:x1].copy()
+    scale = min(1.0, EVIDENCE_THUMBNAIL_WIDTH / w)
+    images["thumbnail"] = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return images
+
+
+class EvidenceStore:
+    def __init__(self, root: str = EVIDENCE_DIR, segment_max_bytes: int = EVIDENCE_SEGMENT_MAX_BYTES,
+                 max_total_bytes: int = EVIDENCE_MAX_TOTAL_BYTES, queue_size: int = EVIDENCE_QUEUE_SIZE,
+                 jpeg_quality: int = EVIDENCE_JPEG_QUALITY):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.jpeg_quality = jpeg_quality
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None            # open pack file being appended to
+        self._segment = None         # its path relative to root
+        self._day = None
+        self._total_bytes = 0        # size of every pack file, kept up to date by the writer
+
+    # --- Producer side ---
+
+    def submit(self, log_id: int, images: dict, timestamp: datetime | None = None) -> bool:
+        """Queue {kind: BGR image} for log_id. Returns False if the queue is full."""
+        if not images:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((log_id, images, timestamp or datetime.now()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("⚠️ Evidence queue full, dropped snapshot for log %s", log_id)
+            return False
+
+    def flush(self):
+        """Wait until everything queued so far is on disk"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="evidence-writer", daemon=True)
+                    self._thread.start()
+
+    # --- Reader side ---
+
+    def path(self, segment: str) -> str:
+        return os.path.join(self.root, segment)
+
+    def read(self, record, start: int = 0, end: int | None = None) -> bytes:
+        """Bytes [start, end] (inclusive) of one evidence record"""
+        end = record.length - 1 if end is None else min(end, record.length - 1)
+        with open(self.path(record.segment), "rb") as f:
+            f.seek(record.offset + start)
+            return f.read(end - start + 1)
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    break
+                self._write(*job)
+            except Exception as e:
+                logger.exception("❌ Failed to store evidence: %s", e)
+            finally:
+                self._queue.task_done()
+        self._close_segment()
+
+    def _write(self, log_id: int, images: dict, timestamp: datetime):
+        import cv2
+
+        records = []
+        jpeg_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        for kind, image in images.items():
+            ok, encoded = cv2.imencode(".jpg", image, jpeg_params)
+            if not ok:
+                continue
+            data = encoded.tobytes()
+            segment, offset = self._append(data, timestamp)
+            records.append(models.Evidence(log_id=log_id, kind=kind, segment=segment,
+                                           offset=offset, length=len(data), created_at=timestamp))
+        if not records:
+            return
+        self._file.flush()
+
+        db = SessionLocal()
+        try:
+            db.add_all(records)
+            db.commit()
+        finally:
+            db.close()
+        logger.debug("📸 Stored %d evidence image(s) for log %s", len(records), log_id)
+
+        if self._total_bytes > self.max_total_bytes:
+            self._enforce_limit()
+
+    def _append(self, data: bytes, timestamp: datetime):
+        day = timestamp.strftime("%Y-%m-%d")
+        if self._file is None or day != self._day or self._file.tell() + len(data) > self.segment_max_bytes:
+            self._rotate(day)
+        offset = self._file.tell()
+        self._file.write(data)
+        self._total_bytes += len(data)
+        return self._segment, offset
+
+    def _rotate(self, day: str):
+        self._close_segment()
+        directory = os.path.join(self.root, day)
+        os.makedirs(directory, exist_ok=True)
+
+        existing = sorted(name for name in os.listdir(directory)
+                          if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        number = int(existing[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if existing else 1
+        self._segment = f"{day}/{SEGMENT_PREFIX}{number:04d}{SEGMENT_SUFFIX}"
+        self._day = day
+        # Append-only: never rewrite existing bytes, offsets stay valid
+        self._file = open(self.path(self._segment), "ab")
+        logger.info("📁 Evidence segment opened: %s", self._segment)
+
+        # Also picks up the total from disk when the writer starts
+        self._enforce_limit()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _segments(self):
+        """All pack files, oldest first, as (relative path, size)"""
+        if not os.path.isdir(self.root):
+            return []
+        segments = []
+        for day in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, day)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                    segments.append((f"{day}/{name}", os.path.getsize(os.path.join(directory, name))))
+        return segments
+
+    def _enforce_limit(self):
+        segments = self._segments()
+        total = sum(size for _, size in segments)
+        expired = []
+        for segment, size in segments:
+            if total <= self.max_total_bytes or segment == self._segment:
+                break
+            expired.append(segment)
+            total -= size
+        self._total_bytes = total
+        if not expired:
+            return
+
+        db = SessionLocal()
+        try:
+            db.query(models.Evidence).filter(models.Evidence.segment.in_(expired)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        for segment in expired:
+            os.remove(self.path(segment))
+            directory = os.path.dirname(self.path(segment))
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        logger.info("🧹 Evidence limit reached, removed %d old segment(s)", len(expired))
+
+
+# Shared by the camera stream and the evidence routes
+evidence_store = EvidenceStore()
@@ -0,0 +1,224 @@
+"""
+Frame Sources
+One `cv2.VideoCapture`-style interface over live cameras, RTSP/HTTP streams,
+recorded video files and folders of still images.
+
+Recorded sources are replayed on a clock so load tests see the same timing a
+real camera would produce:
+    speed = 1.0  real time (frames are dropped if the consumer falls behind)
+    speed = N    N× faster than real time
+    speed = 0    as fast as possible, never drops
+"""
+
+import logging
+import os
+import time
+
+from api.config import REPLAY_SPEED, REPLAY_LOOP, REPLAY_IMAGE_FPS
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Used when a video file does not report its frame rate
+DEFAULT_VIDEO_FPS = 30.0
+
+
+class FrameSource:
+    """Base class: replay clock and the VideoCapture-compatible surface"""
+
+    kind = "unknown"
+
+    def __init__(self, source, speed: float = REPLAY_SPEED, loop: bool = REPLAY_LOOP):
+        self.source = source
+        self.speed = speed
+        self.loop = loop
+        self.fps = DEFAULT_VIDEO_FPS
+        self.frames_read = 0       # frames returned to the caller
+        self.frames_dropped = 0    # frames skipped to stay on schedule
+        self._position = 0         # media frame index across loops
+        self._clock_start = None
+
+    @property
+    def frame_number(self) -> int:
+        """1-based media index of the most recently returned frame"""
+        return self._position
+
+    # --- VideoCapture-compatible API ---
+
+    def isOpened(self) -> bool:
+        raise NotImplementedError
+
+    def read(self):
+        if self.speed > 0:
+            self._wait_for_schedule()
+
+        ok, frame = self._next_frame()
+        if not ok and self.loop and self._rewind():
+            ok, frame = self._next_frame()
+
+        if ok:
+            self.frames_read += 1
+            self._position += 1
+        return ok, frame
+
+    def set(self, prop_id, value) -> bool:
+        # Capture properties only make sense for live devices
+        return False
+
+    def get(self, prop_id) -> float:
+        import cv2
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        pass
+
+    # --- Replay clock ---
+
+    def _wait_for_schedule(self):
+        """Sleep until the next frame is due, or skip frames if we are late"""
+        now = time.monotonic()
+        if self._clock_start is None:
+            self._clock_start = now - self._position / self.fps / self.speed
+            return
+
+        due = self._clock_start + self._position / self.fps / self.speed
+        if now < due:
+            time.sleep(due - now)
+            return
+
+        # Behind schedule: a real camera would have moved on, so do we
+        late_frames = int((now - due) * self.fps * self.speed)
+        for _ in range(late_frames):
+            if not self._skip_frame():
+                break
+            self._position += 1
+            self.frames_dropped += 1
+
+    # --- Implemented by subclasses ---
+
+    def _next_frame(self):
+        raise NotImplementedError
+
+    def _skip_frame(self) -> bool:
+        ok, _ = self._next_frame()
+        return ok
+
+    def _rewind(self) -> bool:
+        return False
+
+
+class CaptureSource(FrameSource):
+    """Live device, network stream or video file, backed by cv2.VideoCapture"""
+
+    def __init__(self, source, kind: str, **kwargs):
+        # Imported here so importing the API doesn't load OpenCV
+        import cv2
+
+        super().__init__(source, **kwargs)
+        self.kind = kind
+        self.capture = cv2.VideoCapture(source)
+
+        if kind == "video":
+            self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_VIDEO_FPS
+        else:
+            # Live sources are paced by the camera itself
+            self.speed = 0
+            self.loop = False
+
+    def isOpened(self) -> bool:
+        return self.capture is not None and self.capture.isOpened()
+
+    def set(self, prop_id, value) -> bool:
+        if self.kind == "video":
+            return False
+        return self.capture.set(prop_id, value)
+
+    def get(self, prop_id) -> float:
+        import cv2
+        if self.kind == "video" and prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return self.capture.get(prop_id)
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def _next_frame(self):
+        return self.capture.read()
+
+    def _skip_frame(self) -> bool:
+        # grab() advances without decoding the frame
+        return self.capture.grab()
+
+    def _rewind(self) -> bool:
+        import cv2
+        return self.kind == "video" and self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+
+class ImageFolderSource(FrameSource):
+    """Folder of still images played back in name order at a fixed rate"""
+
+    kind = "images"
+
+    def __init__(self, folder: str, image_fps: float = REPLAY_IMAGE_FPS, **kwargs):
+        super().__init__(folder, **kwargs)
+        self.fps = image_fps
+        self.files = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._index = 0
+
+    @property
+    def current_name(self):
+        """File name of the most recently returned image"""
+        return os.path.basename(self.files[self._index - 1]) if self._index else None
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def _next_frame(self):
+        import cv2
+        while self._index < len(self.files):
+            path = self.files[self._index]
+            self._index += 1
+            image = cv2.imread(path)
+            if image is not None:
+                return True, image
+            logger.warning("⚠️ Skipping unreadable image: %s", path)
+        return False, None
+
+    def _skip_frame(self) -> bool:
+        if self._index >= len(self.files):
+            return False
+        self._index += 1
+        return True
+
+    def _rewind(self) -> bool:
+        self._index = 0
+        return bool(self.files)
+
+
+def open_source(source, speed: float = REPLAY_SPEED, loop: bool = REPLAY_LOOP,
+                image_fps: float = REPLAY_IMAGE_FPS) -> FrameSource:
+    """
+    Open any supported source:
+        0, 1, "2"                  -> live camera device
+        "rtsp://...", "http://..." -> network stream
+        "footage/gate.mp4"         -> recorded video, replayed
+        "footage/stills/"          -> folder of images, replayed
+    """
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return CaptureSource(int(source), kind="device")
+
+    if "://" in source:
+        return CaptureSource(source, kind="stream")
+
+    if os.path.isdir(source):
+        return ImageFolderSource(source, image_fps=image_fps, speed=speed, loop=loop)
+
+    return CaptureSource(source, kind="video", speed=speed, loop=loop)
@@ -0,0 +1,321 @@
+"""
+Live Video (H.264 / fragmented MP4)
+A bandwidth-friendly alternative to the MJPEG feed.
+
+The annotated frames from the camera producer (see api/mjpeg_broadcaster.py)
+are encoded once with H.264 and muxed as fragmented MP4, one fragment per
+frame, so every viewer shares the same encode and a P-frame costs a few KB
+instead of a full JPEG. A late joiner gets the init segment (ftyp + moov)
+and then starts at the next keyframe fragment; a viewer that falls behind
+has its backlog dropped and also resumes at the next keyframe.
+
+Two transports share the encoder:
+    GET /api/live.mp4       plain HTTP stream, playable by a <video> tag
+    WS  /api/live/ws        a JSON {"type": "init", "mime": ...} message,
+                            then binary init segment and fragments, for
+                            Media Source Extensions players
+
+Requires PyAV (`pip install av`); the MJPEG feed keeps working without it.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from collections import deque
+from fractions import Fraction
+
+from api.config import (
+    LIVE_VIDEO_CODEC,
+    LIVE_VIDEO_WIDTH,
+    LIVE_VIDEO_FPS,
+    LIVE_VIDEO_KEYFRAME_SECONDS,
+    LIVE_VIDEO_BITRATE,
+    LIVE_VIDEO_MAX_BUFFER_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# mp4 muxer flags: moov up front with no samples, then one self-contained
+# fragment (moof + mdat) per frame, written out as soon as it is muxed
+MOVFLAGS = "empty_moov+default_base_moof+frag_every_frame"
+INIT_BOXES = (b"ftyp", b"moov")
+
+
+def available() -> bool:
+    return importlib.util.find_spec("av") is not None
+
+
+def codec_mime(init_segment: bytes) -> str:
+    """MIME type with RFC 6381 codec string, read from the avcC box"""
+    index = init_segment.find(b"avcC")
+    if index < 0:
+        return "video/mp4"
+    # avcC payload: version, profile, profile compatibility, level
+    profile = init_segment[index + 5:index + 8].hex().upper()
+    return f'video/mp4; codecs="avc1.{profile}"'
+
+
+class LiveViewer:
+    """Per-viewer fragment buffer; all methods run on the viewer's event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_buffer: int):
+        self.loop = loop
+        self.max_buffer = max_buffer
+        self.queue = deque()         # ("init" | "fragment", bytes)
+        self.closed = False
+        self.need_keyframe = True
+        self.dropped = 0             # fragments discarded while catching up
+        self._ready = asyncio.Event()
+
+    def reset(self, init_segment: bytes):
+        """Start (or restart) the stream from a new init segment"""
+        self.queue.clear()
+        self.queue.append(("init", init_segment))
+        self.need_keyframe = True
+        self._ready.set()
+
+    def put(self, fragment: bytes, keyframe: bool):
+        if self.need_keyframe:
+            if not keyframe:
+                return
+            self.need_keyframe = False
+        elif len(self.queue) >= self.max_buffer:
+            # Falling behind: drop the backlog and rejoin at a keyframe
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            if not keyframe:
+                self.need_keyframe = True
+                return
+        self.queue.append(("fragment", fragment))
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_item(self):
+        """Next (kind, bytes) to send, or None once closed"""
+        while not self.closed:
+            if self.queue:
+                return self.queue.popleft()
+            self._ready.clear()
+            await self._ready.wait()
+        return None
+
+
+class LiveVideoEncoder:
+    """Broadcaster sink that encodes frames to fMP4 while anyone is watching"""
+
+    def __init__(self, broadcaster, width: int = LIVE_VIDEO_WIDTH, fps: float = LIVE_VIDEO_FPS,
+                 keyframe_seconds: float = LIVE_VIDEO_KEYFRAME_SECONDS,
+                 bitrate: int = LIVE_VIDEO_BITRATE, codec: str = LIVE_VIDEO_CODEC):
+        self.broadcaster = broadcaster
+        self.width = width
+        self.fps = fps
+        self.keyframe_seconds = keyframe_seconds
+        self.bitrate = bitrate
+        self.codec = codec
+        self.viewers = set()
+        self.init_segment = None
+        self.mime = None
+        self.frames = 0
+        self.bytes_out = 0           # encoded bytes, before fan-out
+
+        self._lock = threading.Lock()
+        self._container = None
+        self._stream = None
+        self._started = None
+        self._next_due = 0.0
+        self._last_pts = -1
+        self._pending = bytearray()  # muxer output not yet split into boxes
+        self._init_parts = []
+        self._fragment_parts = []
+        self._keyframes = deque()    # is_keyframe of each muxed packet, in order
+
+    # --- Viewers (event loop) ---
+
+    def join(self) -> LiveViewer:
+        viewer = LiveViewer(asyncio.get_running_loop(), int(max(1, self.fps * LIVE_VIDEO_MAX_BUFFER_SECONDS)))
+        with self._lock:
+            self.viewers.add(viewer)
+            if self.init_segment is not None:
+                viewer.reset(self.init_segment)
+            first = len(self.viewers) == 1
+        if first:
+            self.broadcaster.add_sink(self)
+        logger.info("👀 Viewer joined live video (%d watching)", len(self.viewers))
+        return viewer
+
+    def leave(self, viewer: LiveViewer):
+        viewer.close()
+        with self._lock:
+            self.viewers.discard(viewer)
+            last = not self.viewers
+            if last:
+                self._close_encoder()
+        if last:
+            self.broadcaster.remove_sink(self)
+        logger.info("🔌 Viewer left live video (%d watching, %d fragments skipped)",
+                    len(self.viewers), viewer.dropped)
+
+    async def stream(self):
+        """Async iterator of fMP4 bytes for one HTTP client"""
+        viewer = self.join()
+        started = False
+        try:
+            while True:
+                item = await viewer.next_item()
+                if item is None:
+                    break
+                kind, data = item
+                if kind == "init" and started:
+                    # Encoder restarted: a new init segment can't be spliced
+                    # into an MP4 response, the player has to reconnect
+                    break
+                started = True
+                yield data
+        finally:
+            self.leave(viewer)
+
+    # --- Broadcaster sink (producer thread) ---
+
+    def push(self, frame, seq: int):
+        now = time.monotonic()
+        if now < self._next_due:
+            return
+        # Hold the average rate at self.fps, without bursting to catch up after a stall
+        interval = 1.0 / self.fps
+        self._next_due = self._next_due + interval if now - self._next_due < interval else now + interval
+
+        with self._lock:
+            if not self.viewers:
+                return
+            if self._container is None:
+                self._open_encoder(frame.shape)
+
+            import av
+            import cv2
+
+            size = (self._stream.width, self._stream.height)
+            image = frame if frame.shape[1::-1] == size else cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            video_frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+            # Millisecond timestamps from the wall clock (frame rate varies with OCR load)
+            pts = max(self._last_pts + 1, int((now - self._started) * 1000))
+            video_frame.pts, video_frame.time_base = pts, Fraction(1, 1000)
+            self._last_pts = pts
+
+            for packet in self._stream.encode(video_frame):
+                self._keyframes.append(packet.is_keyframe)
+                self._container.mux(packet)
+            self.frames += 1
+
+    def close(self):
+        """Called when the producer stops: disconnect every viewer"""
+        with self._lock:
+            viewers = list(self.viewers)
+            self.viewers.clear()
+            self._close_encoder()
+        for viewer in viewers:
+            self._notify(viewer, viewer.close)
+
+    # --- Encoder (caller holds self._lock) ---
+
+    def _open_encoder(self, shape):
+        import av
+
+        h, w = shape[:2]
+        width = min(self.width, w)
+        height = int(round(h * width / w))
+        # yuv420p needs even dimensions
+        width, height = width - width % 2, height - height % 2
+
+        self._container = av.open(_MuxerOutput(self._on_output), mode="w", format="mp4",
+                                  options={"movflags": MOVFLAGS, "flush_packets": "1"})
+        stream = self._container.add_stream(self.codec, rate=max(1, int(round(self.fps))), options={
+            "preset": "ultrafast",
+            "tune": "zerolatency",
+            "profile": "baseline",   # widest Media Source Extensions support
+        })
+        stream.width, stream.height = width, height
+        stream.pix_fmt = "yuv420p"
+        stream.bit_rate = self.bitrate
+        stream.codec_context.gop_size = max(1, int(self.fps * self.keyframe_seconds))
+        # Frames carry millisecond timestamps; a 1/fps time base would collapse jittery ones
+        stream.codec_context.time_base = Fraction(1, 1000)
+        self._stream = stream
+        self._started = time.monotonic()
+        self._last_pts = -1
+        logger.info("🎞️ Live video encoder started: %s %dx%d @ %g fps", self.codec, width, height, self.fps)
+
+    def _close_encoder(self):
+        if self._container is not None:
+            try:
+                self._container.close()
+            except Exception as e:
+                logger.debug("Live video encoder close: %s", e)
+        self._container = self._stream = None
+        self.init_segment = self.mime = None
+        self._next_due = 0.0
+        self._pending.clear()
+        self._init_parts.clear()
+        self._fragment_parts.clear()
+        self._keyframes.clear()
+
+    def _on_output(self, data: bytes):
+        """Split muxer output into top-level MP4 boxes"""
+        self.bytes_out += len(data)
+        buffer = self._pending
+        buffer += data
+        while len(buffer) >= 8:
+            size = int.from_bytes(buffer[0:4], "big")
+            header = 8
+            if size == 1:
+                if len(buffer) < 16:
+                    break
+                size, header = int.from_bytes(buffer[8:16], "big"), 16
+            if size < header or len(buffer) < size:
+                break
+            box_type = bytes(buffer[4:8])
+            box = bytes(buffer[:size])
+            del buffer[:size]
+            self._on_box(box_type, box)
+
+    def _on_box(self, box_type: bytes, box: bytes):
+        if box_type in INIT_BOXES:
+            self._init_parts.append(box)
+            if box_type == b"moov":
+                self.init_segment = b"".join(self._init_parts)
+                self.mime = codec_mime(self.init_segment)
+                self._init_parts.clear()
+                for viewer in self.viewers:
+                    self._notify(viewer, viewer.reset, self.init_segment)
+        elif box_type == b"moof":
+            self._fragment_parts = [box]
+        elif box_type == b"mdat" and self._fragment_parts:
+            self._fragment_parts.append(box)
+            fragment = b"".join(self._fragment_parts)
+            self._fragment_parts = []
+            keyframe = self._keyframes.popleft() if self._keyframes else False
+            for viewer in self.viewers:
+                self._notify(viewer, viewer.put, fragment, keyframe)
+
+    @staticmethod
+    def _notify(viewer: LiveViewer, method, *args):
+        try:
+            viewer.loop.call_soon_threadsafe(method, *args)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            viewer.closed = True
+
+
+class _MuxerOutput:
+    """Write-only, non-seekable file object handed to the MP4 muxer"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, data) -> int:
+        self.callback(bytes(data))
+        return len(data)
@@ -0,0 +1,116 @@
+"""
+Logging Setup
+Structured, non-blocking logging for the API and detection loop.
+
+Records are pushed onto a queue by a QueueHandler and written to stdout by a
+QueueListener running on a background thread, so hot paths (frame loop,
+WebSocket broadcast, OCR) never block on console I/O.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+from api.config import LOG_LEVEL, LOG_FORMAT, OCR_LOG_INTERVAL
+
+# Standard LogRecord attributes (anything else passed via `extra=` is a field)
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text formatter that appends `extra=` fields as key=value pairs"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most one record through per call site (file + line) every
+    `interval` seconds. Used on noisy debug output such as raw OCR results.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+        self._last_emit = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_emit.get(site)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last_emit[site] = now
+        return True
+
+
+def _extra_fields(record) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS and not k.startswith("_")}
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Route all `api.*` loggers through a background queue listener.
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    if fmt == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = StructuredFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger("api")
+    root.setLevel(level.upper())
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.propagate = False
+
+    # Raw OCR dumps are useful while tuning but must not flood the console
+    logging.getLogger("api.ocr").addFilter(RateLimitFilter(OCR_LOG_INTERVAL))
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,41 +1,79 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+from fastapi import Depends, FastAPI, HTTPException, Response, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
-from api.database import Base, engine
-from api.routes import vehicles, logs, detect, esp32
+from api.database import Base, engine, SessionLocal
+from api.routes import vehicles, logs, detect, esp32, evidence, ingest
 from fastapi import WebSocket
-from api.websocket_manager import manager
-from api.auth import router as auth_router
-from api.camera_stream import router as camera_router, release_camera
+from api.websocket_manager import manager, parse_topics
+from api.auth import router as auth_router, get_current_user, get_edge_or_user, verify_token, bcrypt_pool
+from api.camera_stream import router as camera_router, stop_stream
+from api.evidence_store import evidence_store
+from api.worker_pool import upload_pool
+from api.collection_versions import track_sessions
+from api.change_feed import track_changes
+from api.compression import CompressionMiddleware
+from api import ocr_engine
+from api.config import OCR_WARM_UP_ON_STARTUP
+from api.logging_config import setup_logging, shutdown_logging
 from contextlib import asynccontextmanager
 
+setup_logging()
+logger = logging.getLogger("api")
+
+# Keep a reference so the background warm-up isn't garbage-collected
+ocr_warm_up_task = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
+    global ocr_warm_up_task
+
     # Startup
-    print("🚀 Server starting up...")
+    logger.info("🚀 Server starting up...")
+    # Commits on worker threads hand their change events to this loop
+    manager.bind(asyncio.get_running_loop())
+    if OCR_WARM_UP_ON_STARTUP:
+        # Load the OCR model in the background so auth/vehicle/log APIs are
+        # available immediately; /api/health/ready reports when it's done
+        ocr_warm_up_task = asyncio.create_task(asyncio.to_thread(ocr_engine.warm_up))
     yield
     # Shutdown
-    print("🛑 Server shutting down...")
+    logger.info("🛑 Server shutting down...")
 
     # Close all WebSocket connections
-    print("📡 Closing WebSocket connections...")
-    for connection in manager.active_connections[:]:
-        try:
-            await connection.close()
-        except Exception as e:
-            print(f"Error closing WebSocket: {e}")
-    manager.active_connections.clear()
+    logger.info("📡 Closing WebSocket connections...")
+    await manager.close_all()
+
+    # Stop the camera stream and release the camera if active
+    logger.info("🎥 Releasing camera...")
+    stop_stream()
 
-    # Release camera if active
-    print("🎥 Releasing camera...")
-    release_camera()
+    # Drop uploads and logins still waiting for a worker
+    upload_pool.shutdown()
+    bcrypt_pool.shutdown()
 
-    print("✅ Shutdown complete")
+    # Stop OCR worker processes, if any
+    ocr_engine.shutdown()
+
+    # Write out queued evidence snapshots
+    evidence_store.stop()
+
+    logger.info("✅ Shutdown complete")
+    shutdown_logging()
 
 
 app = FastAPI(title="Plate Recognition System", lifespan=lifespan)
 
+# Bump vehicle/log ETags and notify dashboards on every commit that changes them
+track_sessions(SessionLocal)
+track_changes(SessionLocal)
+
+# gzip/brotli for large JSON responses (streams pass through)
+app.add_middleware(CompressionMiddleware)
+
 
 
 # Allow frontend access (CORS)
@@ -57,27 +95,75 @@ Base.metadata.create_all(bind=engine)
 
 # Register routes
 app.include_router(auth_router, prefix="/api/auth", tags=["Auth"])
-app.include_router(vehicles.router, prefix="/api/vehicles", tags=["Vehicles"])
-app.include_router(logs.router, prefix="/api/logs", tags=["Logs"])
-app.include_router(detect.router, prefix="/api/detect", tags=["Detection"])
+# 🔒 Login required (verified tokens are cached, see api/auth.py)
+app.include_router(vehicles.router, prefix="/api/vehicles", tags=["Vehicles"],
+                   dependencies=[Depends(get_current_user)])
+app.include_router(logs.router, prefix="/api/logs", tags=["Logs"],
+                   dependencies=[Depends(get_current_user)])
+app.include_router(detect.router, prefix="/api/detect", tags=["Detection"],
+                   dependencies=[Depends(get_current_user)])
 app.include_router(camera_router, prefix="/api", tags=["Camera"])
 app.include_router(esp32.router, prefix="/api/esp32", tags=["ESP32 Hardware"])
+app.include_router(evidence.router, prefix="/api/evidence", tags=["Evidence"],
+                   dependencies=[Depends(get_current_user)])
+# 🔒 Edge detectors authenticate with EDGE_API_TOKEN
+app.include_router(ingest.router, prefix="/api/ingest", tags=["Edge Ingestion"],
+                   dependencies=[Depends(get_edge_or_user)])
 
 @app.get("/")
 def root():
     return {"message": "Plate Recognition API Running 🚀"}
 
 
+@app.get("/api/health", tags=["Health"])
+def health():
+    """Liveness: the API process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/api/health/ready", tags=["Health"])
+def readiness(response: Response):
+    """Readiness: 200 once the OCR engine is warm, 503 while it is still loading"""
+    ocr = ocr_engine.status()
+    if ocr["state"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": ocr["state"], "ocr": ocr, "uploads": upload_pool.stats(), "logins": bcrypt_pool.stats()}
+
+
 
 @app.websocket("/ws/detections")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    print(f"✅ WebSocket client connected. Total clients: {len(manager.active_connections)}")
+async def websocket_endpoint(websocket: WebSocket, token: str | None = None, since: int | None = None,
+                             epoch: str | None = None, topics: str | None = None):
+    """
+    Log and vehicle change events (see api/websocket_manager.py).
+    ?token=<login token> is required (browsers can't set headers on a
+    WebSocket); without a valid one the socket is closed with 1008.
+    ?topics=registered,unregistered,vehicles picks what to receive (default:
+    registered); ?since=<seq>&epoch=<epoch> from the last event seen resumes
+    after a reconnect. Send {"topics": [...]} to change topics later.
+    """
+    # 🔒 Same check as the vehicle/log routes
+    try:
+        verify_token(token or "")
+    except HTTPException as e:
+        # Accepted first so the client sees the close code, not a failed handshake
+        await websocket.accept()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+
+    await manager.connect(websocket, since=since, epoch=epoch, topics=parse_topics(topics))
+    logger.info("✅ WebSocket client connected. Total clients: %d", len(manager.clients))
     try:
         while True:
-            await websocket.receive_text()  # Just keep alive
+            text = await websocket.receive_text()
+            try:
+                manager.handle_message(websocket, json.loads(text))
+            except ValueError:
+                pass  # keep-alive pings and other non-JSON text
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"❌ WebSocket connection closed: {e}")
+        logger.info("❌ WebSocket connection closed: %s", e)
     finally:
         manager.disconnect(websocket)
-        print(f"🔌 WebSocket client disconnected. Total clients: {len(manager.active_connections)}")
+        logger.info("🔌 WebSocket client disconnected. Total clients: %d", len(manager.clients))
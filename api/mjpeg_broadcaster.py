@@ -0,0 +1,337 @@
+"""
+MJPEG Broadcaster
+One producer per camera, any number of viewers.
+
+The producer thread runs the capture/OCR loop once. Each frame is encoded
+once per (width, quality) tier that some viewer currently wants, and every
+connected client has a single-frame "latest" slot that the producer
+overwrites; a client that falls behind skips straight to the newest frame
+instead of queueing old ones. Viewer count therefore doesn't change camera
+or OCR work, and encoding only grows with the number of distinct tiers.
+
+Viewers pick their tier and max fps (see negotiate), and with auto
+adjustment are stepped down a tier while their connection can't keep up.
+
+Other consumers of the annotated frames (e.g. the H.264 live view in
+api/live_video.py) attach as "sinks": they receive the raw frame in the
+producer thread and keep the producer running just like viewers do.
+
+The producer starts with the first viewer and stops when the last one
+leaves (after a short grace period, so page reloads don't reopen the camera).
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+
+from api.config import (
+    STREAM_WIDTHS,
+    STREAM_QUALITIES,
+    STREAM_WIDTH,
+    STREAM_QUALITY,
+    STREAM_MAX_FPS,
+    STREAM_AUTO_DOWNGRADE,
+    STREAM_SLOW_SEND_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = b"frame"
+
+# Keep the producer running this long after the last viewer disconnects
+IDLE_GRACE_SECONDS = 3.0
+
+# Auto adjustment: minimum seconds between tier changes, and how long a
+# viewer must keep up before it is stepped back up
+ADJUST_INTERVAL = 3.0
+UPGRADE_AFTER = 10.0
+SEND_TIME_SMOOTHING = 0.3
+
+
+def multipart_chunk(jpeg: bytes) -> bytes:
+    return (b'--' + BOUNDARY + b'\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+def _nearest(options, value):
+    return min(options, key=lambda option: abs(option - value))
+
+
+def negotiate(width=None, quality=None, fps=None):
+    """Snap requested stream settings to the configured tiers"""
+    width = _nearest(STREAM_WIDTHS, width or STREAM_WIDTH)
+    quality = _nearest(STREAM_QUALITIES, quality or STREAM_QUALITY)
+    fps = max(0.0, float(STREAM_MAX_FPS if fps is None else fps))
+    return width, quality, fps
+
+
+def encode(frame, width: int, quality: int, resized=None) -> bytes:
+    """
+    JPEG-encode a frame scaled down to `width`. `resized` caches the scaled
+    frame per width, so tiers that only differ in quality resize once.
+    """
+    # Imported here so importing the API doesn't load OpenCV
+    import cv2
+
+    image = resized.get(width) if resized is not None else None
+    if image is None:
+        scale = width / frame.shape[1]
+        image = frame if scale >= 1.0 else cv2.resize(frame, None, fx=scale, fy=scale,
+                                                      interpolation=cv2.INTER_AREA)
+        if resized is not None:
+            resized[width] = image
+    _, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes()
+
+
+class Subscriber:
+    """One viewer's latest-frame slot and stream settings, filled by the producer thread"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, width: int = STREAM_WIDTH,
+                 quality: int = STREAM_QUALITY, max_fps: float = STREAM_MAX_FPS,
+                 auto: bool = STREAM_AUTO_DOWNGRADE):
+        self.loop = loop
+        self.frame = None
+        self.seq = 0                 # sequence number of `frame`
+        self.closed = False
+        self.dropped = 0             # frames overwritten before being sent
+        self._sent_seq = 0
+        self._ready = asyncio.Event()
+
+        # Requested settings, and the tier currently served
+        self.requested = (width, quality)
+        self.width, self.quality = width, quality
+        self.max_fps = max_fps
+        self.auto = auto
+        self.next_due = 0.0          # monotonic time the next frame may be sent
+        self.send_time = 0.0         # smoothed seconds to hand a frame to the client
+        self._last_adjust = time.monotonic()
+
+    @property
+    def tier(self):
+        return self.width, self.quality
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_due
+
+    def offer(self, frame: bytes, seq: int):
+        """Called from the producer thread"""
+        if self.seq != self._sent_seq:
+            self.dropped += 1
+        self.frame, self.seq = frame, seq
+        try:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        try:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass
+
+    async def next_frame(self):
+        """Newest frame not yet sent to this viewer, or None once closed"""
+        while not self.closed:
+            if self.seq != self._sent_seq:
+                self._sent_seq = self.seq
+                return self.frame
+            self._ready.clear()
+            if self.seq == self._sent_seq and not self.closed:
+                await self._ready.wait()
+        return None
+
+    def sent(self, started: float, finished: float):
+        """Record how long handing one frame to the client took, and adapt"""
+        if self.max_fps:
+            self.next_due = started + 1.0 / self.max_fps
+        self.send_time += SEND_TIME_SMOOTHING * ((finished - started) - self.send_time)
+        if not self.auto or finished - self._last_adjust < ADJUST_INTERVAL:
+            return
+
+        if self.send_time > STREAM_SLOW_SEND_SECONDS:
+            changed = self._step_down()
+        elif self.send_time < STREAM_SLOW_SEND_SECONDS / 4 and finished - self._last_adjust >= UPGRADE_AFTER:
+            changed = self._step_up()
+        else:
+            return
+        self._last_adjust = finished
+        if changed:
+            logger.info("📶 Viewer stream %s to %dpx @ q%d (send %.0f ms)",
+                        "lowered" if self.send_time > STREAM_SLOW_SEND_SECONDS else "raised",
+                        self.width, self.quality, self.send_time * 1000)
+
+    def _step_down(self) -> bool:
+        """Lower quality first, then resolution"""
+        q = STREAM_QUALITIES.index(self.quality)
+        w = STREAM_WIDTHS.index(self.width)
+        if q > 0:
+            self.quality = STREAM_QUALITIES[q - 1]
+        elif w > 0:
+            self.width = STREAM_WIDTHS[w - 1]
+        else:
+            return False
+        return True
+
+    def _step_up(self) -> bool:
+        """Restore resolution first, then quality, up to what was requested"""
+        req_width, req_quality = self.requested
+        if self.width < req_width:
+            self.width = STREAM_WIDTHS[bisect.bisect_right(STREAM_WIDTHS, self.width)]
+        elif self.quality < req_quality:
+            self.quality = STREAM_QUALITIES[bisect.bisect_right(STREAM_QUALITIES, self.quality)]
+        else:
+            return False
+        return True
+
+
+class MJPEGBroadcaster:
+    """Runs `produce()` (an iterator of BGR frames) in a thread and fans JPEGs out"""
+
+    def __init__(self, produce, name: str = "camera"):
+        self.produce = produce
+        self.name = name
+        self.subscribers = set()
+        self.sinks = set()           # objects with push(frame, seq) and close()
+        self.frames = 0
+        self.encodes = 0             # JPEG encodes, across all tiers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._idle_since = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop | None = None, **settings) -> Subscriber:
+        subscriber = Subscriber(loop or asyncio.get_running_loop(), **settings)
+        with self._lock:
+            self.subscribers.add(subscriber)
+            self._ensure_running()
+        logger.info("👀 Viewer joined %s stream at %dpx @ q%d (%d watching)",
+                    self.name, subscriber.width, subscriber.quality, len(self.subscribers))
+        return subscriber
+
+    def add_sink(self, sink):
+        """Feed every produced frame to `sink.push(frame, seq)` (producer thread)"""
+        with self._lock:
+            self.sinks.add(sink)
+            self._ensure_running()
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self.sinks.discard(sink)
+            if not self.subscribers and not self.sinks:
+                self._idle_since = time.monotonic()
+
+    def _ensure_running(self):
+        # Caller holds self._lock
+        self._idle_since = None
+        if self._thread is None:
+            self._stop.clear()
+            self._start()
+
+    def _start(self):
+        # Caller holds self._lock
+        self._thread = threading.Thread(target=self._run, name=f"mjpeg-{self.name}", daemon=True)
+        self._thread.start()
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close()
+        with self._lock:
+            self.subscribers.discard(subscriber)
+            if not self.subscribers and not self.sinks:
+                self._idle_since = time.monotonic()
+        logger.info("🔌 Viewer left %s stream (%d watching, %d frames skipped)",
+                    self.name, len(self.subscribers), subscriber.dropped)
+
+    async def stream(self, **settings):
+        """
+        Async iterator of multipart chunks for one HTTP client.
+        The time spent suspended in `yield` is how long the server took to
+        hand the chunk to the connection, which grows when the client's
+        send buffer backs up.
+        """
+        subscriber = self.subscribe(**settings)
+        try:
+            while True:
+                frame = await subscriber.next_frame()
+                if frame is None:
+                    break
+                started = time.monotonic()
+                yield multipart_chunk(frame)
+                subscriber.sent(started, time.monotonic())
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the producer and disconnect every viewer"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _idle(self) -> bool:
+        with self._lock:
+            if self.subscribers or self.sinks or self._idle_since is None:
+                return False
+            return time.monotonic() - self._idle_since > IDLE_GRACE_SECONDS
+
+    def _run(self):
+        frames = self.produce()
+        went_idle = False
+        logger.info("🎬 %s producer started", self.name)
+        try:
+            for seq, frame in enumerate(frames, start=1):
+                self.frames = seq
+                with self._lock:
+                    subscribers = list(self.subscribers)
+                    sinks = list(self.sinks)
+
+                for sink in sinks:
+                    try:
+                        sink.push(frame, seq)
+                    except Exception as e:
+                        logger.exception("❌ %s sink %r failed: %s", self.name, sink, e)
+                        self.remove_sink(sink)
+                        sink.close()
+
+                # Encode once per tier, only for viewers due a frame
+                now = time.monotonic()
+                encoded, resized = {}, {}
+                for subscriber in subscribers:
+                    if not subscriber.due(now):
+                        continue
+                    tier = subscriber.tier
+                    jpeg = encoded.get(tier)
+                    if jpeg is None:
+                        jpeg = encoded[tier] = encode(frame, *tier, resized=resized)
+                        self.encodes += 1
+                    subscriber.offer(jpeg, seq)
+                if self._stop.is_set():
+                    break
+                if self._idle():
+                    went_idle = True
+                    break
+        except Exception as e:
+            logger.exception("❌ %s producer failed: %s", self.name, e)
+        finally:
+            frames.close()
+            logger.info("🛑 %s producer stopped", self.name)
+
+        with self._lock:
+            self._thread = None
+            if went_idle and (self.subscribers or self.sinks) and not self._stop.is_set():
+                # Someone joined while we were shutting down for idleness
+                self._start()
+                return
+            subscribers = list(self.subscribers) + list(self.sinks)
+            self.subscribers.clear()
+            self.sinks.clear()
+        for subscriber in subscribers:
+            subscriber.close()
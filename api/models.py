@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from api.database import Base
@@ -35,3 +35,36 @@ class Log(Base):
 
     # Relationship to vehicle
     vehicle = relationship("Vehicle", back_populates="logs")
+
+class PlateCooldown(Base):
+    __tablename__ = "plate_cooldowns"
+
+    plate_number = Column(String, primary_key=True)
+    expires_at = Column(Float, nullable=False, index=True)  # Unix timestamp
+
+class Evidence(Base):
+    """Image snapshot for a log, stored as a byte range in an append-only pack file"""
+    __tablename__ = "evidence"
+
+    id = Column(Integer, primary_key=True, index=True)
+    log_id = Column(Integer, ForeignKey("logs.id"), index=True, nullable=False)
+    kind = Column(String, nullable=False)            # "roi" or "thumbnail"
+    segment = Column(String, nullable=False, index=True)  # pack file, relative to EVIDENCE_DIR
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    content_type = Column(String, default="image/jpeg")
+    created_at = Column(DateTime, default=get_philippine_time)
+
+class IngestedEvent(Base):
+    """Detection event received from an edge camera, keyed by the client's idempotency key"""
+    __tablename__ = "ingested_events"
+
+    idempotency_key = Column(String, primary_key=True)
+    camera_id = Column(String, index=True, nullable=False)
+    plate_number = Column(String, nullable=False)
+    confidence = Column(Float)
+    captured_at = Column(DateTime, nullable=False)
+    log_id = Column(Integer, ForeignKey("logs.id"), index=True)  # None if suppressed by cooldown
+    received_at = Column(DateTime, default=get_philippine_time)
+
+    log = relationship("Log")
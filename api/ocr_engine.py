@@ -0,0 +1,213 @@
+"""
+OCR Engine
+Single, lazily-initialized EasyOCR reader shared by the live stream, the
+upload endpoint and the edge detector, so each process loads the detection
+and recognition models at most once, and only when OCR is actually needed.
+
+With OCR_WORKERS > 0 the reader lives in a pool of worker processes instead
+(see api/ocr_workers.py) and readtext() forwards frames to it.
+"""
+
+import logging
+import threading
+import time
+
+from api.config import (
+    USE_GPU,
+    OCR_BACKEND,
+    OCR_ONNX_INT8,
+    OCR_WORKERS,
+    OCR_SHM_SLOTS,
+    OCR_SHM_SLOT_BYTES,
+    OCR_WORKER_THREADS,
+    OCR_WORKER_TIMEOUT,
+    OCR_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+_reader = None
+_pool = None
+_load_lock = threading.Lock()
+# EasyOCR makes no thread-safety promises; the stream loop and upload
+# endpoint can call in at the same time, so inference is serialized.
+_infer_lock = threading.Lock()
+
+# Seconds spent constructing the reader (None until loaded)
+load_seconds = None
+warmed_up = False
+warm_up_error = None
+
+
+def create_reader(backend: str = OCR_BACKEND, int8: bool = OCR_ONNX_INT8):
+    """Build a new EasyOCR reader for the given backend ("torch" or "onnx")"""
+    import easyocr  # heavy: pulls in torch
+
+    if backend == "torch":
+        return easyocr.Reader(['en'], gpu=USE_GPU)
+    if backend == "onnx":
+        from api.ocr_onnx import install_onnx_backend
+
+        # Unquantized torch weights are needed to export the ONNX models
+        reader = easyocr.Reader(['en'], gpu=False, quantize=False)
+        return install_onnx_backend(reader, int8=int8)
+    raise ValueError(f"Unknown OCR_BACKEND: {backend!r} (expected 'torch' or 'onnx')")
+
+
+def get_reader():
+    """Return this process's EasyOCR reader, loading it on first use"""
+    global _reader, load_seconds
+
+    if _reader is None:
+        with _load_lock:
+            if _reader is None:
+                start = time.perf_counter()
+                _reader = create_reader()
+                load_seconds = time.perf_counter() - start
+                logger.info("✅ EasyOCR reader initialized in %.1fs (backend: %s, GPU: %s)",
+                            load_seconds, OCR_BACKEND, USE_GPU)
+    return _reader
+
+
+def get_pool():
+    """Return the OCR worker pool, starting it on first use"""
+    global _pool
+
+    if _pool is None:
+        with _load_lock:
+            if _pool is None:
+                from api.ocr_workers import OCRWorkerPool
+
+                pool = OCRWorkerPool(OCR_WORKERS, OCR_SHM_SLOTS, OCR_SHM_SLOT_BYTES, OCR_WORKER_THREADS)
+                pool.start()
+                _pool = pool
+    return _pool
+
+
+def _call(method: str, image, **kwargs):
+    if OCR_WORKERS > 0:
+        return get_pool().call(method, image, OCR_WORKER_TIMEOUT, **kwargs)
+
+    reader = get_reader()
+    with _infer_lock:
+        return getattr(reader, method)(image, **kwargs)
+
+
+def readtext(image, **kwargs):
+    """Run EasyOCR on an image (BGR or grayscale numpy array)"""
+    return _call("readtext", image, **kwargs)
+
+
+def readtext_batched(images, batch_size: int = OCR_BATCH_SIZE, **kwargs):
+    """
+    readtext() over several images; returns one result list per image.
+    Images of the same size go through EasyOCR's readtext_batched up to
+    batch_size at a time (it stacks them into one detection batch, so sizes
+    can't be mixed). With worker processes each image is its own task and
+    the pool spreads them across workers.
+    """
+    if OCR_WORKERS > 0:
+        pool = get_pool()
+        futures = [pool.submit(image, "readtext", **kwargs) for image in images]
+        return [future.result(OCR_WORKER_TIMEOUT) for future in futures]
+
+    groups = {}
+    for index, image in enumerate(images):
+        groups.setdefault(image.shape, []).append(index)
+
+    reader = get_reader()
+    results = [None] * len(images)
+    for indices in groups.values():
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            with _infer_lock:
+                if len(chunk) == 1:
+                    outputs = [reader.readtext(images[chunk[0]], **kwargs)]
+                else:
+                    outputs = reader.readtext_batched([images[i] for i in chunk], **kwargs)
+            for index, output in zip(chunk, outputs):
+                results[index] = output
+    return results
+
+
+def detect(image, **kwargs):
+    """
+    Text detection only. Returns (horizontal_list, free_list) for the image:
+    axis-aligned boxes as [x_min, x_max, y_min, y_max] and rotated boxes as
+    four [x, y] points.
+    """
+    horizontal_list, free_list = _call("detect", image, **kwargs)
+    return horizontal_list[0], free_list[0]
+
+
+def recognize(image, horizontal_list=None, free_list=None, **kwargs):
+    """Recognition only, on boxes previously returned by detect()"""
+    return _call("recognize", image, horizontal_list=horizontal_list or [], free_list=free_list or [], **kwargs)
+
+
+def warm_up():
+    """
+    Load the models and run one throwaway inference so the first real
+    detection doesn't pay for lazy initialization inside torch.
+    """
+    global warmed_up, warm_up_error, load_seconds
+
+    if warmed_up:
+        return
+
+    import numpy as np
+
+    start = time.perf_counter()
+    try:
+        if OCR_WORKERS > 0:
+            pool = get_pool()
+            # Workers warm themselves up as soon as they start
+            while not pool.ready.wait(timeout=1.0):
+                if pool.error:
+                    raise RuntimeError(pool.error)
+            load_seconds = time.perf_counter() - start
+        else:
+            readtext(np.zeros((64, 256), dtype=np.uint8), detail=1, paragraph=False)
+    except Exception as e:
+        warm_up_error = str(e)
+        logger.exception("❌ OCR warm-up failed: %s", e)
+        return
+
+    warm_up_error = None
+    warmed_up = True
+    logger.info("🔥 OCR engine warmed up")
+
+
+def is_loaded() -> bool:
+    if OCR_WORKERS > 0:
+        return _pool is not None and _pool.ready.is_set()
+    return _reader is not None
+
+
+def shutdown():
+    """Stop worker processes (no-op for the in-process reader)"""
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def status() -> dict:
+    """Readiness summary for the health endpoint"""
+    if warmed_up:
+        state = "ready"
+    elif warm_up_error:
+        state = "error"
+    else:
+        state = "loading" if _load_lock.locked() or _pool is not None or is_loaded() else "cold"
+
+    return {
+        "state": state,
+        "loaded": is_loaded(),
+        "warm": warmed_up,
+        "backend": OCR_BACKEND,
+        "workers": OCR_WORKERS,
+        "load_seconds": load_seconds,
+        "error": warm_up_error,
+    }
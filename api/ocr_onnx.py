@@ -0,0 +1,176 @@
+"""
+ONNX Runtime OCR Backend
+Exports EasyOCR's recognition (and optionally detection) network to ONNX,
+quantizes the weights to INT8, and swaps the PyTorch modules inside an
+EasyOCR Reader for ONNX Runtime sessions. EasyOCR's own pre/post-processing
+(cropping, resizing, CTC decoding) is left untouched, so results are
+directly comparable with the PyTorch path.
+
+Select it with OCR_BACKEND = "onnx" in api/config.py. Models are exported
+automatically on first use, or ahead of time with:
+    python -m api.ocr_onnx
+"""
+
+import copy
+import logging
+import os
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+from api.config import OCR_ONNX_DIR, OCR_ONNX_INT8, OCR_ONNX_DETECTOR, OCR_ONNX_THREADS
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 17
+
+# Recognizer input height used by EasyOCR's english_g2 model
+RECOGNIZER_HEIGHT = 64
+
+
+def model_paths(model_dir: str = OCR_ONNX_DIR) -> dict:
+    return {
+        "recognizer": os.path.join(model_dir, "recognizer.onnx"),
+        "recognizer_int8": os.path.join(model_dir, "recognizer.int8.onnx"),
+        "detector": os.path.join(model_dir, "detector.onnx"),
+        "detector_int8": os.path.join(model_dir, "detector.int8.onnx"),
+    }
+
+
+# ---------------- Export ----------------
+
+class _MeanLastDim(torch.nn.Module):
+    """
+    Same result as AdaptiveAvgPool2d((None, 1)), but exports with a dynamic
+    input width (adaptive pooling needs static sizes in ONNX).
+    """
+
+    def forward(self, x):
+        return x.mean(dim=3, keepdim=True)
+
+
+class _RecognizerExport(torch.nn.Module):
+    """EasyOCR's recognizer takes an unused `text` argument in CTC mode"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        return self.model(image, None)
+
+
+def _unwrap(module):
+    # DataParallel on GPU machines
+    return getattr(module, "module", module)
+
+
+def export_models(reader=None, model_dir: str = OCR_ONNX_DIR, include_detector: bool = True) -> dict:
+    """
+    Export FP32 ONNX models from a (non-quantized) EasyOCR reader, then write
+    dynamically INT8-quantized copies next to them.
+    """
+    if reader is None:
+        import easyocr
+        reader = easyocr.Reader(['en'], gpu=False, quantize=False)
+
+    os.makedirs(model_dir, exist_ok=True)
+    paths = model_paths(model_dir)
+
+    recognizer = copy.deepcopy(_unwrap(reader.recognizer)).cpu().eval()
+    if isinstance(getattr(recognizer, "AdaptiveAvgPool", None), torch.nn.AdaptiveAvgPool2d):
+        recognizer.AdaptiveAvgPool = _MeanLastDim()
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _RecognizerExport(recognizer),
+            torch.zeros(1, 1, RECOGNIZER_HEIGHT, 256),
+            paths["recognizer"],
+            input_names=["image"],
+            output_names=["preds"],
+            dynamic_axes={"image": {0: "batch", 3: "width"}, "preds": {0: "batch", 1: "steps"}},
+            opset_version=ONNX_OPSET,
+        )
+    quantize_dynamic(paths["recognizer"], paths["recognizer_int8"], weight_type=QuantType.QInt8)
+    logger.info("📦 Exported recognizer to %s (+ INT8)", paths["recognizer"])
+
+    if include_detector:
+        detector = copy.deepcopy(_unwrap(reader.detector)).cpu().eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                detector,
+                torch.zeros(1, 3, 480, 640),
+                paths["detector"],
+                input_names=["image"],
+                output_names=["scores", "feature"],
+                dynamic_axes={
+                    "image": {0: "batch", 2: "height", 3: "width"},
+                    "scores": {0: "batch", 1: "score_height", 2: "score_width"},
+                    "feature": {0: "batch", 2: "feature_height", 3: "feature_width"},
+                },
+                opset_version=ONNX_OPSET,
+            )
+        quantize_dynamic(paths["detector"], paths["detector_int8"], weight_type=QuantType.QInt8)
+        logger.info("📦 Exported detector to %s (+ INT8)", paths["detector"])
+
+    return paths
+
+
+# ---------------- Runtime ----------------
+
+class _OnnxModule:
+    """Just enough of the nn.Module surface for EasyOCR's inference helpers"""
+
+    def __init__(self, path: str, threads: int = OCR_ONNX_THREADS):
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.path = path
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+class OnnxRecognizer(_OnnxModule):
+    def __call__(self, image, text=None):
+        (preds,) = self.session.run(None, {"image": image.cpu().numpy().astype(np.float32, copy=False)})
+        return torch.from_numpy(preds)
+
+
+class OnnxDetector(_OnnxModule):
+    def __call__(self, image):
+        scores, feature = self.session.run(None, {"image": image.cpu().numpy().astype(np.float32, copy=False)})
+        return torch.from_numpy(scores), torch.from_numpy(feature)
+
+
+def install_onnx_backend(reader, model_dir: str = OCR_ONNX_DIR, int8: bool = OCR_ONNX_INT8,
+                         include_detector: bool = OCR_ONNX_DETECTOR):
+    """
+    Replace the reader's PyTorch recognizer (and detector) with ONNX Runtime
+    sessions, exporting the models first if they aren't on disk yet.
+    `reader` must have been created with quantize=False so it can be exported.
+    """
+    paths = model_paths(model_dir)
+    missing = not os.path.exists(paths["recognizer"]) or (include_detector and not os.path.exists(paths["detector"]))
+    if missing:
+        export_models(reader, model_dir, include_detector=include_detector)
+
+    suffix = "_int8" if int8 else ""
+    reader.recognizer = OnnxRecognizer(paths["recognizer" + suffix])
+    if include_detector:
+        reader.detector = OnnxDetector(paths["detector" + suffix])
+
+    logger.info("⚙️ OCR backend: ONNX Runtime (%s, detector: %s)",
+                "INT8" if int8 else "FP32", "onnx" if include_detector else "torch")
+    return reader
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    export_models()
@@ -0,0 +1,289 @@
+"""
+OCR Worker Pool
+Runs EasyOCR in separate processes so inference doesn't hold the API
+process's GIL and can use several cores at once.
+
+Frames are handed over through a ring of `multiprocessing.shared_memory`
+slots: the API process copies a frame into a free slot once, and the worker
+wraps that memory in a NumPy view without copying or pickling it. Only the
+small task header (slot, shape, dtype) and the OCR results travel over the
+queues.
+
+Each worker has its own task queue, so the pool knows which tasks a worker
+holds: if it dies, those tasks fail, their slots are freed and the worker is
+restarted.
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Message types sent from workers to the API process
+_READY = "ready"
+_RESULT = "result"
+
+# Seconds between liveness checks of the worker processes
+_CHECK_INTERVAL = 1.0
+
+
+def _to_builtin(value):
+    """Convert NumPy scalars/arrays inside OCR results to plain Python types"""
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_builtin(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _worker_main(worker_id, slot_names, task_queue, result_queue, torch_threads):
+    """Entry point of each worker process"""
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    from api.ocr_engine import get_reader
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    reader = get_reader()
+    reader.readtext(np.zeros((64, 256), dtype=np.uint8), detail=1, paragraph=False)
+    result_queue.put((_READY, worker_id, None, None))
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            task_id, method, slot, shape, dtype, inline_image, kwargs = task
+            try:
+                if slot is None:
+                    image = inline_image
+                else:
+                    # Zero-copy view over the shared slot
+                    image = np.ndarray(shape, dtype=dtype, buffer=slots[slot].buf)
+                # readtext, detect or recognize
+                results = getattr(reader, method)(image, **kwargs)
+                result_queue.put((_RESULT, task_id, _to_builtin(results), None))
+            except Exception as e:
+                result_queue.put((_RESULT, task_id, None, f"{type(e).__name__}: {e}"))
+            finally:
+                image = None
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class OCRWorkerPool:
+    """Pool of OCR processes fed through a shared-memory frame ring"""
+
+    def __init__(self, workers: int, slots: int, slot_bytes: int, torch_threads: int = 0):
+        self.workers = workers
+        self.slot_bytes = slot_bytes
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+        # spawn: forking a process that may already hold torch/OpenCV threads is unsafe
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._shm = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slots)]
+
+        self._free_slots = deque(range(slots))
+        self._slot_available = threading.Condition()
+        self._pending = {}              # task_id -> (Future, slot, worker_id)
+        self._pending_lock = threading.Lock()
+        self._task_ids = itertools.count()
+
+        self._processes = [None] * workers
+        self._task_queues = [None] * workers
+        self._assigned = [set() for _ in range(workers)]  # task ids sent to each worker
+        self._ready_workers = set()
+        self.ready = threading.Event()
+        self.error = None
+        self._collector = None
+        self._closed = False
+
+    def start(self):
+        for worker_id in range(self.workers):
+            self._start_worker(worker_id)
+
+        self._collector = threading.Thread(target=self._collect_results, name="ocr-results", daemon=True)
+        self._collector.start()
+        logger.info("🧵 Started %d OCR worker process(es), %d shared-memory slots of %.1f MB",
+                    self.workers, len(self._shm), self.slot_bytes / 1e6)
+
+    def submit(self, image: np.ndarray, method: str = "readtext", **kwargs) -> Future:
+        """Queue an EasyOCR call on an image; the Future resolves to its result"""
+        if self._closed:
+            raise RuntimeError("OCR worker pool is shut down")
+        if self.error:
+            raise RuntimeError(self.error)
+
+        image = np.ascontiguousarray(image)
+        task_id = next(self._task_ids)
+        future = Future()
+        slot = None
+        inline_image = None
+
+        if image.nbytes <= self.slot_bytes:
+            slot = self._acquire_slot()
+            np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm[slot].buf)[...] = image
+        else:
+            # Larger than a slot (e.g. full-size phone photo): send it pickled
+            inline_image = image
+
+        with self._pending_lock:
+            # The least busy live worker; a dead one is restarted by the collector
+            alive = [w for w in range(self.workers) if self._processes[w].is_alive()] or range(self.workers)
+            worker_id = min(alive, key=lambda w: len(self._assigned[w]))
+            self._pending[task_id] = (future, slot, worker_id)
+            self._assigned[worker_id].add(task_id)
+            self._task_queues[worker_id].put(
+                (task_id, method, slot, image.shape, image.dtype.str, inline_image, kwargs))
+        return future
+
+    def call(self, method: str, image: np.ndarray, timeout: float | None = None, **kwargs):
+        return self.submit(image, method, **kwargs).result(timeout)
+
+    def readtext(self, image: np.ndarray, timeout: float | None = None, **kwargs):
+        return self.call("readtext", image, timeout, **kwargs)
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._result_queue.put(None)
+        if self._collector is not None:
+            self._collector.join(timeout=5)
+
+        with self._pending_lock:
+            for future, _, _ in self._pending.values():
+                future.set_exception(RuntimeError("OCR worker pool shut down"))
+            self._pending.clear()
+
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        logger.info("🛑 OCR worker pool stopped")
+
+    # --- Internals ---
+
+    def _start_worker(self, worker_id):
+        # A fresh queue: the old one may still hold tasks that were already failed
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, [shm.name for shm in self._shm], task_queue, self._result_queue, self.torch_threads),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._task_queues[worker_id] = task_queue
+        self._processes[worker_id] = process
+
+    def _acquire_slot(self) -> int:
+        # Back-pressure: callers wait while every slot holds an in-flight frame
+        with self._slot_available:
+            while not self._free_slots:
+                if self._closed or self.error:
+                    raise RuntimeError(self.error or "OCR worker pool is shut down")
+                self._slot_available.wait(_CHECK_INTERVAL)
+            return self._free_slots.popleft()
+
+    def _release_slot(self, slot):
+        if slot is None:
+            return
+        with self._slot_available:
+            self._free_slots.append(slot)
+            self._slot_available.notify()
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while True:
+            # Checked on a timer too: results from other workers keep the queue busy
+            if time.monotonic() - last_check >= _CHECK_INTERVAL:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                message = self._result_queue.get(timeout=_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            if message is None:
+                return
+
+            kind, key, results, error = message
+            if kind == _READY:
+                self._ready_workers.add(key)
+                if self.ready.is_set():
+                    logger.info("🔥 OCR worker %d restarted and warmed up", key)
+                elif len(self._ready_workers) == self.workers:
+                    self.ready.set()
+                    logger.info("🔥 All OCR workers warmed up")
+                continue
+
+            with self._pending_lock:
+                future, slot, worker_id = self._pending.pop(key, (None, None, None))
+                if worker_id is not None:
+                    self._assigned[worker_id].discard(key)
+            self._release_slot(slot)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(results)
+
+    def _check_workers(self):
+        """Fail the tasks of workers that died and restart them"""
+        if self._closed:
+            return
+        for worker_id, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            # Only restart workers that loaded the model once; otherwise (e.g.
+            # the model fails to load) it would just die again
+            restart = worker_id in self._ready_workers
+            with self._pending_lock:
+                lost = [self._pending.pop(task_id) for task_id in self._assigned[worker_id]]
+                self._assigned[worker_id].clear()
+                if restart:
+                    self._ready_workers.discard(worker_id)
+                    old_queue = self._task_queues[worker_id]
+                    self._start_worker(worker_id)
+            message = f"OCR worker {worker_id} exited (code {process.exitcode})"
+            for future, slot, _ in lost:
+                self._release_slot(slot)
+                future.set_exception(RuntimeError(message))
+            if restart:
+                old_queue.close()
+                old_queue.cancel_join_thread()
+                logger.error("❌ %s with %d task(s) in flight, restarting it", message, len(lost))
+
+        if any(process.is_alive() for process in self._processes):
+            return
+        self.error = "All OCR worker processes exited"
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future, slot, _ in pending:
+            self._release_slot(slot)
+            future.set_exception(RuntimeError(self.error))
@@ -0,0 +1,156 @@
+"""
+Plate Format Model
+Philippine (LTO) plate grammar with position-aware OCR correction.
+
+Each format in PLATE_FORMATS is a pattern of L (letter) and D (digit)
+positions, e.g. "LLLDDDD" for ABC 1234. Formats are compiled once into NumPy
+masks; candidates are then scored against every format in a single
+vectorized pass per length:
+
+    - characters already of the right class cost nothing
+    - look-alike characters in the wrong class are corrected
+      (0→O in a letter slot, O→0 in a digit slot, ...) at a small penalty
+    - anything else rules the format out
+
+A candidate longer than a format is also tried as each of its substrings of
+that length (merged OCR segments often pick up stray characters at the
+edges), at a penalty per trimmed character.
+
+The masks and lookup tables are built on first use, so NumPy isn't loaded
+by merely importing this module; PLATE_FORMATS is still checked at import.
+"""
+
+import functools
+
+from api.config import PLATE_FORMATS
+
+# Score multipliers
+CORRECTION_PENALTY = 0.85   # per corrected character
+TRIM_PENALTY = 0.9          # per character trimmed from the candidate
+
+# Beyond these limits a "match" is more likely junk text bent into shape
+MAX_CORRECTIONS = 2
+MAX_TRIM = 3
+MIN_SCORE = 0.5
+
+# Look-alike corrections by slot type
+DIGIT_TO_LETTER = {"0": "O", "1": "I", "2": "Z", "4": "A", "5": "S", "6": "G", "7": "T", "8": "B"}
+LETTER_TO_DIGIT = {"O": "0", "D": "0", "Q": "0", "U": "0", "I": "1", "L": "1", "J": "1",
+                   "Z": "2", "A": "4", "S": "5", "G": "6", "T": "7", "B": "8"}
+
+
+def _build_tables():
+    """ASCII lookup tables: corrected code for letter/digit slots (0 = impossible)"""
+    import numpy as np
+
+    as_letter = np.zeros(128, dtype=np.uint8)
+    as_digit = np.zeros(128, dtype=np.uint8)
+    for c in range(ord("A"), ord("Z") + 1):
+        as_letter[c] = c
+    for c in range(ord("0"), ord("9") + 1):
+        as_digit[c] = c
+    for src, dst in DIGIT_TO_LETTER.items():
+        as_letter[ord(src)] = ord(dst)
+    for src, dst in LETTER_TO_DIGIT.items():
+        as_digit[ord(src)] = ord(dst)
+    return as_letter, as_digit
+
+
+def check_formats(patterns):
+    """Raise ValueError for a pattern with anything but 'L' and 'D' in it"""
+    for pattern in patterns:
+        if set(pattern) - {"L", "D"}:
+            raise ValueError(f"Invalid plate format {pattern!r}: use only 'L' and 'D'")
+
+
+def compile_formats(patterns):
+    """Group patterns by length as boolean masks (True = letter slot)"""
+    import numpy as np
+
+    check_formats(patterns)
+    compiled = {}
+    for pattern in patterns:
+        compiled.setdefault(len(pattern), []).append(np.array([ch == "L" for ch in pattern]))
+    return {length: np.stack(masks) for length, masks in compiled.items()}
+
+
+# A bad PLATE_FORMATS entry should stop startup, not the first plate read
+check_formats(PLATE_FORMATS)
+
+
+@functools.cache
+def _tables():
+    """(as_letter, as_digit, compiled PLATE_FORMATS), built once on first use"""
+    return (*_build_tables(), compile_formats(PLATE_FORMATS))
+
+
+def _windows(text: str, length: int):
+    """All substrings of `text` with the given length, with trimmed char count"""
+    trimmed = len(text) - length
+    return [(text[i:i + length], trimmed) for i in range(trimmed + 1)]
+
+
+def score_candidates(candidates, formats=None, allow_trim: bool = True):
+    """
+    Score (text, confidence) candidates against the plate grammar.
+
+    Returns a list of (plate, score, source_index) for every candidate window
+    that fits at least one format, keeping the best format per window.
+    `plate` is the corrected text, `score` the confidence after penalties.
+    """
+    import numpy as np
+
+    as_letter, as_digit, default_formats = _tables()
+    formats = default_formats if formats is None else formats
+    matches = []
+
+    for length, masks in formats.items():
+        # Expand candidates into fixed-length windows for this format length
+        rows, trims, sources = [], [], []
+        for index, (text, _) in enumerate(candidates):
+            if not length <= len(text) <= length + (MAX_TRIM if allow_trim else 0) or not text.isascii():
+                continue
+            for window, trimmed in _windows(text, length):
+                rows.append(window.encode("ascii"))
+                trims.append(trimmed)
+                sources.append(index)
+        if not rows:
+            continue
+
+        codes = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), length)
+
+        # (windows, formats, positions)
+        letter_slots = masks[None, :, :]
+        fixed = np.where(letter_slots, as_letter[codes][:, None, :], as_digit[codes][:, None, :])
+        valid = (fixed != 0).all(axis=2)
+        corrections = (fixed != codes[:, None, :]).sum(axis=2)
+
+        # Best format per window = fewest corrections among valid formats
+        corrections = np.where(valid, corrections, length + 1)
+        best_format = corrections.argmin(axis=1)
+        best_corrections = corrections[np.arange(len(rows)), best_format]
+
+        for row in np.nonzero(best_corrections <= MAX_CORRECTIONS)[0]:
+            prob = candidates[sources[row]][1]
+            score = prob * CORRECTION_PENALTY ** int(best_corrections[row]) * TRIM_PENALTY ** trims[row]
+            plate = fixed[row, best_format[row]].tobytes().decode("ascii")
+            matches.append((plate, float(score), sources[row]))
+
+    return matches
+
+
+def best_plate(candidates, allow_trim: bool = True):
+    """Highest-scoring grammar-conforming plate among (text, confidence) pairs"""
+    matches = [m for m in score_candidates(candidates, allow_trim=allow_trim) if m[1] >= MIN_SCORE]
+    if not matches:
+        return None, 0.0
+    plate, score, _ = max(matches, key=lambda m: m[1])
+    return plate, score
+
+
+def normalize_plate(text: str) -> str | None:
+    """Correct a single plate string to the grammar, or None if it can't fit"""
+    cleaned = "".join(ch for ch in text.upper() if ch.isalnum())
+    matches = score_candidates([(cleaned, 1.0)], allow_trim=False)
+    plate = max(matches, key=lambda m: m[1])[0] if matches else None
+    return plate
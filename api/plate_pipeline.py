@@ -0,0 +1,174 @@
+"""
+Plate Pipeline
+Reads plates out of a region of interest: text detection on a downscaled
+copy, grouping of detector boxes into plate regions, recognition of only the
+regions that still need a read, and plate-format scoring of the merged text.
+
+Shared by the live stream (api/camera_stream.py), the edge detector
+(api/realtime_detection.py), the upload endpoints and the benchmarks, so it
+only depends on the OCR engine and preprocessing, not on the web app.
+"""
+
+import re
+
+from api import ocr_engine, plate_format
+from api.config import CONFIDENCE_THRESHOLD, OCR_DETECT_WIDTH
+from api.preprocessing import get_preprocessor
+
+# Text on the same line (Y within 30px) and close together (X gap < 100px)
+# belongs to the same plate
+LINE_Y_TOLERANCE = 30
+MAX_X_GAP = 100
+
+# Recognition crops are padded by this many pixels (at detection scale) so
+# characters cut off by a tight detector box are still read
+RECOGNIZE_PADDING = 4
+
+def detect_scale(image, detect_width=OCR_DETECT_WIDTH):
+    """Factor from full-resolution ROI to the downscaled image used for text detection"""
+    return min(1.0, detect_width / image.shape[1])
+
+def preprocess_roi(roi, preprocessor=None):
+    """
+    Grayscale + CLAHE + sharpening (see api/preprocessing.py).
+    The result is a reused buffer, valid until the next call in this thread.
+    """
+    return (preprocessor or get_preprocessor()).process(roi)
+
+def merge_segments(results):
+    """
+    Merge adjacent OCR text segments that belong to the same plate.
+    E.g. 'DBA' + '4658' on the same line → 'DBA4658'
+    """
+    segments = []
+    for (bbox, text, prob) in results:
+        cleaned = re.sub(r'[^A-Z0-9]', '', text.upper())
+        if prob >= 0.25 and len(cleaned) > 0:
+            x0 = bbox[0][0]
+            y_center = (bbox[0][1] + bbox[2][1]) / 2
+            x_end = bbox[1][0]
+            segments.append({
+                'text': cleaned,
+                'x0': x0,
+                'x_end': x_end,
+                'y': y_center,
+                'prob': prob
+            })
+
+    # Sort left-to-right
+    segments.sort(key=lambda s: s['x0'])
+
+    merged = []
+    if segments:
+        curr = segments[0].copy()
+        for i in range(1, len(segments)):
+            next_s = segments[i]
+            # Same horizontal line and close together
+            if abs(next_s['y'] - curr['y']) < LINE_Y_TOLERANCE and (next_s['x0'] - curr['x_end']) < MAX_X_GAP:
+                curr['text'] += next_s['text']
+                curr['x_end'] = next_s['x_end']
+                curr['prob'] = (curr['prob'] + next_s['prob']) / 2
+            else:
+                merged.append(curr)
+                curr = next_s.copy()
+        merged.append(curr)
+
+    return merged
+
+def group_text_boxes(horizontal_list, free_list):
+    """
+    Group detector boxes into plate-sized regions using the same line/gap
+    rule as merge_segments, before any recognition has run.
+    Returns [{'box': (x0, y0, x1, y1), 'horizontal': [...], 'free': [...]}].
+    """
+    boxes = []
+    for box in horizontal_list:
+        x_min, x_max, y_min, y_max = box
+        boxes.append(((x_min, y_min, x_max, y_max), 'horizontal', box))
+    for poly in free_list:
+        xs = [p[0] for p in poly]
+        ys = [p[1] for p in poly]
+        boxes.append(((min(xs), min(ys), max(xs), max(ys)), 'free', poly))
+
+    # Sort left-to-right
+    boxes.sort(key=lambda b: b[0][0])
+
+    regions = []
+    for (x0, y0, x1, y1), kind, raw in boxes:
+        y_center = (y0 + y1) / 2
+        for region in regions:
+            rx0, ry0, rx1, ry1 = region['box']
+            if abs(y_center - (ry0 + ry1) / 2) < LINE_Y_TOLERANCE and x0 - rx1 < MAX_X_GAP:
+                region['box'] = (min(rx0, x0), min(ry0, y0), max(rx1, x1), max(ry1, y1))
+                region[kind].append(raw)
+                break
+        else:
+            region = {'box': (x0, y0, x1, y1), 'horizontal': [], 'free': []}
+            region[kind].append(raw)
+            regions.append(region)
+
+    return regions
+
+def recognize_region(image, region, scale, preprocessor=None):
+    """
+    Recognize one detected region from the full-resolution ROI.
+    Only the region's (padded) crop is preprocessed, and the detector boxes
+    are mapped from detection scale into the crop's coordinates.
+    """
+    h, w = image.shape[:2]
+    x0, y0, x1, y1 = region['box']
+    cx0 = max(0, int((x0 - RECOGNIZE_PADDING) / scale))
+    cy0 = max(0, int((y0 - RECOGNIZE_PADDING) / scale))
+    cx1 = min(w, int((x1 + RECOGNIZE_PADDING) / scale) + 1)
+    cy1 = min(h, int((y1 + RECOGNIZE_PADDING) / scale) + 1)
+    crop = preprocess_roi(image[cy0:cy1, cx0:cx1], preprocessor)
+
+    horizontal_list = [[max(0, int(bx0 / scale) - cx0), int(bx1 / scale) - cx0,
+                        max(0, int(by0 / scale) - cy0), int(by1 / scale) - cy0]
+                       for bx0, bx1, by0, by1 in region['horizontal']]
+    free_list = [[[x / scale - cx0, y / scale - cy0] for x, y in poly]
+                 for poly in region['free']]
+    return ocr_engine.recognize(crop, horizontal_list, free_list, detail=1, paragraph=False)
+
+def read_tracked_plates(image, tracker, now=None, preprocessor=None):
+    """
+    Multi-scale OCR of a full-resolution BGR ROI with per-vehicle tracking:
+    1. Detect text regions on a downscaled, preprocessed copy (no recognition yet)
+    2. Match regions to tracks
+    3. Recognize only regions whose track has no confirmed plate yet, from
+       the full-resolution crop
+    Returns [(track, best_plate, best_prob)] for each region in this frame;
+    best_plate is None for confirmed tracks (not re-read) and failed reads.
+    Track boxes are in detection-scale coordinates (see detect_scale).
+    """
+    preprocessor = preprocessor or get_preprocessor()
+    scale = detect_scale(image)
+    small = image if scale == 1.0 else preprocessor.resize(image, scale, "detect")
+    horizontal_list, free_list = ocr_engine.detect(preprocess_roi(small, preprocessor))
+    regions = group_text_boxes(horizontal_list, free_list)
+    tracks = tracker.update([region['box'] for region in regions], now)
+
+    reads = []
+    for region, track in zip(regions, tracks):
+        best_plate, best_prob = None, 0.0
+        if not track.confirmed:
+            track.ocr_calls += 1
+            results = recognize_region(image, region, scale, preprocessor)
+            best_plate, best_prob = find_best_plate(merge_segments(results))
+            if best_plate:
+                track.add_read(best_plate, best_prob)
+        reads.append((track, best_plate, best_prob))
+
+    return reads
+
+def find_best_plate(merged_segments, min_confidence=CONFIDENCE_THRESHOLD):
+    """
+    From merged OCR segments, find the best plate candidate:
+    - OCR confidence of at least min_confidence
+    - Must fit a PLATE_FORMATS pattern after look-alike correction
+      (e.g. 'A8C1Z34' -> 'ABC1234')
+    - Highest score (confidence minus correction penalties) wins
+    """
+    candidates = [(cand['text'], cand['prob']) for cand in merged_segments
+                  if cand['prob'] >= min_confidence]
+    return plate_format.best_plate(candidates)
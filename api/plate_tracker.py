@@ -0,0 +1,111 @@
+"""
+Plate Tracker
+Lightweight IoU/centroid tracker over the text regions found in the ROI.
+
+Each track owns its own PlateVoter and cooldown flag, so two vehicles in
+frame (or a vehicle and a sign) no longer interleave reads in one shared
+buffer. Once a track's plate is confirmed it is only followed by position;
+the recognizer is not run on it again until the track is lost.
+"""
+
+import itertools
+import time
+
+from api.config import TRACK_IOU_THRESHOLD, TRACK_MAX_DISTANCE, TRACK_MAX_AGE
+from api.plate_voting import PlateVoter
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two (x0, y0, x1, y1) boxes"""
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a, b) -> float:
+    dx = (a[0] + a[2]) / 2 - (b[0] + b[2]) / 2
+    dy = (a[1] + a[3]) / 2 - (b[1] + b[3]) / 2
+    return (dx * dx + dy * dy) ** 0.5
+
+
+class Track:
+    """One text region followed across OCR frames"""
+
+    def __init__(self, track_id: int, box, now: float):
+        self.id = track_id
+        self.box = box
+        self.voter = PlateVoter()
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.ocr_calls = 0
+        self.plate = None          # consensus so far
+        self.support = 0.0
+        self.confirmed = False
+        self.logged = False        # already queued for DB/ESP32 during this track
+
+    def add_read(self, plate: str, confidence: float):
+        vote = self.voter.add(plate, confidence)
+        self.plate, self.support = vote.plate, vote.support
+        if vote.confirmed:
+            self.confirmed = True
+        return vote
+
+
+class PlateTracker:
+    """Associates regions frame-to-frame and expires tracks that disappear"""
+
+    def __init__(self, iou_threshold: float = TRACK_IOU_THRESHOLD,
+                 max_distance: float = TRACK_MAX_DISTANCE, max_age: float = TRACK_MAX_AGE):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, now: float | None = None):
+        """
+        Match this frame's region boxes to tracks (greedy, best IoU first,
+        then nearest centroid). Returns the Track for each box, in order.
+        """
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        pairs = []
+        for i, box in enumerate(boxes):
+            for track in self.tracks.values():
+                overlap = iou(box, track.box)
+                distance = centroid_distance(box, track.box)
+                if overlap >= self.iou_threshold or distance <= self.max_distance:
+                    # Sort key: prefer overlap, then closeness
+                    pairs.append((-overlap, distance, i, track.id))
+        pairs.sort()
+
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for _, _, i, track_id in pairs:
+            if assigned[i] is not None or track_id in used_tracks:
+                continue
+            track = self.tracks[track_id]
+            track.box = boxes[i]
+            track.last_seen = now
+            track.hits += 1
+            assigned[i] = track
+            used_tracks.add(track_id)
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                track = Track(next(self._ids), box, now)
+                self.tracks[track.id] = track
+                assigned[i] = track
+
+        return assigned
+
+    def _expire(self, now: float):
+        for track_id in [t.id for t in self.tracks.values() if now - t.last_seen > self.max_age]:
+            del self.tracks[track_id]
+
+    def clear(self):
+        self.tracks.clear()
@@ -0,0 +1,71 @@
+"""
+Plate Voting
+Confidence-weighted, per-character temporal verification.
+
+Instead of requiring VERIFICATION_COUNT identical strings, every read votes
+for each character position with its OCR confidence. A plate is confirmed
+once every position has a clear winner with enough accumulated confidence,
+so reads that disagree on one character (a common misread on fast-moving
+cars) still add up instead of resetting confirmation.
+"""
+
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+from api.config import BUFFER_SIZE, VOTE_CONFIRM_WEIGHT, VOTE_MIN_SHARE, VOTE_MIN_READS
+from api.plate_format import normalize_plate
+
+
+class Vote(NamedTuple):
+    plate: str | None      # current consensus (None until there is one)
+    support: float         # weakest position's winning weight
+    confirmed: bool
+
+
+class PlateVoter:
+    """Rolling window of the last `maxlen` reads for one vehicle/track"""
+
+    def __init__(self, maxlen: int = BUFFER_SIZE, confirm_weight: float = VOTE_CONFIRM_WEIGHT,
+                 min_share: float = VOTE_MIN_SHARE, min_reads: int = VOTE_MIN_READS):
+        self.reads = deque(maxlen=maxlen)   # (plate, confidence)
+        self.confirm_weight = confirm_weight
+        self.min_share = min_share
+        self.min_reads = min_reads
+
+    def add(self, plate: str, confidence: float) -> Vote:
+        self.reads.append((plate, confidence))
+        return self.consensus()
+
+    def consensus(self) -> Vote:
+        if not self.reads:
+            return Vote(None, 0.0, False)
+
+        # Only reads of the dominant length can be compared position-by-position
+        weight_by_length = defaultdict(float)
+        for plate, confidence in self.reads:
+            weight_by_length[len(plate)] += confidence
+        length = max(weight_by_length, key=weight_by_length.get)
+        reads = [(p, c) for p, c in self.reads if len(p) == length]
+
+        chars = []
+        support = float("inf")
+        clear_winner = True
+        for position in range(length):
+            votes = defaultdict(float)
+            for plate, confidence in reads:
+                votes[plate[position]] += confidence
+            char, weight = max(votes.items(), key=lambda item: item[1])
+            chars.append(char)
+            support = min(support, weight)
+            clear_winner &= weight / sum(votes.values()) >= self.min_share
+
+        plate = "".join(chars)
+        confirmed = (len(reads) >= self.min_reads
+                     and clear_winner
+                     and support >= self.confirm_weight
+                     # Mixed formats of the same length could vote in a hybrid
+                     and normalize_plate(plate) == plate)
+        return Vote(plate, support, confirmed)
+
+    def clear(self):
+        self.reads.clear()
@@ -0,0 +1,345 @@
+"""
+Pub/Sub Backends
+Carry dashboard events (see api/websocket_manager.py) between API workers,
+so a detection logged by one uvicorn worker reaches dashboards connected
+to any of them.
+
+Every worker publishes its events to the backend and delivers every event
+it gets back, its own included, to its local WebSocket clients. The backend
+also numbers events, so sequence numbers (and since=<seq> resumes) mean the
+same thing on every worker.
+
+    memory   single process (the default); nothing leaves the worker
+    sqlite   workers on one host share a small SQLite file, which each
+             worker polls for new rows. The file also keeps recent events,
+             so a restarted worker can still serve resumes.
+    redis    workers on any number of hosts share a Redis server (INCR for
+             numbering, PUBLISH for fan-out). Needs `pip install redis`.
+             LocalRedis is an in-process stand-in with the same interface,
+             for trying this path without a server.
+
+publish() is called from the after_commit hooks, often on the event loop,
+so the sqlite and redis backends only queue the event there; a publisher
+thread per worker writes them out in order.
+"""
+
+import json
+import logging
+import queue
+import secrets
+import sqlite3
+import threading
+from collections import defaultdict, deque
+
+from api.config import (
+    PUBSUB_BACKEND,
+    PUBSUB_SQLITE_FILE,
+    PUBSUB_POLL_INTERVAL,
+    PUBSUB_REDIS_URL,
+    PUBSUB_CHANNEL,
+    WS_HISTORY_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Events waiting for the publisher thread; past this (backend down or far
+# too slow) new events are dropped rather than piling up in memory
+PUBLISH_QUEUE_SIZE = 1000
+
+
+class PubSubBackend:
+    """
+    start(loop, deliver) begins delivery: deliver(seq, topics, message, origin)
+    is called on `loop` for every event, in sequence order. publish() may be
+    called from any thread.
+    """
+
+    name = "base"
+    epoch = None
+
+    def start(self, loop, deliver):
+        raise NotImplementedError
+
+    def publish(self, topics, message: dict, origin: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InProcessBackend(PubSubBackend):
+    name = "memory"
+
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self._loop = None
+        self._deliver = None
+
+    def start(self, loop, deliver):
+        self._loop, self._deliver = loop, deliver
+
+    def publish(self, topics, message, origin):
+        if self._loop is None or self._loop.is_closed():
+            return
+        # Numbered on the loop, so events from different threads can't swap places
+        self._loop.call_soon_threadsafe(self._number, list(topics), message, origin)
+
+    def _number(self, topics, message, origin):
+        self.seq += 1
+        self._deliver(self.seq, topics, message, origin)
+
+
+class QueuedBackend(PubSubBackend):
+    """publish() hands the event to one sender thread, so order is kept and the caller never blocks"""
+
+    def _start_publisher(self):
+        self._outbox = queue.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._publisher = threading.Thread(target=self._send_loop, name=f"pubsub-{self.name}-publish",
+                                           daemon=True)
+        self._publisher.start()
+
+    def publish(self, topics, message, origin):
+        try:
+            self._outbox.put_nowait((list(topics), message, origin))
+        except queue.Full:
+            logger.error("❌ Pub/sub publish queue full, dropping dashboard event")
+
+    def _send(self, topics, message, origin):
+        raise NotImplementedError
+
+    def _send_loop(self):
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            try:
+                self._send(*item)
+            except Exception as e:
+                logger.error("❌ Failed to publish dashboard event: %s", e)
+
+    def _stop_publisher(self, timeout: float = 2.0):
+        """Send what's queued, then stop the sender thread"""
+        try:
+            self._outbox.put(None, timeout=timeout)
+        except queue.Full:
+            return                   # sender is stuck; it's a daemon thread
+        self._publisher.join(timeout)
+
+
+class SQLiteBackend(QueuedBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str = PUBSUB_SQLITE_FILE, poll_interval: float = PUBSUB_POLL_INTERVAL,
+                 keep: int = WS_HISTORY_SIZE):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._published = 0
+
+        self._conn = self._connect()
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "topics TEXT NOT NULL, origin TEXT NOT NULL, payload TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # Shared by every worker using the file, and kept across restarts
+            # along with the sequence
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)", (secrets.token_hex(4),))
+        self.epoch = self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+        self._start_publisher()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self, loop, deliver):
+        # Start far enough back to refill the WebSocket history
+        with self._lock:
+            last = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+        self._thread = threading.Thread(target=self._poll, args=(loop, deliver, max(0, last - self.keep)),
+                                        name="pubsub-sqlite", daemon=True)
+        self._thread.start()
+
+    def _send(self, topics, message, origin):
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO events (topics, origin, payload) VALUES (?, ?, ?)",
+                                        (",".join(topics), origin, json.dumps(message)))
+            self._published += 1
+            if self._published % 100 == 0:
+                self._conn.execute("DELETE FROM events WHERE seq <= ?", (cursor.lastrowid - self.keep,))
+
+    def _poll(self, loop, deliver, last):
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                try:
+                    rows = conn.execute("SELECT seq, topics, origin, payload FROM events WHERE seq > ? ORDER BY seq",
+                                        (last,)).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Pub/sub poll failed: %s", e)
+                    rows = []
+                for seq, topics, origin, payload in rows:
+                    loop.call_soon_threadsafe(deliver, seq, topics.split(","), json.loads(payload), origin)
+                    last = seq
+                self._stop.wait(self.poll_interval)
+        except RuntimeError:
+            pass  # event loop closed during shutdown
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop_publisher()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        with self._lock:
+            self._conn.close()
+
+
+class RedisBackend(QueuedBackend):
+    name = "redis"
+
+    def __init__(self, url: str = PUBSUB_REDIS_URL, channel: str = PUBSUB_CHANNEL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("PUBSUB_BACKEND = 'redis' needs the redis package (pip install redis)")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+        self._pubsub = None
+
+        self.client.set(f"{channel}:epoch", secrets.token_hex(4), nx=True)
+        self.epoch = _text(self.client.get(f"{channel}:epoch"))
+        self._start_publisher()
+
+    def start(self, loop, deliver):
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        self._thread = threading.Thread(target=self._listen, args=(loop, deliver),
+                                        name="pubsub-redis", daemon=True)
+        self._thread.start()
+
+    def _send(self, topics, message, origin):
+        # Two workers publishing at the same moment may be received in the
+        # opposite order to their numbers; the WebSocket history sorts replays
+        seq = self.client.incr(f"{self.channel}:seq")
+        self.client.publish(self.channel, json.dumps({"seq": seq, "topics": topics,
+                                                      "origin": origin, "message": message}))
+
+    def _listen(self, loop, deliver):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._pubsub.get_message(timeout=1.0)
+                except Exception as e:
+                    logger.warning("⚠️ Pub/sub connection error: %s", e)
+                    self._stop.wait(1.0)
+                    continue
+                if item and item.get("type") == "message":
+                    event = json.loads(item["data"])
+                    loop.call_soon_threadsafe(deliver, event["seq"], event["topics"], event["message"],
+                                              event["origin"])
+        except RuntimeError:
+            pass  # event loop closed during shutdown
+
+    def close(self):
+        self._stop_publisher()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the part of the redis-py client RedisBackend
+    uses (set/get/incr/publish/pubsub). Backends sharing one instance behave
+    like workers sharing one server.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def set(self, key, value, nx: bool = False):
+        with self._lock:
+            if nx and key in self._values:
+                return None
+            self._values[key] = value.encode() if isinstance(value, str) else value
+            return True
+
+    def get(self, key):
+        with self._lock:
+            return self._values.get(key)
+
+    def incr(self, key) -> int:
+        with self._lock:
+            value = int(self._values.get(key, 0)) + 1
+            self._values[key] = str(value).encode()
+            return value
+
+    def publish(self, channel, data) -> int:
+        data = data.encode() if isinstance(data, str) else data
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+        for subscriber in subscribers:
+            subscriber._push(channel, data)
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False):
+        return LocalPubSub(self)
+
+
+class LocalPubSub:
+    def __init__(self, server: LocalRedis):
+        self._server = server
+        self._channels = []
+        self._messages = deque()
+        self._ready = threading.Condition()
+
+    def subscribe(self, *channels):
+        with self._server._lock:
+            for channel in channels:
+                self._server._subscribers[channel].append(self)
+                self._channels.append(channel)
+
+    def _push(self, channel, data):
+        with self._ready:
+            self._messages.append({"type": "message", "channel": channel.encode(), "data": data})
+            self._ready.notify()
+
+    def get_message(self, timeout: float = 0.0, ignore_subscribe_messages: bool = True):
+        with self._ready:
+            if not self._messages:
+                self._ready.wait(timeout)
+            return self._messages.popleft() if self._messages else None
+
+    def close(self):
+        with self._server._lock:
+            for channel in self._channels:
+                self._server._subscribers[channel].remove(self)
+        self._channels = []
+
+
+def create_backend(name: str = PUBSUB_BACKEND) -> PubSubBackend:
+    backends = {"memory": InProcessBackend, "sqlite": SQLiteBackend, "redis": RedisBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown PUBSUB_BACKEND {name!r} (expected one of: {', '.join(backends)})")
+    backend = backends[name]()
+    logger.info("📡 Dashboard events via %s pub/sub (epoch %s)", backend.name, backend.epoch)
+    return backend
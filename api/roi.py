@@ -0,0 +1,186 @@
+"""
+Region of Interest
+Per-camera ROI polygons (from ROI_POLYGONS) and optional auto-calibration.
+
+Polygons are stored in normalized coordinates (0.0-1.0 of frame width and
+height) so they keep working when a camera's resolution changes. Only the
+polygon's bounding box is cropped; pixels outside a non-rectangular polygon
+are blacked out so the detector ignores them.
+
+With ROI_AUTO_CALIBRATE, every confirmed plate's position is recorded and,
+once enough samples exist, the ROI shrinks to the area where plates actually
+appear (plus a margin). The learned ROI is saved to ROI_CALIBRATION_FILE and
+reused on the next start.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from api.config import (
+    ROI_POLYGONS,
+    ROI_AUTO_CALIBRATE,
+    ROI_CALIBRATION_FILE,
+    ROI_CALIBRATION_MIN_SAMPLES,
+    ROI_CALIBRATION_MARGIN
+)
+
+logger = logging.getLogger(__name__)
+
+# Recompute the calibrated ROI after this many new samples
+RECALIBRATE_EVERY = 10
+# Plate positions kept for calibration (oldest are dropped)
+MAX_SAMPLES = 500
+# Ignore this share of outlying samples on each side (stray misplaced reads)
+OUTLIER_PERCENTILE = 2
+
+
+def camera_key(source) -> str:
+    """Key used for a camera in ROI_POLYGONS and the calibration file"""
+    return str(source)
+
+
+def _is_rectangle(polygon) -> bool:
+    xs = {x for x, _ in polygon}
+    ys = {y for _, y in polygon}
+    return len(polygon) == 4 and len(xs) == 2 and len(ys) == 2
+
+
+def _rectangle(x0, y0, x1, y1):
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+
+def load_calibration(path: str = ROI_CALIBRATION_FILE) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Ignoring unreadable ROI calibration %s: %s", path, e)
+        return {}
+
+
+def save_calibration(camera: str, polygon, path: str = ROI_CALIBRATION_FILE):
+    data = load_calibration(path)
+    data[camera] = [list(point) for point in polygon]
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+class RegionOfInterest:
+    """Normalized ROI polygon for one camera"""
+
+    def __init__(self, polygon, camera: str = "default"):
+        if len(polygon) < 3:
+            raise ValueError(f"ROI polygon for camera {camera!r} needs at least 3 points")
+        self.camera = camera
+        self.polygon = [(float(x), float(y)) for x, y in polygon]
+        self.rectangular = _is_rectangle(self.polygon)
+        self._masks = {}             # (h, w) -> mask for the cropped ROI
+
+    def bounds(self, shape):
+        """Pixel bounding box (x0, y0, x1, y1) of the polygon in a frame of this shape"""
+        h, w = shape[:2]
+        xs = [x for x, _ in self.polygon]
+        ys = [y for _, y in self.polygon]
+        x0 = max(0, int(min(xs) * w))
+        y0 = max(0, int(min(ys) * h))
+        x1 = min(w, int(max(xs) * w))
+        y1 = min(h, int(max(ys) * h))
+        return x0, y0, x1, y1
+
+    def crop(self, frame):
+        """Bounding-box view of the frame, with non-ROI pixels blacked out"""
+        x0, y0, x1, y1 = self.bounds(frame.shape)
+        roi = frame[y0:y1, x0:x1]
+        if self.rectangular:
+            return roi
+        import cv2
+        return cv2.bitwise_and(roi, roi, mask=self._mask(frame.shape))
+
+    def _mask(self, shape):
+        import cv2
+        import numpy as np
+
+        h, w = shape[:2]
+        mask = self._masks.get((h, w))
+        if mask is None:
+            x0, y0, x1, y1 = self.bounds(shape)
+            points = np.array([(x * w - x0, y * h - y0) for x, y in self.polygon], dtype=np.int32)
+            mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            cv2.fillPoly(mask, [points], 255)
+            self._masks = {(h, w): mask}
+        return mask
+
+
+class RoiCalibrator:
+    """Learns where plates appear from confirmed detections"""
+
+    def __init__(self, roi: RegionOfInterest, min_samples: int = ROI_CALIBRATION_MIN_SAMPLES,
+                 margin: float = ROI_CALIBRATION_MARGIN, path: str = ROI_CALIBRATION_FILE):
+        self.roi = roi
+        self.min_samples = min_samples
+        self.margin = margin
+        self.path = path
+        self.samples = []            # normalized (x0, y0, x1, y1) plate boxes
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def add(self, box, shape):
+        """
+        Record a confirmed plate's pixel box (frame coordinates). Returns the
+        new ROI when the calibration was updated, otherwise None.
+        """
+        h, w = shape[:2]
+        x0, y0, x1, y1 = box
+        with self._lock:
+            self.samples.append((x0 / w, y0 / h, x1 / w, y1 / h))
+            del self.samples[:-MAX_SAMPLES]
+            self._pending += 1
+            if len(self.samples) < self.min_samples or self._pending < RECALIBRATE_EVERY:
+                return None
+            self._pending = 0
+            polygon = self.fit()
+
+        self.roi = RegionOfInterest(polygon, self.roi.camera)
+        try:
+            save_calibration(self.roi.camera, polygon, self.path)
+        except OSError as e:
+            logger.warning("⚠️ Could not save ROI calibration: %s", e)
+        logger.info("🎯 ROI calibrated for camera %s from %d plates: x %.2f-%.2f, y %.2f-%.2f",
+                    self.roi.camera, len(self.samples), polygon[0][0], polygon[2][0],
+                    polygon[0][1], polygon[2][1])
+        return self.roi
+
+    def fit(self):
+        """Rectangle covering (almost) every sample, grown by the margin"""
+        import numpy as np
+
+        boxes = np.array(self.samples)
+        x0 = np.percentile(boxes[:, 0], OUTLIER_PERCENTILE)
+        y0 = np.percentile(boxes[:, 1], OUTLIER_PERCENTILE)
+        x1 = np.percentile(boxes[:, 2], 100 - OUTLIER_PERCENTILE)
+        y1 = np.percentile(boxes[:, 3], 100 - OUTLIER_PERCENTILE)
+        mx = (x1 - x0) * self.margin
+        my = (y1 - y0) * self.margin
+        return _rectangle(float(max(0.0, x0 - mx)), float(max(0.0, y0 - my)),
+                          float(min(1.0, x1 + mx)), float(min(1.0, y1 + my)))
+
+
+def roi_for(source) -> RegionOfInterest:
+    """
+    ROI for a camera source: the saved calibration (when auto-calibration is
+    on), else its ROI_POLYGONS entry, else ROI_POLYGONS["default"].
+    """
+    camera = camera_key(source)
+    if ROI_AUTO_CALIBRATE:
+        calibrated = load_calibration().get(camera)
+        if calibrated:
+            logger.info("🎯 Using calibrated ROI for camera %s", camera)
+            return RegionOfInterest(calibrated, camera)
+    polygon = ROI_POLYGONS.get(camera, ROI_POLYGONS["default"])
+    return RegionOfInterest(polygon, camera)
@@ -1,22 +1,42 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from api.database import SessionLocal
 from api import models
 from datetime import datetime
-from api.websocket_manager import manager
-import easyocr
-import numpy as np
-import cv2
-import re
+from api.change_feed import mark_live
+from api import ocr_engine
+from api.plate_pipeline import merge_segments, find_best_plate
+from api.worker_pool import upload_pool, Overloaded
+from api.config import (BATCH_MAX_IMAGES, BATCH_MAX_IMAGE_BYTES, BATCH_DECODE_WORKERS, BATCH_IMAGES_IN_FLIGHT,
+                        OCR_BATCH_SIZE)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import io
+import json
+import logging
+import os
 import pytz
+import zipfile
+import zlib
 
 # Philippine timezone
 PHILIPPINE_TZ = pytz.timezone('Asia/Manila')
 
+logger = logging.getLogger(__name__)
+ocr_logger = logging.getLogger("api.ocr")
+
 router = APIRouter()
 
-# Initialize EasyOCR reader (do this once to avoid reloading model each time)
-reader = easyocr.Reader(['en'], gpu=False)
+# Minimum OCR confidence for plates read from uploaded photos
+UPLOAD_CONFIDENCE_THRESHOLD = 0.3
+
+# Files taken from uploaded zip archives
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+# cv2.imdecode releases the GIL, so batch uploads decode in parallel
+decode_pool = ThreadPoolExecutor(max_workers=BATCH_DECODE_WORKERS, thread_name_prefix="batch-decode")
 
 # Dependency for DB
 def get_db():
@@ -26,6 +46,31 @@ def get_db():
     finally:
         db.close()
 
+def decode_image(image_bytes: bytes):
+    """BGR image from encoded bytes, or None if they can't be decoded"""
+    # Imported here so the API can start serving before the CV stack loads
+    import numpy as np
+    import cv2
+
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def plate_from_results(results) -> str | None:
+    """Best plate among the OCR reads of one photo, or None"""
+    ocr_logger.debug("🔍 OCR Results: %s", results)
+
+    # Keep the best read that fits a known plate format (see api/plate_format.py)
+    # Still photos get a lower confidence bar than the live stream
+    plate, score = find_best_plate(merge_segments(results), min_confidence=UPLOAD_CONFIDENCE_THRESHOLD)
+    if plate:
+        logger.info("✅ Found potential plate: %s (score: %.2f)", plate, score)
+        return plate
+
+    logger.info("⚠️ No valid plate detected in image")
+    return None
+
+
 # 🖼️ Process image and extract plate number using EasyOCR
 def extract_plate_from_image(image_bytes: bytes) -> str | None:
     """
@@ -33,52 +78,31 @@ def extract_plate_from_image(image_bytes: bytes) -> str | None:
     Returns None if no valid plate is detected.
     """
     try:
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
+        img = decode_image(image_bytes)
         if img is None:
-            print("❌ Failed to decode image")
+            logger.warning("❌ Failed to decode image")
             return None
 
         # Use EasyOCR to detect text
-        results = reader.readtext(img)
-
-        print(f"🔍 OCR Results: {results}")
-
-        # Look for text that resembles a license plate
-        # License plates are typically: 2-3 letters + 3-4 numbers or similar patterns
-        for (_, text, confidence) in results:
-            # Clean up the text
-            text = text.upper().replace(' ', '').replace('-', '')
-
-            # Check if it looks like a plate number (alphanumeric, 5-8 characters)
-            if confidence > 0.3 and len(text) >= 5 and len(text) <= 8:
-                # Check if it's alphanumeric
-                if re.match(r'^[A-Z0-9]+$', text):
-                    print(f"✅ Found potential plate: {text} (confidence: {confidence:.2f})")
-                    return text
-
-        print("⚠️ No valid plate detected in image")
-        return None
+        return plate_from_results(ocr_engine.readtext(img))
 
     except Exception as e:
-        print(f"❌ OCR Error: {e}")
+        logger.error("❌ OCR Error: %s", e)
         return None
 
 # 🧠 Detect plate from image
 @router.post("/", response_model=dict)
 async def detect_plate_from_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
     try:
-        print(f"📸 Received image file: {file.filename}, size: {file.size}")
+        logger.info("📸 Received image file: %s, size: %s", file.filename, file.size)
 
         # Read image file
         image_bytes = await file.read()
-        print(f"📸 Image bytes read: {len(image_bytes)} bytes")
+        logger.debug("📸 Image bytes read: %d bytes", len(image_bytes))
 
-        # Extract plate number from image using OCR
-        plate_number = extract_plate_from_image(image_bytes)
-        print(f"🔍 Detected plate number: {plate_number}")
+        # Extract plate number from image using OCR (on the upload pool, off the event loop)
+        plate_number = await upload_pool.run(extract_plate_from_image, image_bytes)
+        logger.debug("🔍 Detected plate number: %s", plate_number)
 
         if not plate_number:
             # No plate detected - return success but don't save/broadcast
@@ -97,21 +121,11 @@ async def detect_plate_from_image(file: UploadFile = File(...), db: Session = De
                 timestamp=timestamp
             )
             db.add(new_log)
+            # 🔔 Dashboards are notified in real time when this commits
+            mark_live(db, new_log)
             db.commit()
             db.refresh(new_log)
 
-            # 🔔 Notify all connected dashboards in real time (Registered Only)
-            await manager.broadcast({
-                "plate_number": plate_number,
-                "status": "registered",
-                "timestamp": timestamp.isoformat(),
-                "vehicle": {
-                    "name": vehicle.name,
-                    "purpose": vehicle.purpose,
-                    "profile_picture": vehicle.profile_picture
-                }
-            })
-
             return {
                 "plate_number": plate_number,
                 "status": "registered",
@@ -131,11 +145,11 @@ async def detect_plate_from_image(file: UploadFile = File(...), db: Session = De
                 timestamp=timestamp
             )
             db.add(new_log)
+            mark_live(db, new_log)
             db.commit()
             db.refresh(new_log)
 
-            # NOTE: We skip broadcasting unregistered plates to dashboard
-            print(f"🚫 Unregistered: {plate_number} (Broadcast skipped)")
+            logger.info("🚫 Unregistered: %s", plate_number)
 
             return {
                 "plate_number": plate_number,
@@ -143,9 +157,220 @@ async def detect_plate_from_image(file: UploadFile = File(...), db: Session = De
                 "timestamp": timestamp.isoformat()
             }
 
+    except Overloaded as e:
+        logger.warning("⏳ Upload turned away: %s", e)
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         return {"error": f"Failed to process image: {str(e)}"}
 
+def expand_upload(filename: str, data: bytes, max_images: int):
+    """
+    (name, source) for an uploaded image, or for each image inside an uploaded
+    zip. source is the image bytes, a callable returning them (zip members are
+    only inflated when decoded, see decode_upload), or None for images over
+    BATCH_MAX_IMAGE_BYTES. Raises 413 for more than `max_images` images and
+    400 for archives that can't be read, without inflating anything.
+    """
+    if not data.startswith(b"PK\x03\x04"):
+        return [(filename, data)]
+
+    try:
+        # Left open: it reads from memory, and decode_upload reads members from it later
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip file {filename}: {e}")
+    members = [info for info in archive.infolist()
+               if not (info.is_dir() or info.filename.startswith("__MACOSX/")
+                       or os.path.basename(info.filename).startswith(".")
+                       or not info.filename.lower().endswith(IMAGE_EXTENSIONS))]
+    if len(members) > max_images:
+        raise HTTPException(status_code=413, detail=f"Too many images (max {BATCH_MAX_IMAGES})")
+    if any(info.flag_bits & 0x1 for info in members):
+        raise HTTPException(status_code=400, detail=f"Invalid zip file {filename}: encrypted entries")
+    # Sizes come from the zip's directory, so a zip bomb is never inflated
+    return [(info.filename, None if info.file_size > BATCH_MAX_IMAGE_BYTES else partial(archive.read, info))
+            for info in members]
+
+
+def decode_upload(source):
+    """decode_image for an expand_upload source; a zip member is inflated here, one at a time"""
+    if callable(source):
+        try:
+            source = source()
+        except (zipfile.BadZipFile, NotImplementedError, EOFError, zlib.error) as e:
+            # Bad CRC, truncated data or an unsupported compression method
+            logger.warning("❌ Failed to read image from zip: %s", e)
+            return None
+    return decode_image(source)
+
+
+def batch_result(index: int, filename: str, status: str, **fields) -> bytes:
+    """One NDJSON line of the batch response"""
+    return json.dumps({"type": "result", "index": index, "filename": filename,
+                       "status": status, **fields}).encode() + b"\n"
+
+
+async def run_batch(images):
+    """
+    Decode `images` [(name, source)] (see expand_upload) on the decode pool
+    and OCR them in batches as they become ready, yielding an NDJSON line per
+    image as soon as it is read. At most BATCH_IMAGES_IN_FLIGHT decoded
+    images are held at once. Logs are written in one transaction at the end, so an
+    interrupted batch leaves no partial back-fill behind.
+    """
+    loop = asyncio.get_running_loop()
+    db = SessionLocal()
+    new_logs = []
+    counts = {"registered": 0, "unregistered": 0, "no_plate": 0, "error": 0}
+
+    async def decode(index, source):
+        return index, await loop.run_in_executor(decode_pool, decode_upload, source)
+
+    def recognize(batch):
+        """[(index, image)] -> [(index, plate | None)], run on the upload pool"""
+        results = ocr_engine.readtext_batched([image for _, image in batch])
+        return [(index, plate_from_results(result)) for (index, _), result in zip(batch, results)]
+
+    async def read_group(batch):
+        """NDJSON lines for a group of decoded images; DB lookups run off the event loop"""
+        try:
+            plates = await upload_pool.run(recognize, batch)
+        except Overloaded as e:
+            # The response has already started, so report it per image
+            logger.warning("⏳ Batch OCR turned away: %s", e)
+            counts["error"] += len(batch)
+            return [batch_result(index, images[index][0], "error", message=str(e), retry_after=e.retry_after)
+                    for index, _ in batch]
+        return await asyncio.to_thread(to_lines, plates)
+
+    def save():
+        db.add_all(new_logs)
+        db.commit()
+
+    def to_lines(plates):
+        found = {plate for _, plate in plates if plate}
+        vehicles = {}
+        if found:
+            vehicles = {vehicle.plate_number: vehicle for vehicle in
+                        db.query(models.Vehicle).filter(models.Vehicle.plate_number.in_(found))}
+        lines = []
+        for index, plate in plates:
+            filename = images[index][0]
+            if not plate:
+                counts["no_plate"] += 1
+                lines.append(batch_result(index, filename, "no_plate"))
+                continue
+            timestamp = datetime.now(PHILIPPINE_TZ)
+            vehicle = vehicles.get(plate)
+            status = "registered" if vehicle else "unregistered"
+            counts[status] += 1
+            new_logs.append(models.Log(plate_number=plate, status=status,
+                                       vehicle_id=vehicle.id if vehicle else None, timestamp=timestamp))
+            fields = {"plate_number": plate, "timestamp": timestamp.isoformat()}
+            if vehicle:
+                fields["vehicle"] = {
+                    "name": vehicle.name,
+                    "plate_number": vehicle.plate_number,
+                    "purpose": vehicle.purpose,
+                    "profile_picture": vehicle.profile_picture,
+                    "date_registered": str(vehicle.date_registered)
+                }
+            lines.append(batch_result(index, filename, status, **fields))
+        return lines
+
+    pending = set()
+    # Same-size images wait for each other so OCR can batch them
+    waiting = {}
+    held = 0  # images decoding or waiting in `waiting`
+    next_index = 0
+    try:
+        while True:
+            # Keep the decode threads busy, within the in-flight limit
+            while (next_index < len(images) and len(pending) < BATCH_DECODE_WORKERS
+                   and held < BATCH_IMAGES_IN_FLIGHT):
+                filename, source = images[next_index]
+                if source is None:
+                    counts["error"] += 1
+                    yield batch_result(next_index, filename, "error", message="Image is too large")
+                else:
+                    pending.add(asyncio.ensure_future(decode(next_index, source)))
+                    held += 1
+                next_index += 1
+
+            if held >= BATCH_IMAGES_IN_FLIGHT and waiting:
+                # Limit reached: read the biggest partial group instead of holding more images
+                groups = [waiting.pop(max(waiting, key=lambda shape: len(waiting[shape])))]
+            elif pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                groups = []
+                for task in done:
+                    index, image = task.result()
+                    if image is None:
+                        held -= 1
+                        counts["error"] += 1
+                        yield batch_result(index, images[index][0], "error", message="Failed to decode image")
+                        continue
+                    group = waiting.setdefault(image.shape, [])
+                    group.append((index, image))
+                    if len(group) >= OCR_BATCH_SIZE:
+                        groups.append(waiting.pop(image.shape))
+            elif waiting:
+                # Everything is decoded: read the leftovers together
+                groups = [[item for group in waiting.values() for item in group]]
+                waiting.clear()
+            else:
+                break
+
+            for group in groups:
+                held -= len(group)
+                for line in await read_group(group):
+                    yield line
+
+        await asyncio.to_thread(save)
+        logger.info("📦 Batch of %d image(s) processed: %d registered, %d unregistered, %d without plate, %d failed",
+                    len(images), counts["registered"], counts["unregistered"], counts["no_plate"], counts["error"])
+        yield json.dumps({"type": "summary", "images": len(images), "logged": len(new_logs), **counts}).encode() + b"\n"
+    finally:
+        for task in pending:
+            task.cancel()
+        db.close()
+
+
+# 📦 Detect plates from many images (multipart files and/or zip archives)
+@router.post("/batch")
+async def detect_plates_batch(files: list[UploadFile] = File(...)):
+    """
+    Back-fill logs from a batch of photos. Streams one NDJSON line per image
+    ({"type": "result", "index", "filename", "status", ...}) in the order
+    they finish, then a {"type": "summary"} line. The new logs reach the
+    dashboards as "live": false events, since these are past detections.
+    """
+    loop = asyncio.get_running_loop()
+    images = []
+    for file in files:
+        filename = file.filename or f"file-{len(images)}"
+        remaining = BATCH_MAX_IMAGES - len(images)
+        if remaining <= 0:
+            raise HTTPException(status_code=413, detail=f"Too many images (max {BATCH_MAX_IMAGES})")
+
+        # Uploads are read up front: the request's files are closed once streaming starts.
+        # A plain image over the limit is rejected from its size, without reading it
+        is_zip = await file.read(4) == b"PK\x03\x04"
+        await file.seek(0)
+        if not is_zip and file.size is not None and file.size > BATCH_MAX_IMAGE_BYTES:
+            images.append((filename, None))
+            continue
+
+        data = await file.read()
+        if not is_zip:
+            images.append((filename, data if len(data) <= BATCH_MAX_IMAGE_BYTES else None))
+            continue
+        # Reading a large zip directory is CPU work too, so it runs on the decode pool
+        images.extend(await loop.run_in_executor(decode_pool, expand_upload, filename, data, remaining))
+
+    logger.info("📦 Batch upload: %d image(s) from %d file(s)", len(images), len(files))
+    return StreamingResponse(run_batch(images), media_type="application/x-ndjson")
+
 # 🧠 Detect a plate number (manual entry)
 @router.post("/manual", response_model=dict)
 async def detect_plate(data: dict, db: Session = Depends(get_db)):
@@ -0,0 +1,105 @@
+"""
+Evidence Routes
+Snapshots saved for logged detections (see api/evidence_store.py)
+"""
+
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal
+from api import models
+from api.evidence_store import evidence_store
+
+router = APIRouter()
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+# DB session dependency
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def parse_range(header: str, length: int):
+    """
+    (start, end) inclusive for a single-range `Range` header, or None to
+    send the whole image. Raises 416 for ranges outside the image.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, length - int(last))
+        end = length - 1
+    if start > end or start >= length:
+        raise HTTPException(
+            status_code=416,  # Range Not Satisfiable
+            headers={"Content-Range": f"bytes */{length}"},
+        )
+    return start, end
+
+
+# 📸 List evidence for a log
+@router.get("/{log_id}")
+def list_evidence(log_id: int, db: Session = Depends(get_db)):
+    records = db.query(models.Evidence).filter(models.Evidence.log_id == log_id).all()
+    return [
+        {
+            "kind": record.kind,
+            "url": f"/api/evidence/{log_id}/{record.kind}",
+            "content_type": record.content_type,
+            "size": record.length,
+            "created_at": record.created_at,
+        }
+        for record in records
+    ]
+
+
+# 🖼️ Fetch one image (supports Range requests)
+@router.get("/{log_id}/{kind}")
+def get_evidence(log_id: int, kind: str, request: Request, db: Session = Depends(get_db)):
+    record = db.query(models.Evidence).filter(
+        models.Evidence.log_id == log_id,
+        models.Evidence.kind == kind
+    ).order_by(models.Evidence.id.desc()).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+
+    # Log ids (and so these URLs) are reused after the logs are cleared:
+    # revalidate every time, the ETag makes that a cheap 304
+    etag = f'"{record.id}-{record.segment}:{record.offset}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "ETag": etag,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range", ""), record.length)
+
+    try:
+        if byte_range is None:
+            data = evidence_store.read(record)
+            return Response(content=data, media_type=record.content_type, headers=headers)
+
+        start, end = byte_range
+        data = evidence_store.read(record, start, end)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Evidence file was removed")
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{record.length}"
+    return Response(content=data, status_code=status.HTTP_206_PARTIAL_CONTENT,
+                    media_type=record.content_type, headers=headers)
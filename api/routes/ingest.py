@@ -0,0 +1,158 @@
+"""
+Edge Ingestion Routes
+Batched detection events from edge cameras (see api/edge_client.py).
+
+Every event carries a client-generated idempotency key. A key seen before
+is answered with the original outcome and never logged twice, so the edge
+can safely resend a batch whose response it didn't get.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+import pytz
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal
+from api import models, schemas
+from api.config import INGEST_MAX_EVENTS, INGEST_LIVE_WINDOW_SECONDS
+from api.cooldown_store import cooldowns
+from api.change_feed import mark_live
+
+# Philippine timezone
+PHILIPPINE_TZ = pytz.timezone('Asia/Manila')
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# DB session dependency
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def normalize_plate(plate: str) -> str:
+    return plate.upper().replace(' ', '').replace('-', '')
+
+
+def captured_time(event: schemas.DetectionEvent) -> datetime:
+    """Capture time in Philippine time (naive times are taken to be Philippine time already)"""
+    if event.captured_at.tzinfo is None:
+        return PHILIPPINE_TZ.localize(event.captured_at)
+    return event.captured_at.astimezone(PHILIPPINE_TZ)
+
+
+def ingest_events(db: Session, events: list[schemas.DetectionEvent]):
+    """
+    Log new events in one transaction and return the per-event results.
+    Fresh events are marked live for the change feed. If the transaction
+    fails it is rolled back and the cooldowns it took are released.
+    """
+    keys = {event.idempotency_key for event in events}
+    seen = {
+        row.idempotency_key: row for row in
+        db.query(models.IngestedEvent).filter(models.IngestedEvent.idempotency_key.in_(keys))
+    }
+    previous_logs = {
+        log.id: log for log in
+        db.query(models.Log).filter(models.Log.id.in_({row.log_id for row in seen.values() if row.log_id}))
+    }
+    plates = {normalize_plate(event.plate_number) for event in events}
+    vehicles = {
+        vehicle.plate_number: vehicle for vehicle in
+        db.query(models.Vehicle).filter(models.Vehicle.plate_number.in_(plates))
+    }
+    now = datetime.now(timezone.utc)
+
+    # Decide everything before writing: the cooldown store commits on its own
+    # connection, which would otherwise wait on this session's write lock
+    decisions = []
+    new_keys = set()
+    acquired = []                # cooldowns to give back if nothing gets logged
+    for event in events:
+        key = event.idempotency_key
+        if key in seen or key in new_keys:
+            decisions.append((event, "duplicate", None, None, False))
+            continue
+        new_keys.add(key)
+        plate = normalize_plate(event.plate_number)
+        timestamp = captured_time(event)
+        fresh = (now - timestamp).total_seconds() <= INGEST_LIVE_WINDOW_SECONDS
+        # Another lane (or this one) logged the plate moments ago
+        if fresh and not cooldowns.try_acquire(plate):
+            outcome = "cooldown"
+        else:
+            outcome = "logged"
+            if fresh:
+                acquired.append(plate)
+        decisions.append((event, outcome, plate, timestamp, fresh))
+
+    try:
+        records = {}
+        for event, outcome, plate, timestamp, fresh in decisions:
+            if outcome == "duplicate":
+                continue
+            record = models.IngestedEvent(idempotency_key=event.idempotency_key, camera_id=event.camera_id,
+                                          plate_number=plate, confidence=event.confidence, captured_at=timestamp)
+            if outcome == "logged":
+                vehicle = vehicles.get(plate)
+                record.log = models.Log(plate_number=plate, status="registered" if vehicle else "unregistered",
+                                        vehicle_id=vehicle.id if vehicle else None, timestamp=timestamp)
+                if fresh:
+                    # Recent enough to show as a live detection on the dashboards
+                    mark_live(db, record.log, camera_id=event.camera_id)
+            db.add(record)
+            records[event.idempotency_key] = record
+        db.flush()
+
+        results = []
+        for event, outcome, _, _, _ in decisions:
+            key = event.idempotency_key
+            if outcome == "duplicate":
+                # Resent (or repeated within this batch): report what happened the first time
+                record = records.get(key) or seen[key]
+                log = record.log if key in records else previous_logs.get(record.log_id)
+            else:
+                record = records[key]
+                log = record.log
+            results.append({"idempotency_key": key, "plate_number": record.plate_number, "result": outcome,
+                            "log_id": record.log_id, "status": log.status if log else None})
+        db.commit()
+        return results
+    except Exception:
+        # Roll back first: releasing a persisted cooldown would otherwise wait
+        # on this session's write lock. A retry must not find its own plates
+        # already cooling down.
+        db.rollback()
+        for plate in acquired:
+            cooldowns.release(plate)
+        raise
+
+
+# 📥 Batched detection events from edge cameras
+@router.post("/detections")
+def ingest_detections(batch: schemas.DetectionEventBatch, db: Session = Depends(get_db)):
+    if len(batch.events) > INGEST_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"Too many events (max {INGEST_MAX_EVENTS})")
+    if not batch.events:
+        return {"results": []}
+
+    try:
+        results = ingest_events(db, batch.events)
+    except IntegrityError:
+        # A concurrent request committed some of the same keys first; the
+        # retry (after ingest_events rolled back) sees them as duplicates
+        results = ingest_events(db, batch.events)
+
+    logged = sum(1 for result in results if result["result"] == "logged")
+    logger.info("📥 Ingested %d event(s) from %s: %d logged, %d duplicate/cooldown",
+                len(results), ", ".join(sorted({event.camera_id for event in batch.events})),
+                logged, len(results) - logged)
+    return {"results": results}
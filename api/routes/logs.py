@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from api.database import SessionLocal
+from api.collection_versions import conditional
 from api import models, schemas
 from datetime import datetime
 import pytz
@@ -20,7 +21,11 @@ def get_db():
 
 # 🧾 Get all logs
 @router.get("/", response_model=list[schemas.Log])
-def get_logs(db: Session = Depends(get_db)):
+def get_logs(request: Request, response: Response, db: Session = Depends(get_db)):
+    # 304 straight from the version counter while no log was written
+    not_modified = conditional(request, response, "logs")
+    if not_modified:
+        return not_modified
     logs = db.query(models.Log).order_by(models.Log.timestamp.desc()).all()
     return logs
 
@@ -52,6 +57,11 @@ def create_log(log: schemas.LogCreate, db: Session = Depends(get_db)):
 def clear_all_logs(db: Session = Depends(get_db)):
     """Delete all logs from the database"""
     try:
+        # Evidence index rows go too; their pack files age out by rotation
+        db.query(models.Evidence).delete()
+        # Ingest keys stay so a resent edge event is still a duplicate, not a new log
+        db.query(models.IngestedEvent).filter(models.IngestedEvent.log_id.isnot(None)).update(
+            {models.IngestedEvent.log_id: None}, synchronize_session=False)
         db.query(models.Log).delete()
         db.commit()
         return {"message": "All logs cleared successfully"}
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from api.database import SessionLocal
+from api.collection_versions import conditional
 from api import models, schemas
 
 
@@ -15,7 +16,11 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=list[schemas.Vehicle])
-def get_vehicles(db: Session = Depends(get_db)):
+def get_vehicles(request: Request, response: Response, db: Session = Depends(get_db)):
+    # The session only connects on its first query, so a 304 never touches the DB
+    not_modified = conditional(request, response, "vehicles")
+    if not_modified:
+        return not_modified
     vehicles = db.query(models.Vehicle).all()
     return vehicles
 
@@ -38,7 +43,10 @@ def create_vehicle(vehicle: schemas.VehicleCreate, db: Session = Depends(get_db)
     return new_vehicle
 
 @router.get("/{plate_number}", response_model=schemas.Vehicle)
-def get_vehicle_by_plate(plate_number: str, db: Session = Depends(get_db)):
+def get_vehicle_by_plate(plate_number: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = conditional(request, response, "vehicles")
+    if not_modified:
+        return not_modified
     vehicle = db.query(models.Vehicle).filter(models.Vehicle.plate_number == plate_number).first()
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -35,3 +35,15 @@ class Log(LogBase):
 
     class Config:
         from_attributes = True
+
+
+# ---------------- Edge ingestion ----------------
+class DetectionEvent(BaseModel):
+    idempotency_key: str = Field(min_length=1, max_length=128)
+    plate_number: str = Field(min_length=1, max_length=20)
+    confidence: Optional[float] = None
+    camera_id: str = Field(min_length=1, max_length=64)
+    captured_at: datetime
+
+class DetectionEventBatch(BaseModel):
+    events: List[DetectionEvent]
@@ -1,32 +1,193 @@
-from typing import List
+"""
+WebSocket Manager
+Fans out dashboard events on /ws/detections.
+
+Every event gets a sequence number and is kept in a short history, so a
+client that reconnects with `since=<seq>` is sent only what it missed
+instead of refetching everything. Clients pick the topics they want:
+
+    registered     logs of registered plates
+    unregistered   logs of unregistered plates
+    vehicles       vehicles added, edited or deleted
+
+Whenever sequence numbers start over, the `epoch` in the hello message
+changes with them. A client whose epoch doesn't match, or who is further
+behind than the history reaches, is told to resync (refetch in full).
+
+Events may be published from any thread. They go through a pub/sub
+backend (api/pubsub.py, chosen by PUBSUB_BACKEND), which numbers them and
+hands every event back to every API worker, so dashboards connected to one
+worker see changes made through another. Each client has its own sender
+task, so one slow dashboard never holds up the others.
+"""
+
+import asyncio
+import logging
+import secrets
+from collections import deque
+
 from fastapi import WebSocket
 
+from api.config import WS_HISTORY_SIZE, WS_CLIENT_MAX_BACKLOG
+from api.pubsub import PubSubBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("registered", "unregistered", "vehicles")
+# What /ws/detections carried before topics existed
+DEFAULT_TOPICS = ("registered",)
+
+
+def parse_topics(value) -> frozenset | None:
+    """'registered,vehicles' or ['registered', 'vehicles'] -> known topics; None if not given"""
+    if value is None:
+        return None
+    names = value.split(",") if isinstance(value, str) else value
+    return frozenset(name.strip() for name in names if name.strip() in TOPICS)
+
+
+class Client:
+    def __init__(self, websocket: WebSocket, topics: frozenset):
+        self.websocket = websocket
+        self.topics = topics
+        self.queue = asyncio.Queue()
+        self.sender = None
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, history_size: int = WS_HISTORY_SIZE, max_backlog: int = WS_CLIENT_MAX_BACKLOG,
+                 backend: PubSubBackend | None = None):
+        self.clients: dict[WebSocket, Client] = {}
+        self.backend = backend
+        self.epoch = None
+        self.origin = secrets.token_hex(4)             # this worker, in published events
+        self.seq = 0
+        self.history = deque(maxlen=history_size)   # (seq, topics, message)
+        self.max_backlog = max_backlog
+        self._listeners = []
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self.clients)
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Start delivering events on `loop`; publish() is a no-op before this"""
+        if self.epoch is not None:
+            return
+        if self.backend is None:
+            self.backend = create_backend()
+        self.epoch = self.backend.epoch
+        self.backend.start(loop, self._dispatch)
+
+    def add_listener(self, listener):
+        """Call listener(topics, message, origin) on the event loop for every event"""
+        self._listeners.append(listener)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, since: int | None = None, epoch: str | None = None,
+                      topics: frozenset | None = None) -> Client:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.bind(asyncio.get_running_loop())
+        client = Client(websocket, DEFAULT_TOPICS if topics is None else topics)
+
+        # No await from here on, so no event can slip in between replay and live
+        self._enqueue(client, {"type": "hello", "epoch": self.epoch, "seq": self.seq,
+                               "topics": sorted(client.topics)})
+        if since is not None:
+            oldest = self.history[0][0] if self.history else self.seq + 1
+            if (epoch is not None and epoch != self.epoch) or since > self.seq or since < oldest - 1:
+                self._enqueue(client, {"type": "resync", "epoch": self.epoch, "seq": self.seq})
+            else:
+                missed = sorted((event for event in self.history
+                                 if event[0] > since and event[1] & client.topics), key=lambda event: event[0])
+                for _, _, message in missed:
+                    self._enqueue(client, message)
+                logger.debug("⏪ Replaying %d event(s) since #%d", len(missed), since)
+        self.clients[websocket] = client
+        client.sender = asyncio.create_task(self._send_loop(client))
+        return client
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client and client.sender:
+            client.sender.cancel()
+
+    def handle_message(self, websocket: WebSocket, message: dict):
+        """Client messages: {"topics": [...]} changes the subscription"""
+        client = self.clients.get(websocket)
+        topics = parse_topics(message.get("topics")) if isinstance(message, dict) else None
+        if client and topics is not None:
+            client.topics = topics
+            self._enqueue(client, {"type": "subscribed", "topics": sorted(topics), "seq": self.seq})
+
+    async def broadcast(self, message: dict, topics=DEFAULT_TOPICS):
+        """Send `message` to every client, on any worker, subscribed to any of `topics`"""
+        self.publish(message, topics)
 
-    async def broadcast(self, message: dict):
-        print(f"📢 Broadcasting to {len(self.active_connections)} WebSocket client(s)")
-        disconnected = []
-        for connection in self.active_connections:
+    def publish(self, message: dict, topics):
+        """Thread-safe broadcast()"""
+        if self.backend is None:
+            return
+        try:
+            self.backend.publish(sorted(topics), message, self.origin)
+        except Exception as e:
+            logger.error("❌ Failed to publish dashboard event: %s", e)
+
+    async def close_all(self):
+        for websocket in list(self.clients):
+            self.disconnect(websocket)
             try:
-                await connection.send_json(message)
-                print(f"   ✅ Sent to client")
+                await websocket.close()
             except Exception as e:
-                print(f"   ❌ Failed to send to client: {e}")
-                disconnected.append(connection)
+                logger.warning("Error closing WebSocket: %s", e)
+        if self.backend is not None:
+            self.backend.close()
+
+    def _dispatch(self, seq: int, topics, message: dict, origin: str):
+        topics = frozenset(topics)
+        self.seq = max(self.seq, seq)
+        event = {"seq": seq, "topic": next(iter(topics)) if len(topics) == 1 else "logs", **message}
+        self.history.append((seq, topics, event))
+        for listener in self._listeners:
+            listener(topics, message, origin)
+
+        sent, lagging = 0, []
+        for websocket, client in self.clients.items():
+            if not topics & client.topics:
+                continue
+            if client.queue.qsize() >= self.max_backlog:
+                lagging.append(websocket)
+                continue
+            self._enqueue(client, event)
+            sent += 1
+        logger.debug("📢 Event #%d (%s) queued for %d WebSocket client(s)", seq, event["topic"], sent)
+
+        # Too far behind to catch up live; it can reconnect with since=<seq>
+        for websocket in lagging:
+            logger.warning("🐢 Dropping WebSocket client more than %d events behind", self.max_backlog)
+            self.disconnect(websocket)
+            asyncio.ensure_future(self._close(websocket, 1013))
+
+    @staticmethod
+    def _enqueue(client: Client, message: dict):
+        client.queue.put_nowait(message)
+
+    async def _send_loop(self, client: Client):
+        try:
+            while True:
+                message = await client.queue.get()
+                await client.websocket.send_json(message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning("❌ Failed to send to WebSocket client: %s", e)
+            self.clients.pop(client.websocket, None)
 
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
 # Singleton instance
 manager = ConnectionManager()
@@ -0,0 +1,135 @@
+"""
+Worker Pool
+Runs blocking request work off the event loop, with admission control.
+Uploads (image decode + OCR, upload_pool below) and logins (bcrypt, see
+api/auth.py) each get their own pool.
+
+At most `max_in_flight` jobs are accepted at once (running plus waiting
+for a worker). Past that, new jobs are turned away immediately (HTTP 429),
+and a job that waited `queue_timeout` seconds without a worker picking it
+up is dropped (HTTP 503). A burst of requests therefore gets quick
+"try again" answers instead of piling up behind, say, the OCR engine that
+the live camera stream also needs.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.config import UPLOAD_WORKERS, UPLOAD_MAX_IN_FLIGHT, UPLOAD_QUEUE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+DURATION_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """A job was turned away; status_code is the HTTP status to answer with"""
+
+    status_code = 503
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+class PoolFull(Overloaded):
+    status_code = 429
+
+
+class QueueTimeout(Overloaded):
+    status_code = 503
+
+
+class WorkerPool:
+    def __init__(self, workers: int = UPLOAD_WORKERS, max_in_flight: int = UPLOAD_MAX_IN_FLIGHT,
+                 queue_timeout: float = UPLOAD_QUEUE_TIMEOUT, name: str = "upload"):
+        self.name = name
+        self.workers = workers
+        self.max_in_flight = max(workers, max_in_flight)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0            # turned away at the door (429)
+        self.timed_out = 0           # dropped after waiting too long (503)
+        self.job_seconds = 0.0       # smoothed time a job holds a worker
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        with self._lock:
+            backlog = self.in_flight
+        return max(1, math.ceil(self.job_seconds * backlog / self.workers))
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on a worker; raises PoolFull or QueueTimeout under overload"""
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                full = True
+            else:
+                self.in_flight += 1
+                full = False
+        if full:
+            raise PoolFull(f"Too many {self.name} requests in progress (max {self.max_in_flight})",
+                           self.retry_after())
+
+        future = self._executor.submit(self._timed, fn, args)
+        # Released when the job finishes or is cancelled, not when the caller
+        # stops waiting, so abandoned jobs still count until they're done
+        future.add_done_callback(self._release)
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(result), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                # Never reached a worker
+                with self._lock:
+                    self.timed_out += 1
+                raise QueueTimeout(f"{self.name.capitalize()} request waited over {self.queue_timeout:g}s for a worker",
+                                   self.retry_after())
+            # Already running: let it finish
+            return await result
+        except asyncio.CancelledError:
+            # Client went away; drop the job if it hasn't started
+            future.cancel()
+            raise
+
+    def _timed(self, fn, args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.job_seconds += DURATION_SMOOTHING * (elapsed - self.job_seconds)
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "job_ms": round(self.job_seconds * 1000, 1),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by the upload endpoints (single and batch)
+upload_pool = WorkerPool()
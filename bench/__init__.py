@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the plate recognition pipeline.
+Run from the project root, e.g. `python -m bench.ocr_pipeline --help`.
+"""
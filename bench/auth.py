@@ -0,0 +1,169 @@
+"""
+Auth Benchmark
+Measures what login protection costs the rest of the API:
+
+1. Token check: JWT decode on every request vs the verified-token cache.
+2. Route latency: the same trivial route with and without
+   Depends(get_current_user).
+3. Login storm: many concurrent logins through the original sync route
+   (bcrypt on Starlette's shared thread pool) and through the current one
+   (bcrypt on its own bounded pool). Meanwhile a sync route and an async
+   route are probed to see how much the storm slows everything else down.
+
+Runs in-process over ASGI, so no server or database is needed.
+
+Usage (from the project root):
+    python -m bench.auth
+    python -m bench.auth --logins 64 --probes 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import bcrypt
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+
+from api import auth
+from bench.ocr_pipeline import summarize
+
+PASSWORD = "admin123"
+
+
+def build_app():
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/auth")
+
+    @app.post("/legacy/login")
+    def legacy_login(form_data: OAuth2PasswordRequestForm = Depends()):
+        """The login route as it was: sync, bcrypt inline on the shared thread pool"""
+        if form_data.username != auth.admin_user["username"] or not bcrypt.checkpw(
+                form_data.password.encode(), auth.admin_user["hashed_password"]):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"access_token": auth.create_access_token({"sub": form_data.username})}
+
+    @app.get("/open")
+    async def open_route():
+        return {"ok": True}
+
+    @app.get("/secure")
+    async def secure_route(user: str = Depends(auth.get_current_user)):
+        return {"ok": True}
+
+    @app.get("/sync")
+    def sync_route():
+        # Like the vehicle/log routes: runs on Starlette's thread pool
+        return {"ok": True}
+
+    return app
+
+
+def time_token_checks(token, count):
+    """Microseconds per check: full JWT decode vs cache hit"""
+    def decode():
+        auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+    auth.token_cache.clear()
+    auth.token_cache.put(token, "admin", time.time() + 3600)
+
+    results = {}
+    for name, check in (("jwt decode", decode), ("cache hit", lambda: auth.token_cache.get(token))):
+        start = time.perf_counter()
+        for _ in range(count):
+            check()
+        results[name] = (time.perf_counter() - start) / count * 1e6
+    return results
+
+
+async def probe(client, path, count, headers=None):
+    """Sequential request latencies (seconds) for `path`"""
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        times.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return times
+
+
+async def login_storm(client, path, logins, probes):
+    """Fire `logins` concurrent logins while probing /sync and /open"""
+    async def one_login():
+        start = time.perf_counter()
+        response = await client.post(path, data={"username": "admin", "password": PASSWORD})
+        return response.status_code, time.perf_counter() - start
+
+    start = time.perf_counter()
+    storm = asyncio.gather(*[one_login() for _ in range(logins)])
+    await asyncio.sleep(0.05)
+    sync_times, async_times = await asyncio.gather(probe(client, "/sync", probes), probe(client, "/open", probes))
+    results = await storm
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status_code, _ in results:
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+    ok_times = [t for status_code, t in results if status_code == 200]
+    return {
+        "elapsed_s": elapsed,
+        "statuses": statuses,
+        "login": summarize(ok_times) if ok_times else None,
+        "sync_probe": summarize(sync_times),
+        "async_probe": summarize(async_times),
+    }
+
+
+async def run(args):
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/auth/login", data={"username": "admin", "password": PASSWORD})
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print("Token check (µs per call)")
+        checks = time_token_checks(token, args.checks)
+        for name, micros in checks.items():
+            print(f"  {name:<12}{micros:>10.1f}")
+
+        print("\nRoute latency (ms), sequential requests, interleaved")
+        samples = {"open": [], "secure": []}
+        for i in range(args.requests + 50):
+            open_time = await probe(client, "/open", 1)
+            secure_time = await probe(client, "/secure", 1, headers)
+            if i >= 50:                                 # first 50 are warm-up
+                samples["open"] += open_time
+                samples["secure"] += secure_time
+        routes = {name: summarize(times) for name, times in samples.items()}
+        for name, t in routes.items():
+            print(f"  {name:<12}p50 {t['p50_ms']:>7.3f}   mean {t['mean_ms']:>7.3f}   p95 {t['p95_ms']:>7.3f}")
+
+        print(f"\nLogin storm: {args.logins} concurrent logins, probing /sync and /open meanwhile")
+        storms = {}
+        for name, path in (("legacy", "/legacy/login"), ("current", "/api/auth/login")):
+            result = storms[name] = await login_storm(client, path, args.logins, args.probes)
+            login = result["login"]
+            print(f"  {name:<9} {result['elapsed_s']:.1f}s  statuses {result['statuses']}")
+            if login:
+                print(f"            login   mean {login['mean_ms']:>8.1f} ms   p95 {login['p95_ms']:>8.1f} ms")
+            for probe_name in ("sync_probe", "async_probe"):
+                t = result[probe_name]
+                print(f"            {probe_name.split('_')[0]:<7} mean {t['mean_ms']:>8.1f} ms   p95 {t['p95_ms']:>8.1f} ms")
+
+    return {"token_checks_us": checks, "routes": routes, "storms": storms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--checks", type=int, default=20000, help="Token checks to time")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route latency test")
+    parser.add_argument("--logins", type=int, default=32, help="Concurrent logins in the storm")
+    parser.add_argument("--probes", type=int, default=100, help="Probe requests per route during the storm")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Multi-Camera Load Test
+Simulates several gate cameras by replaying recorded footage through the same
+per-frame work generate_frames does (stream resize, OCR every Nth frame, JPEG encode),
+one thread per camera, and reports what each camera actually achieved.
+OCR goes through the same per-vehicle tracking as the server, and each camera
+is cropped to its own ROI (roi_for(source), as the live path does).
+
+Replay runs on the source clock (see api/frame_source.py), so at --speed 1
+frames that the pipeline cannot keep up with are dropped just as they would be
+with a live camera.
+
+Usage (from the project root):
+    python -m bench.load_test footage/gate1.mp4 footage/gate2.mp4 --duration 60
+    python -m bench.load_test footage/gate1.mp4 --cameras 4 --speed 2 --loop
+"""
+
+import argparse
+import threading
+import time
+
+import cv2
+
+from api import ocr_engine
+from api.config import OCR_FRAME_INTERVAL
+from api.frame_source import open_source
+from api.plate_tracker import PlateTracker
+from api.roi import roi_for
+
+
+class SimulatedCamera(threading.Thread):
+    """Replays one source through the detection loop until stopped"""
+
+    def __init__(self, name, path, speed, loop, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.path = path
+        self.source = open_source(path, speed=speed, loop=loop)
+        # The ROI configured (or calibrated) for this source, not CAMERA_SOURCE's
+        self.roi = roi_for(path)
+        self.stop_event = stop_event
+        self.ocr_calls = 0
+        self.ocr_seconds = 0.0
+        self.confirmed = set()
+        self.started_at = None
+        self.finished_at = None
+
+    def run(self):
+        from api.plate_pipeline import read_tracked_plates
+        from api.config import STREAM_WIDTH
+
+        tracker = PlateTracker()
+        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
+        self.started_at = time.perf_counter()
+
+        try:
+            while not self.stop_event.is_set():
+                ok, frame = self.source.read()
+                if not ok:
+                    break
+
+                view_scale = min(1.0, STREAM_WIDTH / frame.shape[1])
+                view = cv2.resize(frame, None, fx=view_scale, fy=view_scale, interpolation=cv2.INTER_AREA)
+
+                if self.source.frame_number % OCR_FRAME_INTERVAL == 0:
+                    t0 = time.perf_counter()
+                    # One shared model, as in the server process
+                    reads = read_tracked_plates(self.roi.crop(frame), tracker)
+                    self.ocr_seconds += time.perf_counter() - t0
+                    self.ocr_calls += 1
+
+                    for track, _, _ in reads:
+                        if track.confirmed:
+                            self.confirmed.add(track.plate)
+
+                cv2.imencode('.jpg', view, encode_param)
+        finally:
+            self.finished_at = time.perf_counter()
+            self.source.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sources", nargs="+", help="Video files or image folders to replay")
+    parser.add_argument("--cameras", type=int, help="Number of simulated cameras "
+                        "(sources are reused round-robin; default: one per source)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time, 0 = unthrottled)")
+    parser.add_argument("--loop", action="store_true", help="Loop recordings until --duration elapses")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until sources end)")
+    args = parser.parse_args(argv)
+
+    # Load the OCR model before starting the clock
+    ocr_engine.warm_up()
+
+    count = args.cameras or len(args.sources)
+    stop_event = threading.Event()
+    cameras = [
+        SimulatedCamera(f"cam{i + 1}", args.sources[i % len(args.sources)], args.speed, args.loop, stop_event)
+        for i in range(count)
+    ]
+
+    for cam in cameras:
+        if not cam.source.isOpened():
+            parser.error(f"Cannot open source: {cam.path}")
+
+    for cam in cameras:
+        cam.start()
+
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+            stop_event.set()
+        for cam in cameras:
+            cam.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for cam in cameras:
+            cam.join()
+
+    print(f"{'camera':<8}{'fps':>8}{'read':>8}{'dropped':>9}{'ocr':>6}{'ocr ms':>9}  confirmed")
+    for cam in cameras:
+        elapsed = (cam.finished_at or time.perf_counter()) - cam.started_at
+        src = cam.source
+        fps = src.frames_read / elapsed if elapsed else 0.0
+        ocr_ms = 1000 * cam.ocr_seconds / cam.ocr_calls if cam.ocr_calls else 0.0
+        print(f"{cam.name:<8}{fps:>8.1f}{src.frames_read:>8}{src.frames_dropped:>9}{cam.ocr_calls:>6}"
+              f"{ocr_ms:>9.1f}  {', '.join(sorted(cam.confirmed)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Logging Overhead Benchmark
+Time the detection loop spends logging, per frame: the original print()
+calls vs the queued logging in api/logging_config.py.
+
+Replays the logging the loop does around each OCR pass: the raw OCR dump
+(every 45th frame before, rate-limited DEBUG now), "Plate confirmed" lines,
+and the broadcast messages that used to be printed once per WebSocket client
+whenever a plate was confirmed. Only the caller's time is measured, since
+that is what holds up the frame loop; with the queue handler the actual
+write happens on the listener thread.
+
+Output goes to a sink that takes --write-ms per write, standing in for a
+terminal or a piped journald/Docker log that can't keep up. No camera or
+OCR model is needed.
+
+Usage (from the project root):
+    python -m bench.logging_overhead
+    python -m bench.logging_overhead --frames 5000 --write-ms 0.2 --clients 5
+    python -m bench.logging_overhead --debug
+"""
+
+import argparse
+import contextlib
+import logging
+import time
+
+from api import logging_config
+from bench.ocr_pipeline import summarize
+
+# What readtext returns for a busy ROI: ([box], text, confidence)
+OCR_RESULTS = [([[0, 0], [90, 0], [90, 30], [0, 30]], text, prob)
+               for text, prob in (("ABC", 0.91), ("1234", 0.88), ("PILIPINAS", 0.62), ("LTO", 0.41), ("2O24", 0.37))]
+
+
+class SlowSink:
+    """File-like object where every write takes `seconds` (a busy console)"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.seconds:
+            time.sleep(self.seconds)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def legacy_frame(frame_count, confirmed, clients):
+    """The print() calls the loop made before api/logging_config.py"""
+    results = OCR_RESULTS
+    if results and frame_count % 45 == 0:
+        print(f"🔍 OCR found {len(results)} text regions")
+        for (_, text, prob) in results:
+            print(f"   Raw: '{text}' | Confidence: {prob:.2f}")
+    if confirmed:
+        print(f"✅ Plate confirmed: ABC1234 (3/3, confidence: 0.91)")
+        print(f"📢 Broadcasting to {clients} WebSocket client(s)")
+        for _ in range(clients):
+            print(f"   ✅ Sent to client")
+        print(f"✅ Registered: ABC1234 - Juan Dela Cruz")
+
+
+def make_current_frame():
+    logger = logging.getLogger("api.camera_stream")
+    ocr_logger = logging.getLogger("api.ocr")
+    ws_logger = logging.getLogger("api.websocket_manager")
+
+    def current_frame(frame_count, confirmed, clients):
+        """The same events through the loggers the loop uses now"""
+        results = OCR_RESULTS
+        if results and ocr_logger.isEnabledFor(logging.DEBUG):
+            ocr_logger.debug("🔍 OCR found %d text regions: %s", len(results),
+                             ", ".join(f"'{text}' ({prob:.2f})" for (_, text, prob) in results))
+        if confirmed:
+            logger.info("✅ Plate confirmed: %s (track %d, support: %.2f/%.2f, %d OCR reads)",
+                        "ABC1234", 1, 1.8, 1.5, 3)
+            ws_logger.debug("📢 Event #%d (%s) queued for %d WebSocket client(s)", frame_count, "registered", clients)
+            logger.info("✅ Registered: %s - %s", "ABC1234", "Juan Dela Cruz")
+
+    return current_frame
+
+
+def time_frames(frame_fn, args):
+    times = []
+    for frame_count in range(1, args.frames + 1):
+        confirmed = frame_count % args.confirm_every == 0
+        start = time.perf_counter()
+        frame_fn(frame_count, confirmed, args.clients)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(args):
+    results = {}
+
+    legacy_sink = SlowSink(args.write_ms / 1000)
+    with contextlib.redirect_stdout(legacy_sink):
+        results["print"] = summarize(time_frames(legacy_frame, args))
+    results["print"]["writes"] = legacy_sink.writes
+
+    # StreamHandler picks up sys.stderr when setup_logging() creates it
+    current_sink = SlowSink(args.write_ms / 1000)
+    with contextlib.redirect_stderr(current_sink):
+        logging_config.setup_logging(level="DEBUG" if args.debug else "INFO")
+        results["queued"] = summarize(time_frames(make_current_frame(), args))
+        logging_config.shutdown_logging()     # drains the queue into the sink
+    results["queued"]["writes"] = current_sink.writes
+
+    print(f"{args.frames} frames, plate confirmed every {args.confirm_every}, {args.clients} WebSocket client(s), "
+          f"{args.write_ms:g} ms per console write, level {'DEBUG' if args.debug else 'INFO'}")
+    print(f"{'':<8}{'writes':>8}{'total ms':>11}{'mean µs':>10}{'p95 µs':>9}{'max ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<8}{r['writes']:>8}{r['mean_ms'] * r['count']:>11.1f}{r['mean_ms'] * 1000:>10.1f}"
+              f"{r['p95_ms'] * 1000:>9.1f}{r['max_ms']:>9.2f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=3000, help="OCR passes to simulate")
+    parser.add_argument("--confirm-every", type=int, default=30, help="Frames between confirmed plates")
+    parser.add_argument("--clients", type=int, default=3, help="Connected dashboards")
+    parser.add_argument("--write-ms", type=float, default=0.1, help="Milliseconds each console write takes")
+    parser.add_argument("--debug", action="store_true", help="Run at DEBUG (OCR dumps on, rate-limited)")
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+OCR Backend Comparison
+Runs the same frames through the PyTorch reader and the ONNX Runtime reader
+(FP32 and INT8) and compares readtext latency, best-plate agreement with the
+PyTorch path and, if ground truth is given, accuracy.
+
+Usage (from the project root):
+    python -m bench.ocr_backends --images samples/ --truth samples.csv
+    python -m bench.ocr_backends --video gate_footage.mp4 --backends torch onnx-int8
+"""
+
+import argparse
+import time
+
+from api.config import OCR_FRAME_INTERVAL
+from bench.ocr_pipeline import iter_frames, load_truth, truth_for, summarize
+
+BACKENDS = {
+    "torch": ("torch", False),
+    "onnx-fp32": ("onnx", False),
+    "onnx-int8": ("onnx", True),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Video file to replay")
+    source.add_argument("--images", help="Folder of still images")
+    parser.add_argument("--truth", help="Ground-truth CSV (key,plate)")
+    parser.add_argument("--every", type=int, help="OCR every Nth frame/image")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args(argv)
+
+    from api.plate_pipeline import preprocess_roi, merge_segments, find_best_plate
+    from api.ocr_engine import create_reader
+    from api.roi import roi_for
+
+    readers = {}
+    for name in args.backends:
+        backend, int8 = BACKENDS[name]
+        start = time.perf_counter()
+        readers[name] = create_reader(backend, int8=int8)
+        print(f"Loaded {name:<10} in {time.perf_counter() - start:.2f} s")
+
+    every = args.every or (OCR_FRAME_INTERVAL if args.video else 1)
+    truth = load_truth(args.truth) if args.truth else None
+    latencies = {name: [] for name in readers}
+    correct = {name: 0 for name in readers}
+    agree = {name: 0 for name in readers}
+    frames = labelled = 0
+    roi = roi_for(args.video or args.images)
+
+    for key, frame in iter_frames(args.video or args.images, every):
+        enhanced = preprocess_roi(roi.crop(frame))
+        expected = truth_for(truth, key) if truth else None
+        reference = None
+        frames += 1
+        labelled += expected is not None
+
+        for name, reader in readers.items():
+            start = time.perf_counter()
+            results = reader.readtext(enhanced, detail=1, paragraph=False)
+            latencies[name].append(time.perf_counter() - start)
+
+            plate, _ = find_best_plate(merge_segments(results))
+            if reference is None:
+                reference = plate
+            agree[name] += plate == reference
+            correct[name] += expected is not None and plate == expected
+
+    print()
+    header = f"{'backend':<12}{'mean ms':>10}{'p95 ms':>10}{'speedup':>9}{'agree':>8}"
+    print(header + (f"{'accuracy':>10}" if truth else ""))
+    baseline = None
+    for name in readers:
+        s = summarize(latencies[name])
+        if not s["count"]:
+            continue
+        baseline = baseline or s["mean_ms"]
+        line = (f"{name:<12}{s['mean_ms']:>10.1f}{s['p95_ms']:>10.1f}{baseline / s['mean_ms']:>8.2f}x"
+                f"{agree[name] / frames:>8.1%}")
+        if truth:
+            line += f"{correct[name] / labelled:>10.1%}" if labelled else f"{'-':>10}"
+        print(line)
+    print(f"\n{frames} frames; agreement is measured against the first backend ({args.backends[0]})")
+
+
+if __name__ == "__main__":
+    main()
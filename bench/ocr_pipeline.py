@@ -0,0 +1,265 @@
+"""
+OCR Pipeline Benchmark
+Replays a recorded video or a folder of images through the same pipeline the
+live stream uses (ROI crop -> read_tracked_plates: downscaled text detection,
+per-vehicle tracking, recognition of unconfirmed regions, format scoring and
+voting) and reports throughput, per-stage latency, CPU usage, peak RSS and,
+optionally, accuracy against ground truth.
+
+Tracks age on the recording's clock (frame number / fps), not the wall
+clock, so the tracker behaves as it would on a live camera however fast the
+benchmark runs.
+
+Usage (from the project root):
+    python -m bench.ocr_pipeline --video gate_footage.mp4 --truth gate_footage.csv
+    python -m bench.ocr_pipeline --images samples/ --truth samples.csv --json bench_output.json
+
+Ground-truth CSV has a header row and two columns, `key,plate`:
+    - for image folders, `key` is the file name (e.g. `car_01.jpg`)
+    - for videos, `key` is a frame number (`120`) or an inclusive range (`120-180`)
+"""
+
+import argparse
+import csv
+import json
+import resource
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from api import ocr_engine
+from api.frame_source import open_source
+
+STAGES = ("read", "roi", "pipeline")
+
+
+def load_truth(path):
+    """Load ground truth as a list of (matcher, plate) pairs"""
+    entries = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = row["key"].strip()
+            plate = row["plate"].strip().upper().replace(" ", "").replace("-", "")
+            if key.replace("-", "").isdigit():
+                start, _, end = key.partition("-")
+                entries.append(((int(start), int(end or start)), plate))
+            else:
+                entries.append((key, plate))
+    return entries
+
+
+def truth_for(truth, key):
+    """Return the expected plate for a frame number or file name, if any"""
+    for matcher, plate in truth:
+        if isinstance(matcher, tuple):
+            if isinstance(key, int) and matcher[0] <= key <= matcher[1]:
+                return plate
+        elif matcher == key:
+            return plate
+    return None
+
+
+def iter_frames(path, every):
+    """
+    Yield (key, frame) for every Nth frame of a video or image folder, as fast
+    as possible. `key` is the frame number for videos, file name for images.
+    """
+    source = open_source(path, speed=0)
+    if not source.isOpened():
+        sys.exit(f"Cannot open source: {path}")
+
+    try:
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                break
+            if source.frame_number % every:
+                continue
+            key = source.current_name if source.kind == "images" else source.frame_number
+            yield key, frame
+    finally:
+        source.release()
+
+
+def source_fps(path):
+    """Frame rate a recording is replayed at (see api/frame_source.py)"""
+    source = open_source(path, speed=0)
+    try:
+        return source.fps
+    finally:
+        source.release()
+
+
+def summarize(samples):
+    """Latency summary in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(frames, truth, roi=None, interval=None):
+    """
+    Drive the pipeline over `frames` and collect timings and accuracy counters.
+    `roi` crops each frame (None = whole frame); `interval` is the recording
+    time between OCR passes in seconds (None = wall clock).
+    """
+    from api.plate_pipeline import read_tracked_plates
+    from api.plate_tracker import PlateTracker
+
+    timings = defaultdict(list)
+    tracker = PlateTracker()
+    confirmed = {}          # plate -> OCR call index when first confirmed
+    first_seen = {}         # truth plate -> OCR call index when it first appeared
+    reads = correct = 0
+    ocr_calls = recognitions = 0
+
+    frames = iter(frames)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            key, frame = next(frames)
+        except StopIteration:
+            break
+        t1 = time.perf_counter()
+
+        image = roi.crop(frame) if roi is not None else frame
+        t2 = time.perf_counter()
+
+        now = ocr_calls * interval if interval else None
+        tracked = read_tracked_plates(image, tracker, now)
+        t3 = time.perf_counter()
+
+        ocr_calls += 1
+        for stage, start, end in zip(STAGES, (t0, t1, t2), (t1, t2, t3)):
+            timings[stage].append(end - start)
+
+        expected = truth_for(truth, key) if truth else None
+        if expected:
+            first_seen.setdefault(expected, ocr_calls)
+
+        for track, best_plate, _ in tracked:
+            if track.confirmed and track.plate not in confirmed:
+                confirmed[track.plate] = ocr_calls
+            if best_plate is None and track.confirmed:
+                continue            # not re-read once confirmed
+            recognitions += 1
+            if expected:
+                reads += 1
+                correct += best_plate == expected
+
+    accuracy = None
+    if truth:
+        expected_plates = {plate for _, plate in truth}
+        hits = expected_plates & confirmed.keys()
+        accuracy = {
+            "read_accuracy": correct / reads if reads else None,
+            "plates_expected": len(expected_plates),
+            "plates_confirmed": len(hits),
+            "recall": len(hits) / len(expected_plates) if expected_plates else None,
+            "false_confirmations": sorted(confirmed.keys() - expected_plates),
+            "mean_frames_to_confirm": (
+                statistics.fmean(confirmed[p] - first_seen[p] + 1 for p in hits if p in first_seen)
+                if any(p in first_seen for p in hits) else None
+            ),
+        }
+
+    return timings, ocr_calls, recognitions, confirmed, accuracy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Video file to replay")
+    source.add_argument("--images", help="Folder of still images")
+    parser.add_argument("--truth", help="Ground-truth CSV (key,plate)")
+    parser.add_argument("--every", type=int, help="OCR every Nth frame/image "
+                        "(default: OCR_FRAME_INTERVAL for video, 1 for images)")
+    parser.add_argument("--full-frame", action="store_true", help="OCR the whole frame instead of the source's ROI")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Model load is part of what we want to measure
+    t_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    from api.config import OCR_FRAME_INTERVAL
+    from api.roi import roi_for
+    ocr_engine.warm_up()
+    load_seconds = time.perf_counter() - t_start
+
+    path = args.video or args.images
+    every = args.every or (OCR_FRAME_INTERVAL if args.video else 1)
+    frames = iter_frames(path, every)
+    truth = load_truth(args.truth) if args.truth else None
+    roi = None if args.full_frame else roi_for(path)
+
+    t_run = time.perf_counter()
+    cpu_run = cpu_seconds()
+    timings, ocr_calls, recognitions, confirmed, accuracy = run(frames, truth, roi, every / source_fps(path))
+    wall = time.perf_counter() - t_run
+    cpu = cpu_seconds() - cpu_run
+
+    report = {
+        "source": path,
+        "model_load_s": ocr_engine.load_seconds,
+        "warm_up_s": load_seconds,
+        "ocr_calls": ocr_calls,
+        "recognitions": recognitions,
+        "wall_s": wall,
+        "ocr_fps": ocr_calls / wall if wall else 0.0,
+        "cpu_s": cpu,
+        "cpu_percent": 100 * cpu / wall if wall else 0.0,
+        "total_cpu_s": cpu_seconds() - cpu_start,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {stage: summarize(timings[stage]) for stage in STAGES},
+        "confirmed_plates": sorted(confirmed),
+        "accuracy": accuracy,
+    }
+
+    print(f"Source:        {report['source']}")
+    print(f"Model load:    {ocr_engine.load_seconds:.2f} s (warm after {load_seconds:.2f} s)")
+    print(f"OCR calls:     {ocr_calls} in {wall:.2f} s ({report['ocr_fps']:.2f} /s), {recognitions} region(s) recognized")
+    print(f"CPU:           {cpu:.2f} s ({report['cpu_percent']:.0f}% of one core)")
+    print(f"Peak RSS:      {report['peak_rss_mb']:.0f} MB")
+    print()
+    print(f"{'stage':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage in STAGES:
+        s = report["stages"][stage]
+        if s["count"]:
+            print(f"{stage:<12}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    print()
+    print(f"Confirmed:     {', '.join(report['confirmed_plates']) or '-'}")
+    if accuracy:
+        read_acc = accuracy["read_accuracy"]
+        print(f"Read accuracy: {read_acc:.1%}" if read_acc is not None else "Read accuracy: -")
+        print(f"Recall:        {accuracy['plates_confirmed']}/{accuracy['plates_expected']}")
+        print(f"False confirm: {', '.join(accuracy['false_confirmations']) or '-'}")
+        if accuracy["mean_frames_to_confirm"] is not None:
+            print(f"Frames/confirm:{accuracy['mean_frames_to_confirm']:>6.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Preprocessing Benchmark
+Runs the per-frame preprocessing work of the live stream (stream resize,
+ROI crop, grayscale + CLAHE + sharpening, JPEG encode) through the original
+allocate-every-call implementation, the buffer-reusing Preprocessor and its
+UMat (OpenCL) path. Reports time per frame and memory allocated per frame
+(traced with tracemalloc; NumPy arrays are included).
+
+No OCR model is needed. Frames come from a recording, or are synthetic if
+no source is given.
+
+Usage (from the project root):
+    python -m bench.preprocess
+    python -m bench.preprocess --video gate_footage.mp4 --frames 300
+    python -m bench.preprocess --width 1920 --height 1080
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from api.config import STREAM_WIDTH
+from api.preprocessing import Preprocessor
+from api.roi import roi_for
+from bench.ocr_pipeline import iter_frames, summarize
+
+JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
+
+
+def legacy_frame(frame, roi=roi_for("default")):
+    """Same work, allocating as preprocess_roi did before api/preprocessing.py"""
+    scale = min(1.0, STREAM_WIDTH / frame.shape[1])
+    view = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(roi.crop(frame), cv2.COLOR_BGR2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(gray)
+    kernel = np.array([[-1, -1, -1],
+                       [-1,  9, -1],
+                       [-1, -1, -1]])
+    enhanced = cv2.filter2D(enhanced, -1, kernel)
+    cv2.imencode('.jpg', view, JPEG_PARAMS)
+    return enhanced
+
+
+def make_pipeline(use_umat):
+    preprocessor = Preprocessor(use_umat=use_umat)
+    roi = roi_for("default")
+
+    def run(frame):
+        scale = min(1.0, STREAM_WIDTH / frame.shape[1])
+        view = preprocessor.resize(frame, scale, "view")
+        enhanced = preprocessor.process(roi.crop(frame))
+        cv2.imencode('.jpg', view, JPEG_PARAMS)
+        return enhanced
+
+    return run, preprocessor
+
+
+def synthetic_frames(count, width, height):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        yield i, np.roll(base, i * 3, axis=1)
+
+
+def measure(name, process, frames):
+    """Time per frame, then memory allocated per frame, for `process` over `frames`"""
+    process(frames[0])               # warm-up (first-use allocations)
+
+    # Timed without tracing, which would slow allocation-heavy code down
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        process(frame)
+        times.append(time.perf_counter() - start)
+
+    allocated = []
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        process(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - baseline)
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "time": summarize(times),
+        "allocated_kb_per_frame": sum(allocated) / len(allocated) / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--video", help="Video file or image folder (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=200, help="Frames to process")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    args = parser.parse_args(argv)
+
+    source = iter_frames(args.video, 1) if args.video else synthetic_frames(args.frames, args.width, args.height)
+    frames = [frame for _, (_, frame) in zip(range(args.frames), source)]
+    if not frames:
+        raise SystemExit("No frames to process")
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    variants = [("legacy", legacy_frame, None)]
+    run, preprocessor = make_pipeline(use_umat=False)
+    variants.append(("preprocessor", run, preprocessor))
+    if cv2.ocl.haveOpenCL():
+        run, umat_preprocessor = make_pipeline(use_umat=True)
+        variants.append(("umat", run, umat_preprocessor))
+    else:
+        print("OpenCL unavailable: skipping UMat path")
+
+    print()
+    print(f"{'variant':<14}{'mean ms':>10}{'p95 ms':>10}{'KB alloc/frame':>16}{'buffer grows':>14}")
+    results = []
+    for name, process, owner in variants:
+        result = measure(name, process, frames)
+        result["buffer_grows"] = owner.allocations if owner else None
+        results.append(result)
+        t = result["time"]
+        grows = "-" if owner is None else str(owner.allocations)
+        print(f"{name:<14}{t['mean_ms']:>10.2f}{t['p95_ms']:>10.2f}"
+              f"{result['allocated_kb_per_frame']:>16.1f}{grows:>14}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
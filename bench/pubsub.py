@@ -0,0 +1,97 @@
+"""
+Pub/Sub Benchmark
+Publish-to-delivery latency of the dashboard event backends (api/pubsub.py).
+
+Simulates several API workers in one process: each has its own backend
+instance (sharing one SQLite file, or one LocalRedis stand-in), and events
+are published round-robin from worker threads. Latency is measured from
+publish() to the moment every worker has delivered the event.
+
+Usage (from the project root):
+    python -m bench.pubsub
+    python -m bench.pubsub --workers 4 --events 2000 --backends sqlite redis-local
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from api.pubsub import InProcessBackend, LocalRedis, RedisBackend, SQLiteBackend
+from bench.ocr_pipeline import summarize
+
+
+def make_backends(name, workers, path):
+    if name == "memory":
+        # Can't span workers; one worker for reference
+        return [InProcessBackend()]
+    if name == "sqlite":
+        return [SQLiteBackend(path=path) for _ in range(workers)]
+    if name == "redis-local":
+        server = LocalRedis()
+        return [RedisBackend(client=server) for _ in range(workers)]
+    return [RedisBackend() for _ in range(workers)]
+
+
+async def run_backend(name, args, path):
+    loop = asyncio.get_running_loop()
+    backends = make_backends(name, args.workers, path)
+    sent = {}
+    pending = {}
+    latencies = []
+    done = asyncio.Event()
+
+    def deliver(seq, topics, message, origin):
+        n = message["n"]
+        pending[n] -= 1
+        if pending[n] == 0:
+            latencies.append(time.perf_counter() - sent[n])
+            if len(latencies) == args.events:
+                done.set()
+
+    for backend in backends:
+        backend.start(loop, deliver)
+
+    def publish_all():
+        for n in range(args.events):
+            pending[n] = len(backends)
+            sent[n] = time.perf_counter()
+            backends[n % len(backends)].publish(["registered"], {"n": n}, f"worker-{n % len(backends)}")
+            if args.interval:
+                time.sleep(args.interval)
+
+    start = time.perf_counter()
+    await asyncio.to_thread(publish_all)
+    await asyncio.wait_for(done.wait(), timeout=60)
+    elapsed = time.perf_counter() - start
+    for backend in backends:
+        backend.close()
+    return {"workers": len(backends), "events_per_s": args.events / elapsed, **summarize(latencies)}
+
+
+async def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            path = os.path.join(tmp, f"{name}.db")
+            result = results[name] = await run_backend(name, args, path)
+            print(f"{name:<12} {result['workers']} worker(s)  {result['events_per_s']:>8.0f} events/s   "
+                  f"p50 {result['p50_ms']:>7.2f} ms   p95 {result['p95_ms']:>7.2f} ms   max {result['max_ms']:>7.2f} ms")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=2, help="Simulated API workers")
+    parser.add_argument("--events", type=int, default=500, help="Events to publish")
+    parser.add_argument("--interval", type=float, default=0.002,
+                        help="Seconds between publishes (0 = as fast as possible)")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "redis-local"],
+                        choices=["memory", "sqlite", "redis-local", "redis"], help="Backends to compare")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Startup Benchmark
+Measures, in a fresh interpreter, how long the API takes to import, how long
+the shared OCR engine takes to load and warm up, and the resident memory at
+each step.
+
+Also acts as an import-time budget check: it exits non-zero if importing
+`api.main` takes longer than --budget seconds or drags in the ML/CV stack
+(torch, easyocr, OpenCV, NumPy), which must only load when first needed.
+
+Usage (from the project root):
+    python -m bench.startup
+    python -m bench.startup --runs 3 --budget 2
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be imported by `import api.main`
+HEAVY_MODULES = ("torch", "easyocr", "cv2", "numpy")
+
+# Executed in a child process so module caches don't skew the numbers
+_PROBE = r"""
+import json, resource, sys, time
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+t0 = time.perf_counter()
+import api.main
+t1 = time.perf_counter()
+rss_import = rss_mb()
+heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+
+from api import ocr_engine
+ocr_engine.warm_up()
+t2 = time.perf_counter()
+
+print(json.dumps({
+    "import_s": t1 - t0,
+    "heavy_modules": heavy,
+    "rss_after_import_mb": rss_import,
+    "model_load_s": ocr_engine.load_seconds,
+    "warm_up_s": t2 - t1,
+    "rss_after_warm_up_mb": rss_mb(),
+}))
+"""
+
+
+def measure():
+    probe = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + _PROBE
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=1, help="Number of fresh processes to average over")
+    parser.add_argument("--budget", type=float, default=3.0, help="Maximum seconds allowed for `import api.main`")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(args.runs)]
+    heavy = sorted({m for r in runs for m in r.pop("heavy_modules")})
+    report = {key: statistics.fmean(r[key] for r in runs if r[key] is not None)
+              for key in runs[0] if any(r[key] is not None for r in runs)}
+
+    print(f"import api.main:    {report['import_s']:.2f} s  ({report['rss_after_import_mb']:.0f} MB RSS)")
+    if "model_load_s" in report:
+        print(f"OCR model load:     {report['model_load_s']:.2f} s")
+    print(f"OCR ready (warm):   {report['warm_up_s']:.2f} s  ({report['rss_after_warm_up_mb']:.0f} MB RSS)")
+
+    failures = []
+    if report["import_s"] > args.budget:
+        failures.append(f"import took {report['import_s']:.2f} s (budget {args.budget:.2f} s)")
+    if heavy:
+        failures.append(f"import api.main loaded {', '.join(heavy)}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Import within budget ({args.budget:.2f} s), ML stack not loaded eagerly")
+    return report
+
+
+if __name__ == "__main__":
+    main()
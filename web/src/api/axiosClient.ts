@@ -4,4 +4,25 @@ const axiosClient = axios.create({
   baseURL: "http://127.0.0.1:8000/api",
 });
 
+// Vehicle, log and detection routes need the login token
+axiosClient.interceptors.request.use((config) => {
+  const token = localStorage.getItem("token");
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
+// Expired or invalid token: back to the login page
+axiosClient.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    if (error.response?.status === 401) {
+      localStorage.removeItem("token");
+      window.location.href = "/login";
+    }
+    return Promise.reject(error);
+  }
+);
+
 export default axiosClient;
@@ -41,10 +41,22 @@ export default function Dashboard() {
     let ws: WebSocket | null = null;
     let reconnectTimeout: ReturnType<typeof setTimeout>;
     let isIntentionallyClosed = false;
+    // Last event seen, so a reconnect only receives what was missed
+    let epoch: string | null = null;
+    let lastSeq: number | null = null;
 
     const connect = () => {
       try {
-        ws = new WebSocket("ws://127.0.0.1:8000/ws/detections");
+        // Same login token the API calls use (see api/axiosClient.ts)
+        const params = new URLSearchParams({
+          topics: "registered",
+          token: localStorage.getItem("token") ?? "",
+        });
+        if (epoch && lastSeq !== null) {
+          params.set("since", String(lastSeq));
+          params.set("epoch", epoch);
+        }
+        ws = new WebSocket(`ws://127.0.0.1:8000/ws/detections?${params}`);
 
         ws.onopen = () => {
           console.log("✅ WebSocket connected successfully");
@@ -57,8 +69,21 @@ export default function Dashboard() {
             const data = JSON.parse(event.data);
             console.log("📊 Parsed detection data:", data);
 
-            // Only show REGISTERED plates in Live Updates
-            if (data.status === "registered") {
+            if (data.type === "hello" || data.type === "resync") {
+              // New server or too far behind: carry on from its current position
+              if (data.type === "resync" || data.epoch !== epoch) {
+                epoch = data.epoch;
+                lastSeq = data.seq;
+              }
+              return;
+            }
+            if (typeof data.seq === "number") {
+              // Events from other API workers can arrive slightly out of order
+              lastSeq = Math.max(lastSeq ?? 0, data.seq);
+            }
+
+            // Only show live REGISTERED detections in Live Updates
+            if (data.type === "log" && data.live && data.status === "registered") {
               setDetections((prev) => {
                 const updated = [data, ...prev];
                 console.log("📋 Updated detections:", updated);
@@ -79,8 +104,15 @@ export default function Dashboard() {
           console.error("WebSocket error:", error);
         };
 
-        ws.onclose = () => {
+        ws.onclose = (event) => {
           console.log("🔌 WebSocket disconnected");
+          if (event.code === 1008) {
+            // Token missing, invalid or expired: back to the login page
+            isIntentionallyClosed = true;
+            localStorage.removeItem("token");
+            window.location.href = "/login";
+            return;
+          }
           // Attempt to reconnect after 3 seconds if not intentionally closed
           if (!isIntentionallyClosed) {
             reconnectTimeout = setTimeout(() => {